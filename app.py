@@ -7,6 +7,13 @@ from config import config
 from src.routes.main import main_bp
 from src.routes.plots import plots_bp
 from src.routes.api import api_bp
+from src.routes.debug import debug_bp
+from src.ingest.commands import register_commands
+from src.utils.metrics import init_metrics
+from src.utils.response_cache import init_response_cache
+from src.utils.static_site import init_static_site
+from src.utils.timing import init_timing
+from src.utils.warmup import init_warmup
 
 
 def create_app(config_name="default"):
@@ -24,31 +31,48 @@ def create_app(config_name="default"):
     # Load configuration
     app.config.from_object(config[config_name])
 
+    # Per-request phase timing (Server-Timing header, slow request log)
+    init_timing(app)
+
+    # In-process performance metrics exposed at /metrics
+    init_metrics(app)
+
+    # Serve pre-rendered default pages from Config.STATIC_SITE_DIR when current
+    init_static_site(app)
+
+    # Cache overview pages and grid assets; coalesce identical requests
+    init_response_cache(app)
+
+    # Warm the hottest pages in the background after startup
+    init_warmup(app)
+
     # Register blueprints
     app.register_blueprint(main_bp)
     app.register_blueprint(plots_bp)
     app.register_blueprint(api_bp)
 
+    # SQL statement statistics and slow query plans (development only)
+    if app.debug or app.config.get("DEBUG_ROUTES_ENABLED"):
+        app.register_blueprint(debug_bp)
+
+    # Database build commands (flask --app app ingest-gwas ...)
+    register_commands(app)
+
     return app
 
 
-# Create the app instance
-app = create_app()
+if __name__ == "__main__":
+    import os
 
-# Add this right after creating the app
-import os
-print(f"DEBUG: Current working directory: {os.getcwd()}")
-print(f"DEBUG: Files in current directory: {os.listdir('.')}")
-print(f"DEBUG: Files in data directory: {os.listdir('data') if os.path.exists('data') else 'data directory not found'}")
-print(f"DEBUG: locus_data.db exists: {os.path.exists('data/locus_data.db')}")
-print(f"DEBUG: manhattan_data.db exists: {os.path.exists('data/manhattan_data.db')}")
+    # Development server only: production imports create_app from wsgi.py
+    app = create_app()
 
-# if __name__ == "__main__":
-#     app.run(debug=True)
+    print(f"DEBUG: Current working directory: {os.getcwd()}")
+    print(f"DEBUG: Files in current directory: {os.listdir('.')}")
+    print(f"DEBUG: Files in data directory: {os.listdir('data') if os.path.exists('data') else 'data directory not found'}")
+    print(f"DEBUG: locus_data.db exists: {os.path.exists('data/locus_data.db')}")
+    print(f"DEBUG: manhattan_data.db exists: {os.path.exists('data/manhattan_data.db')}")
 
-if __name__ == '__main__':
-    import os
-    
     # Let Render set the port, with fallback to 10000 for Render, 5000 for local
     if 'RENDER' in os.environ:
         # Running on Render - use their preferred port
@@ -60,4 +84,4 @@ if __name__ == '__main__':
     print(f"Starting STRXplorer on port {port}")
     print(f"Environment: {'Render' if 'RENDER' in os.environ else 'Local'}")
     
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=False)
@@ -11,9 +11,158 @@ class Config:
     LOCUS_DB_PATH = "data/locus_data.db"
     MANHATTAN_DB_PATH = "data/manhattan_data.db"
 
+    # Optional per-trait GWAS shards (src/database/shards.py): traits listed in
+    # GWAS_SHARD_DIR/GWAS_SHARD_MANIFEST are read from their own database file
+    GWAS_SHARD_DIR = "data/gwas_shards"
+    GWAS_SHARD_MANIFEST = "manifest.json"
+
     # Flask settings
     SECRET_KEY = os.environ.get("SECRET_KEY") or "str-xplorer-secret-key"
 
+    # Request timing: emit Server-Timing headers and log requests slower than
+    # SLOW_REQUEST_THRESHOLD_MS milliseconds with their phase breakdown
+    SERVER_TIMING_ENABLED = True
+    SLOW_REQUEST_THRESHOLD_MS = (
+        float(os.environ["SLOW_REQUEST_THRESHOLD_MS"])
+        if os.environ.get("SLOW_REQUEST_THRESHOLD_MS")
+        else None
+    )
+
+    # SQL tracing: statements slower than SLOW_QUERY_THRESHOLD_MS are written
+    # with their EXPLAIN QUERY PLAN to a rotating log. /debug/slow_queries
+    # shows them in debug mode, or when DEBUG_ROUTES_ENABLED is set.
+    QUERY_TRACING_ENABLED = True
+    DEBUG_ROUTES_ENABLED = os.environ.get("DEBUG_ROUTES_ENABLED") == "1"
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100))
+    SLOW_QUERY_LOG_PATH = "logs/slow_queries.log"
+    SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 5
+
+    # Allele count thresholds precomputed in locus_summary; the locus overview
+    # grid filters at OVERVIEW_COUNT_THRESHOLD and shows OVERVIEW_PAGE_SIZE loci
+    LOCUS_SUMMARY_THRESHOLDS = (50, 100)
+    OVERVIEW_COUNT_THRESHOLD = 50
+    OVERVIEW_PAGE_SIZE = 48
+
+    # Partial index over gwas_variants rows with neg_log_p at or above this
+    # floor (p <= 1e-5), used by ?min_neg_log_p= queries at or above it.
+    # After changing it, run `flask build-gwas-indexes` to rebuild the index.
+    SIGNIFICANT_NEG_LOG_P_FLOOR = 5.0
+
+    # Genome-wide Manhattan reduction: keep every variant at or above
+    # GENOME_HIT_NEG_LOG_P, and only the top variant of each bin below it
+    GENOME_HIT_NEG_LOG_P = 7.3  # p < 5e-8
+    GENOME_BIN_SIZE = 250_000
+
+    # GWAS windows summarized around every STR locus in locus_window_summary;
+    # the trait overview ranks loci and draws plots over OVERVIEW_WINDOW
+    LOCUS_WINDOW_SIZES = (250_000, 500_000)
+    OVERVIEW_WINDOW = 500_000
+
+    # Colocalization ranking: GWAS window half-width around each STR locus
+    COLOC_DISTANCE = 500_000
+
+    # Distance clumping of Manhattan windows (?clump=<bp>, /api/clumps): the
+    # default distance, the smallest accepted one (which bounds the number of
+    # leads per window), the widest region the API clumps, and how many leads
+    # the plot labels
+    CLUMP_DISTANCE = 250_000
+    CLUMP_MIN_DISTANCE = 1_000
+    CLUMP_MAX_REGION = 10_000_000
+    CLUMP_LABELED_LEADS = 10
+
+    # POST /api/loci/batch: ids per request, and ids per IN (...) query
+    LOCI_BATCH_MAX_IDS = 50_000
+    LOCI_BATCH_CHUNK_SIZE = 500
+
+    # Overview grid thumbnails are static SVG bytes; browsers may reuse them
+    THUMBNAIL_CACHE_MAX_AGE = 3600
+
+    # In-memory trait list, loci and repeat_id index (src/database/catalog.py),
+    # compared against the databases every CATALOG_CHECK_SECONDS
+    CATALOG_ENABLED = True
+    CATALOG_CHECK_SECONDS = 5
+
+    # Production server (gunicorn -c gunicorn.conf.py wsgi:app): preforked
+    # worker processes, each serving SERVER_THREADS requests at a time
+    SERVER_WORKERS = int(
+        os.environ.get("WEB_CONCURRENCY", 2 * (os.cpu_count() or 1) + 1)
+    )
+    SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 4))
+    SERVER_TIMEOUT = 120
+    SERVER_GRACEFUL_TIMEOUT = 30
+
+    # Each worker writes its /metrics counters to METRICS_DIR at most every
+    # METRICS_SHARE_SECONDS; /metrics and the status panel sum all workers
+    METRICS_DIR = "cache/metrics"
+    METRICS_SHARE_SECONDS = 5
+
+    # Independent queries of one page run concurrently on a shared thread
+    # pool (src/utils/fanout.py); disable to run them one after another
+    FANOUT_ENABLED = True
+    FANOUT_WORKERS = 8
+
+    # Pre-rendered pages (flask --app app export-static) served while they
+    # match the databases; freshness is rechecked every few seconds
+    STATIC_SITE_DIR = "dist"
+    STATIC_SITE_CHECK_SECONDS = 5
+
+    # Rendered responses of these endpoints are cached in memory (up to
+    # RESPONSE_CACHE_MAX_BYTES) and in RESPONSE_CACHE_DIR (up to
+    # RESPONSE_CACHE_DISK_MAX_BYTES), shared by worker processes, until the
+    # databases change. Each endpoint maps to the query arguments it reads;
+    # requests with any other argument are not cached. Identical requests
+    # arriving while one is computed wait up to SINGLE_FLIGHT_TIMEOUT seconds.
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_ENDPOINTS = {
+        "plots.trait_overview": (),
+        "plots.locus_trait_overview": ("page", "sort"),
+        "plots.genome_manhattan": ("min_neg_log_p",),
+        "plots.manhattan_thumbnail": (),
+        "plots.manhattan_mini_plot": (),
+        "plots.locus_thumbnail": ("count_threshold",),
+        "plots.locus_mini_plot": ("count_threshold",),
+    }
+    RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    RESPONSE_CACHE_DIR = "cache/responses"
+    RESPONSE_CACHE_DISK_MAX_BYTES = 1024 * 1024 * 1024
+    RESPONSE_CACHE_CHECK_SECONDS = 5
+    SINGLE_FLIGHT_TIMEOUT = 60
+
+    # Cache warming (src/utils/warmup.py): after a worker starts, one worker
+    # replays WARMUP_URLS, the trait pages of WARMUP_TRAITS, the locus pages
+    # of WARMUP_LOCI and the WARMUP_TOP_N most requested pages, using at most
+    # WARMUP_CPU_FRACTION of a core and WARMUP_MAX_SECONDS in total
+    WARMUP_ENABLED = True
+    WARMUP_URLS = ()
+    WARMUP_TRAITS = ()
+    WARMUP_LOCI = ()
+    WARMUP_TOP_N = 50
+    WARMUP_DELAY_SECONDS = 2
+    WARMUP_CPU_FRACTION = 0.5
+    WARMUP_MAX_SECONDS = 300
+    WARMUP_STATUS_PATH = "cache/warmup.json"
+
+    # Requests to these endpoints are counted (per normalized URL) to pick the
+    # pages to warm; counts halve every WARMUP_STATS_HALF_LIFE seconds
+    WARMUP_ENDPOINTS = tuple(RESPONSE_CACHE_ENDPOINTS) + (
+        "plots.locus_plot_route",
+        "plots.manhattan_plot_route",
+        "plots.locus_phewas",
+    )
+    WARMUP_STATS_PATH = "cache/access_stats.json"
+    WARMUP_STATS_FLUSH_SECONDS = 60
+    WARMUP_STATS_HALF_LIFE = 7 * 24 * 3600
+
+    # Manhattan tile pyramid: zoom z splits a 2**TILE_SPAN_BITS bp chromosome
+    # span into 2**z tiles of TILE_BINS bins. Levels below TILE_RAW_ZOOM hold
+    # binned maxima in manhattan_tiles; deeper tiles return raw variants.
+    TILE_SPAN_BITS = 28
+    TILE_BINS = 256
+    TILE_RAW_ZOOM = 8
+    TILE_MAX_ZOOM = 16
+    TILE_CACHE_MAX_AGE = 3600
+
     # Trait name mapping for GWAS data
     TRAIT_NAME_MAPPING = {
         "corpuscular_haemoglobin": "mean_corpuscular_haemoglobin",
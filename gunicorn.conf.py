@@ -0,0 +1,51 @@
+"""
+gunicorn settings for STRXplorer
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker and thread counts come from Config (WEB_CONCURRENCY and
+SERVER_THREADS in the environment). Signals to the master:
+  HUP   reload the catalog from the databases and replace the workers
+  USR2  start a new master with new code (then send TERM to the old one)
+  TERM  graceful shutdown; workers finish their requests first
+"""
+import os
+import sys
+
+# gunicorn reads this file before the app directory is on sys.path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config  # noqa: E402
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = "gthread"
+
+# Import the app (and preload shared data) once in the master
+preload_app = True
+
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    """Drop metric files left by an earlier server before the workers start"""
+    from src.utils.metrics import reset_shared_metrics
+
+    reset_shared_metrics()
+
+
+def on_reload(server):
+    """Rebuild the shared catalog in the master before new workers fork"""
+    from src.database.catalog import preload_catalog
+
+    preload_catalog(force=True)
+
+
+def post_worker_init(worker):
+    """Warm the caches in the background as soon as a worker has booted"""
+    from src.utils.warmup import start_warmup
+
+    start_warmup(worker.wsgi)
@@ -0,0 +1,272 @@
+"""
+STR-GWAS colocalization ranking for STRXplorer
+Scores every STR locus of a trait by the GWAS signal around it with one
+sorted-array interval join per chromosome instead of one query per locus
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from src.database.models import (
+    get_gwas_trait_name,
+    get_str_loci_for_trait,
+    get_traits_with_loci_data,
+)
+from src.database.shards import gwas_db_path
+from src.database.utils import connect
+from src.utils.timing import phase, timed
+
+# Columns a ranking can be sorted by, with their direction (True = descending)
+SORT_KEYS = {
+    "max_neg_log_p": True,
+    "significant_count": True,
+    "variant_count": True,
+    "lead_distance": False,
+    "nearest_significant_distance": False,
+}
+
+COLUMNS = [
+    "trait",
+    "repeat_id",
+    "chrom",
+    "pos",
+    "motif",
+    "variant_count",
+    "max_neg_log_p",
+    "lead_variant_id",
+    "lead_pos",
+    "lead_distance",
+    "significant_count",
+    "nearest_significant_distance",
+]
+
+
+def load_chromosome_variants(conn, trait_name: str, chrom: str) -> pd.DataFrame:
+    """Positions and -log10(p) of one chromosome, sorted by position"""
+    # The (trait_name, chrom, pos) index returns rows already in position order
+    return pd.read_sql_query(
+        """
+        SELECT rowid AS variant_rowid, pos, neg_log_p
+        FROM gwas_variants
+        WHERE trait_name = ? AND chrom = ?
+        AND p_value IS NOT NULL AND neg_log_p IS NOT NULL
+        ORDER BY pos
+        """,
+        conn,
+        params=(trait_name, chrom),
+    )
+
+
+def window_statistics(
+    variant_pos: np.ndarray,
+    neg_log_p: np.ndarray,
+    locus_pos: np.ndarray,
+    distance: int,
+    significance: float,
+) -> Dict[str, np.ndarray]:
+    """
+    Interval-join sorted variants against loci on one chromosome
+
+    Each locus window [pos - distance, pos + distance] becomes a slice
+    [lo, hi) of the sorted variant arrays via searchsorted; counts come from
+    the slice bounds, significant counts from a cumulative sum, and window
+    maxima from one np.maximum.reduceat call.
+
+    Returns arrays aligned with locus_pos; lead_index is -1 for empty windows.
+    """
+    lo = np.searchsorted(variant_pos, locus_pos - distance, side="left")
+    hi = np.searchsorted(variant_pos, locus_pos + distance, side="right")
+    count = hi - lo
+
+    significant = neg_log_p >= significance
+    cumulative = np.concatenate(([0], np.cumsum(significant)))
+    significant_count = cumulative[hi] - cumulative[lo]
+
+    # reduceat over interleaved [lo, hi) bounds; the sentinel keeps hi == n valid
+    padded = np.append(neg_log_p, -np.inf)
+    bounds = np.column_stack((lo, hi)).ravel()
+    window_max = np.maximum.reduceat(padded, bounds)[::2]
+    window_max = np.where(count > 0, window_max, np.nan)
+
+    lead_index = np.full(len(locus_pos), -1, dtype=np.int64)
+    for i in np.flatnonzero(count):
+        lead_index[i] = lo[i] + int(np.argmax(neg_log_p[lo[i] : hi[i]]))
+
+    # Distance to the closest genome-wide significant variant, at any range
+    significant_pos = variant_pos[significant]
+    nearest = np.full(len(locus_pos), np.nan)
+    if len(significant_pos):
+        right = np.searchsorted(significant_pos, locus_pos)
+        left_distance = np.where(
+            right > 0,
+            locus_pos - significant_pos[np.maximum(right - 1, 0)],
+            np.inf,
+        )
+        right_distance = np.where(
+            right < len(significant_pos),
+            significant_pos[np.minimum(right, len(significant_pos) - 1)] - locus_pos,
+            np.inf,
+        )
+        nearest = np.minimum(left_distance, right_distance).astype(float)
+
+    return {
+        "variant_count": count,
+        "significant_count": significant_count,
+        "max_neg_log_p": window_max,
+        "lead_index": lead_index,
+        "nearest_significant_distance": nearest,
+    }
+
+
+def _lead_variant_ids(conn, rowids: List[int]) -> Dict[int, str]:
+    ids = {}
+    for start in range(0, len(rowids), 500):
+        chunk = rowids[start : start + 500]
+        cursor = conn.execute(
+            f"""
+            SELECT rowid, variant_id FROM gwas_variants
+            WHERE rowid IN ({",".join("?" * len(chunk))})
+            """,
+            chunk,
+        )
+        ids.update(cursor.fetchall())
+    return ids
+
+
+@timed("coloc_trait")
+def rank_trait_loci(
+    trait_name: str,
+    distance: Optional[int] = None,
+    significance: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    Colocalization statistics for every STR locus of one trait
+
+    Args:
+        trait_name: Locus database trait name (mapped to its GWAS name)
+        distance: Window half-width in bp (default Config.COLOC_DISTANCE)
+        significance: -log10(p) counted as significant (default p < 5e-8)
+
+    Returns:
+        One row per locus with COLUMNS; loci without variants in their
+        window have a variant_count of 0 and NaN maxima.
+    """
+    distance = Config.COLOC_DISTANCE if distance is None else distance
+    significance = (
+        Config.GENOME_HIT_NEG_LOG_P if significance is None else significance
+    )
+
+    loci = pd.DataFrame(get_str_loci_for_trait(trait_name))
+    if loci.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    loci = loci[loci["chrom"] != "Unknown"].reset_index(drop=True)
+    loci["trait"] = trait_name
+
+    gwas_trait_name = get_gwas_trait_name(trait_name)
+    for column in ("variant_count", "significant_count"):
+        loci[column] = 0
+    for column in ("max_neg_log_p", "lead_pos", "lead_distance"):
+        loci[column] = np.nan
+    loci["nearest_significant_distance"] = np.nan
+    loci["lead_variant_id"] = None
+
+    db_path = gwas_db_path(gwas_trait_name)
+    if not os.path.exists(db_path):
+        return loci[COLUMNS]
+
+    conn = connect(db_path)
+    try:
+        lead_rowids = {}
+        for chrom, group in loci.groupby("chrom"):
+            with phase("db_coloc_variants"):
+                variants = load_chromosome_variants(conn, gwas_trait_name, chrom)
+            if variants.empty:
+                continue
+
+            variant_pos = variants["pos"].to_numpy()
+            locus_pos = group["pos"].to_numpy()
+            with phase("coloc_join"):
+                stats = window_statistics(
+                    variant_pos,
+                    variants["neg_log_p"].to_numpy(dtype=float),
+                    locus_pos,
+                    distance,
+                    significance,
+                )
+
+            has_lead = stats["lead_index"] >= 0
+            lead_pos = np.where(
+                has_lead, variant_pos[np.maximum(stats["lead_index"], 0)], np.nan
+            )
+            loci.loc[group.index, "variant_count"] = stats["variant_count"]
+            loci.loc[group.index, "significant_count"] = stats["significant_count"]
+            loci.loc[group.index, "max_neg_log_p"] = stats["max_neg_log_p"]
+            loci.loc[group.index, "lead_pos"] = lead_pos
+            loci.loc[group.index, "lead_distance"] = np.abs(lead_pos - locus_pos)
+            loci.loc[group.index, "nearest_significant_distance"] = stats[
+                "nearest_significant_distance"
+            ]
+
+            rowids = variants["variant_rowid"].to_numpy()
+            for index, lead in zip(group.index[has_lead], stats["lead_index"][has_lead]):
+                lead_rowids[index] = int(rowids[lead])
+
+        ids = _lead_variant_ids(conn, sorted(set(lead_rowids.values())))
+        for index, rowid in lead_rowids.items():
+            loci.at[index, "lead_variant_id"] = ids.get(rowid)
+    finally:
+        conn.close()
+
+    for column in ("lead_pos", "lead_distance"):
+        loci[column] = loci[column].astype("Int64")
+    return loci[COLUMNS]
+
+
+def rank_colocalization(
+    traits: Optional[List[str]] = None,
+    distance: Optional[int] = None,
+    significance: Optional[float] = None,
+    sort: str = "max_neg_log_p",
+    limit: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Ranked colocalization table for some or all traits with STR loci
+
+    Rows are ordered by `sort` (one of SORT_KEYS), ties broken by the
+    number of significant variants and the lead variant's distance.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort}' (use one of {', '.join(SORT_KEYS)})")
+
+    if traits is None:
+        traits = [trait["trait"] for trait in get_traits_with_loci_data()]
+
+    tables = [rank_trait_loci(trait, distance, significance) for trait in traits]
+    tables = [table for table in tables if not table.empty]
+    if not tables:
+        return pd.DataFrame(columns=COLUMNS)
+    ranked = pd.concat(tables, ignore_index=True)
+
+    keys = [sort] + [
+        key for key in ("significant_count", "lead_distance") if key != sort
+    ]
+    ranked = ranked.sort_values(
+        keys,
+        ascending=[not SORT_KEYS[key] for key in keys],
+        na_position="last",
+        kind="stable",
+    ).reset_index(drop=True)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+
+    if limit is not None:
+        ranked = ranked.head(limit)
+    return ranked
+
+
+def ranking_records(ranked: pd.DataFrame) -> List[dict]:
+    """Ranked rows as JSON-ready dicts (NaN becomes None)"""
+    return json.loads(ranked.to_json(orient="records"))
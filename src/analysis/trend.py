@@ -0,0 +1,294 @@
+"""
+Dose-response trend statistics for STRXplorer
+Sample-count-weighted linear regression of mean phenotype on summed allele
+length, for every STR locus of a trait in one vectorized pass over a flat
+table of all their alleles
+"""
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from src.database.utils import connect
+from src.plots.locus import parse_allele_json
+from src.utils.timing import phase, timed
+
+# Columns a trend table can be sorted by, with their direction (True = descending)
+SORT_KEYS = {
+    "p_value": False,
+    "abs_slope": True,
+    "slope": True,
+    "allele_count": True,
+}
+
+COLUMNS = [
+    "repeat_id",
+    "allele_count",
+    "total_samples",
+    "slope",
+    "slope_se",
+    "t_stat",
+    "p_value",
+]
+
+_lgamma = np.vectorize(math.lgamma, otypes=[float])
+
+
+def _float_or_nan(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def allele_table(loci: Iterable[Tuple[object, str]]) -> Tuple[list, Dict[str, np.ndarray]]:
+    """
+    Decode (key, data_json) pairs into one flat table of alleles
+
+    Returns the keys of the loci that decoded, and parallel arrays with one
+    entry per allele: locus (index into the keys), length, count, mean,
+    ci_lower and ci_upper. Unparseable values become NaN.
+    """
+    keys = []
+    columns = {name: [] for name in ("locus", "length", "count", "mean", "ci_lower", "ci_upper")}
+    for key, data_json in loci:
+        try:
+            dosage_dict, mean_dict, ci_dict = parse_allele_json(data_json)
+        except (ValueError, TypeError) as e:
+            print(f"Skipping {key}: unreadable data_json ({e})")
+            continue
+
+        index = len(keys)
+        keys.append(key)
+        for allele, count in dosage_dict.items():
+            ci = ci_dict.get(allele) or [None, None]
+            columns["locus"].append(index)
+            columns["length"].append(_float_or_nan(allele))
+            columns["count"].append(_float_or_nan(count))
+            columns["mean"].append(_float_or_nan(mean_dict.get(allele)))
+            columns["ci_lower"].append(_float_or_nan(ci[0]))
+            columns["ci_upper"].append(_float_or_nan(ci[1]))
+
+    table = {
+        name: np.asarray(values, dtype=np.int64 if name == "locus" else float)
+        for name, values in columns.items()
+    }
+    return keys, table
+
+
+def _beta_continued_fraction(a, b, x, max_iterations=300, eps=1e-15):
+    """Continued fraction of the incomplete beta function (modified Lentz)"""
+    tiny = 1e-300
+
+    def clamp(v):
+        return np.where(np.abs(v) < tiny, tiny, v)
+
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c = np.ones_like(x)
+    d = 1.0 / clamp(1.0 - qab * x / qap)
+    h = d.copy()
+    for m in range(1, max_iterations + 1):
+        m2 = 2 * m
+        numerator = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 / clamp(1.0 + numerator * d)
+        c = clamp(1.0 + numerator / c)
+        h *= d * c
+
+        numerator = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 / clamp(1.0 + numerator * d)
+        c = clamp(1.0 + numerator / c)
+        delta = d * c
+        h *= delta
+        if np.all(np.abs(delta - 1.0) < eps):
+            break
+    return h
+
+
+def regularized_incomplete_beta(a, b, x) -> np.ndarray:
+    """I_x(a, b) elementwise for arrays of a, b > 0 and 0 <= x <= 1"""
+    a, b, x = (np.asarray(v, dtype=float) for v in np.broadcast_arrays(a, b, x))
+    result = np.full(x.shape, np.nan)
+    result[x <= 0] = 0.0
+    result[x >= 1] = 1.0
+
+    inside = (x > 0) & (x < 1) & (a > 0) & (b > 0)
+    if not inside.any():
+        return result
+    a, b, x = a[inside], b[inside], x[inside]
+
+    # The continued fraction converges quickly for x < (a + 1) / (a + b + 2);
+    # use I_x(a, b) = 1 - I_{1-x}(b, a) on the other side
+    flip = x > (a + 1.0) / (a + b + 2.0)
+    a, b, x = np.where(flip, b, a), np.where(flip, a, b), np.where(flip, 1.0 - x, x)
+
+    log_front = (
+        _lgamma(a + b) - _lgamma(a) - _lgamma(b) + a * np.log(x) + b * np.log1p(-x)
+    )
+    value = np.exp(log_front) * _beta_continued_fraction(a, b, x) / a
+    result[inside] = np.where(flip, 1.0 - value, value)
+    return result
+
+
+def t_test_p_value(t, df) -> np.ndarray:
+    """Two-sided p-value of Student's t statistics with df degrees of freedom"""
+    t = np.asarray(t, dtype=float)
+    df = np.asarray(df, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = df / (df + t * t)
+        p = regularized_incomplete_beta(df / 2.0, 0.5, np.where(np.isinf(t), 0.0, x))
+    return np.where((df > 0) & ~np.isnan(t), p, np.nan)
+
+
+def weighted_trend(
+    group: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    w: np.ndarray,
+    n_groups: int,
+) -> Dict[str, np.ndarray]:
+    """
+    Weighted least-squares slope of y on x within every group
+
+    All groups are fitted together with grouped sums (np.bincount). The
+    slope's standard error uses the weighted residual variance on k - 2
+    degrees of freedom, where k is the number of points in the group, and the
+    p-value is the two-sided t-test of slope = 0. Groups with fewer than two
+    distinct x values get NaN statistics; with exactly two points the slope
+    is defined but its error is not.
+    """
+    def grouped_sum(values):
+        return np.bincount(group, weights=values, minlength=n_groups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = np.bincount(group, minlength=n_groups)
+        total_weight = grouped_sum(w)
+        x_mean = grouped_sum(w * x) / total_weight
+        y_mean = grouped_sum(w * y) / total_weight
+
+        dx = x - x_mean[group]
+        dy = y - y_mean[group]
+        sxx = grouped_sum(w * dx * dx)
+        sxy = grouped_sum(w * dx * dy)
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+
+        residual = dy - slope[group] * dx
+        df = k - 2
+        residual_variance = np.where(
+            df > 0, grouped_sum(w * residual * residual) / df, np.nan
+        )
+        slope_se = np.sqrt(residual_variance / sxx)
+        t_stat = slope / slope_se
+
+    return {
+        "point_count": k,
+        "slope": slope,
+        "slope_se": slope_se,
+        "t_stat": t_stat,
+        "p_value": t_test_p_value(t_stat, df),
+    }
+
+
+@timed("trend_compute")
+def locus_trends(keys: list, table: Dict[str, np.ndarray], count_threshold: int) -> pd.DataFrame:
+    """
+    Dose-response trend of every locus in an allele_table at one count threshold
+
+    Alleles are kept under the same rules as filter_allele_data (at least
+    count_threshold samples and a mean and CI that are numbers), so
+    allele_count and total_samples match the locus summaries. The regression
+    weights each allele's mean phenotype by its sample count.
+
+    Returns one row per locus with at least one allele left, indexed by the
+    locus position in keys, with COLUMNS (repeat_id is the key).
+    """
+    keep = (
+        ~(table["count"] < count_threshold)
+        & ~np.isnan(table["mean"])
+        & ~np.isnan(table["ci_lower"])
+        & ~np.isnan(table["ci_upper"])
+    )
+    group = table["locus"][keep]
+    counts = table["count"][keep]
+    n_groups = len(keys)
+
+    allele_count = np.bincount(group, minlength=n_groups)
+    total_samples = np.bincount(group, weights=np.nan_to_num(counts), minlength=n_groups)
+
+    # Only alleles with a usable sample count carry weight in the fit
+    fit = np.isfinite(counts) & (counts > 0) & np.isfinite(table["length"][keep])
+    stats = weighted_trend(
+        group[fit],
+        table["length"][keep][fit],
+        table["mean"][keep][fit],
+        counts[fit],
+        n_groups,
+    )
+
+    present = np.flatnonzero(allele_count > 0)
+    return pd.DataFrame(
+        {
+            "repeat_id": [keys[i] for i in present],
+            "allele_count": allele_count[present],
+            "total_samples": total_samples[present].astype(np.int64),
+            "slope": stats["slope"][present],
+            "slope_se": stats["slope_se"][present],
+            "t_stat": stats["t_stat"][present],
+            "p_value": stats["p_value"][present],
+        },
+        index=present,
+    )
+
+
+def sort_trends(trends: pd.DataFrame, sort: str = "p_value") -> pd.DataFrame:
+    """Order a trend table by one of SORT_KEYS (NaN last, ties by |t|)"""
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key '{sort}' (use one of {', '.join(SORT_KEYS)})")
+
+    trends = trends.assign(abs_slope=trends["slope"].abs(), abs_t=trends["t_stat"].abs())
+    keys = [sort] + (["abs_t"] if sort != "abs_t" else [])
+    return (
+        trends.sort_values(
+            keys,
+            ascending=[not SORT_KEYS[sort], False],
+            na_position="last",
+            kind="stable",
+        )
+        .drop(columns=["abs_slope", "abs_t"])
+        .reset_index(drop=True)
+    )
+
+
+def compute_trait_trends(trait_name: str, count_threshold: Optional[int] = None) -> pd.DataFrame:
+    """
+    Trend table of one trait computed from locus_data (no stored trends needed)
+
+    Reads the trait's loci in one query, then fits all of them in one pass.
+    """
+    count_threshold = (
+        Config.OVERVIEW_COUNT_THRESHOLD if count_threshold is None else count_threshold
+    )
+    conn = connect(Config.LOCUS_DB_PATH)
+    try:
+        with phase("db_trend_loci"):
+            rows = conn.execute(
+                """
+                SELECT repeat_id, data_json FROM locus_data
+                WHERE (trait_name = ? OR phenotype = ?)
+                AND repeat_id IS NOT NULL AND data_json IS NOT NULL
+                ORDER BY chrom, pos
+            """,
+                (trait_name, trait_name),
+            ).fetchall()
+    finally:
+        conn.close()
+
+    keys, table = allele_table(rows)
+    return locus_trends(keys, table, count_threshold).reset_index(drop=True)
+
+
+def trend_records(trends: pd.DataFrame) -> List[dict]:
+    """Trend rows as JSON-ready dicts (NaN becomes None)"""
+    return json.loads(trends.to_json(orient="records"))
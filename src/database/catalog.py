@@ -0,0 +1,414 @@
+"""
+In-memory lookup catalog for STRXplorer
+The trait list, every STR locus row and the repeat_id index, loaded once per
+process. Under the prefork server the master loads it before forking, so the
+workers share one copy; it is rebuilt when the databases change.
+
+Locus rows are held column-wise in a NumPy structured array, with chromosome,
+motif and trait strings stored once each and referenced by integer code.
+Pages get lazy row mappings that format their display strings on access.
+"""
+import sys
+import threading
+import time
+from collections import namedtuple
+from collections.abc import MutableMapping, Sequence
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from src.database.utils import connect, database_fingerprint
+
+# One locus_data row as the pages see it; trait is trait_name or phenotype
+RawLocus = namedtuple("RawLocus", "repeat_id chrom pos motif ref_len trait")
+
+LOCUS_DTYPE = np.dtype(
+    [
+        ("chrom", np.int32),
+        ("pos", np.int64),  # -1 where pos is NULL
+        ("motif", np.int32),
+        ("ref_len", np.float64),  # NaN where ref_len is NULL
+        ("trait_name", np.int32),
+        ("phenotype", np.int32),
+    ]
+)
+
+
+def chrom_label(chrom) -> str:
+    return str(chrom).replace("chr", "") if chrom else "Unknown"
+
+
+def _location(prefix: str) -> Callable[[RawLocus], str]:
+    def location(raw: RawLocus) -> str:
+        if raw.chrom and raw.pos:
+            return f"{prefix}{str(raw.chrom).replace('chr', '')}:{raw.pos:,}"
+        return "Unknown"
+
+    return location
+
+
+_COMMON_FIELDS = {
+    "repeat_id": lambda raw: raw.repeat_id,
+    "chrom": lambda raw: chrom_label(raw.chrom),
+    "pos": lambda raw: int(raw.pos) if raw.pos is not None else 0,
+    "motif": lambda raw: raw.motif if raw.motif else "Unknown",
+    "ref_len": lambda raw: float(raw.ref_len) if raw.ref_len is not None else 0.0,
+}
+
+# Browse-page fields of a locus with its trait
+TRAIT_LOCUS_FIELDS = {
+    **_COMMON_FIELDS,
+    "trait": lambda raw: raw.trait if raw.trait else "Unknown",
+    "display_name": lambda raw: raw.trait.replace("_", " ").title()
+    if raw.trait
+    else "Unknown",
+    "location": _location("Chr"),
+}
+
+# Fields of a locus listed under one trait (overview pages)
+STR_LOCUS_FIELDS = {**_COMMON_FIELDS, "location": _location("chr")}
+
+
+def format_locus(fields: Dict[str, Callable], raw: RawLocus) -> dict:
+    """Every field of one locus as a plain dict"""
+    return {name: format_field(raw) for name, format_field in fields.items()}
+
+
+class LocusRow(MutableMapping):
+    """
+    One catalog locus as a dict-like row
+
+    Fields are formatted when read, so rows that are never rendered cost
+    nothing; keys set by the caller are kept on the row itself.
+    """
+
+    __slots__ = ("_catalog", "_index", "_fields", "_extra")
+
+    def __init__(self, catalog: "Catalog", index: int, fields: Dict[str, Callable]):
+        self._catalog = catalog
+        self._index = index
+        self._fields = fields
+        self._extra = None
+
+    def __getitem__(self, key):
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        if key in self._fields:
+            return self._fields[key](self._catalog.raw_locus(self._index))
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __iter__(self):
+        yield from self._fields
+        if self._extra is not None:
+            yield from (key for key in self._extra if key not in self._fields)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return f"LocusRow({dict(self)!r})"
+
+
+class LocusList(Sequence):
+    """Catalog rows selected by index, turned into LocusRows as they are read"""
+
+    def __init__(self, catalog: "Catalog", indexes: np.ndarray, fields: Dict[str, Callable]):
+        self._catalog = catalog
+        self._indexes = indexes
+        self._fields = fields
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return LocusList(self._catalog, self._indexes[item], self._fields)
+        return LocusRow(self._catalog, int(self._indexes[item]), self._fields)
+
+
+def _vocabulary(values: List) -> Tuple[tuple, np.ndarray]:
+    """Distinct values (strings interned) and each value's code"""
+    codes = {}
+    encoded = np.fromiter(
+        (codes.setdefault(value, len(codes)) for value in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    vocabulary = tuple(
+        sys.intern(value) if isinstance(value, str) else value for value in codes
+    )
+    return vocabulary, encoded
+
+
+class Catalog:
+    """Immutable snapshot of the lookup tables the pages query most"""
+
+    def __init__(
+        self,
+        available_traits: List[str],
+        traits_with_loci: List[dict],
+        loci: Iterable[tuple],
+        fingerprint: Dict[str, list],
+    ):
+        self.available_traits = tuple(available_traits)
+        self.traits_with_loci = tuple(traits_with_loci)
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+
+        # loci rows: (repeat_id, chrom, pos, motif, ref_len, trait_name, phenotype),
+        # ordered by chrom, pos like the per-trait queries
+        columns = list(zip(*loci)) or [()] * 7
+        repeat_ids, chroms, positions, motifs, ref_lens, trait_names, phenotypes = (
+            list(column) for column in columns
+        )
+
+        self.chroms, chrom_codes = _vocabulary(chroms)
+        self.motifs, motif_codes = _vocabulary(motifs)
+        self.traits, trait_codes = _vocabulary(trait_names + phenotypes)
+        self.none_trait = self.traits.index(None) if None in self.traits else -1
+
+        table = np.empty(len(repeat_ids), dtype=LOCUS_DTYPE)
+        table["chrom"] = chrom_codes
+        table["pos"] = [-1 if pos is None else pos for pos in positions]
+        table["motif"] = motif_codes
+        table["ref_len"] = [np.nan if value is None else value for value in ref_lens]
+        table["trait_name"] = trait_codes[: len(repeat_ids)]
+        table["phenotype"] = trait_codes[len(repeat_ids) :]
+        self.table = table
+
+        # repeat IDs as sorted UTF-8 bytes for binary search; id_rows maps
+        # them back to table rows and id_rank maps rows to them
+        encoded = np.array(
+            [str(repeat_id).encode() for repeat_id in repeat_ids], dtype=bytes
+        )
+        self.id_rows = np.argsort(encoded, kind="stable").astype(np.int32)
+        self.sorted_ids = encoded[self.id_rows]
+        self.id_rank = np.empty(len(table), dtype=np.int32)
+        self.id_rank[self.id_rows] = np.arange(len(table), dtype=np.int32)
+        del encoded
+
+        # Rows of each chromosome are contiguous, positions ascending within
+        bounds = np.flatnonzero(np.diff(table["chrom"])) + 1
+        starts = np.concatenate(([0], bounds)).astype(np.int64)
+        ends = np.concatenate((bounds, [len(table)])).astype(np.int64)
+        self.chrom_ranges = {
+            int(table["chrom"][start]): (int(start), int(end))
+            for start, end in zip(starts, ends)
+            if end > start
+        }
+
+        # Row indexes of each trait name, matched on trait_name or phenotype
+        rows = np.arange(len(table), dtype=np.int32)
+        keys = np.concatenate((table["trait_name"], table["phenotype"]))
+        members = np.concatenate((rows, rows))
+        keep = keys != self.none_trait
+        keep[len(table) :] &= table["phenotype"] != table["trait_name"]
+        keys, members = keys[keep], members[keep]
+        order = np.lexsort((members, keys))
+        keys, members = keys[order], members[order]
+        unique_keys, first = np.unique(keys, return_index=True)
+        self.by_trait = {
+            self.traits[key]: indexes
+            for key, indexes in zip(unique_keys, np.split(members, first[1:]))
+        }
+
+        # Rows with a trait (trait_name, else phenotype) for the browse page
+        self.trait_codes = np.where(
+            table["trait_name"] != self.none_trait,
+            table["trait_name"],
+            table["phenotype"],
+        )
+        self.trait_rows = np.flatnonzero(self.trait_codes != self.none_trait).astype(
+            np.int32
+        )
+
+    def __len__(self):
+        return len(self.table)
+
+    def raw_locus(self, index: int) -> RawLocus:
+        row = self.table[index]
+        pos = int(row["pos"])
+        ref_len = float(row["ref_len"])
+        return RawLocus(
+            self.sorted_ids[self.id_rank[index]].decode(),
+            self.chroms[row["chrom"]],
+            None if pos < 0 else pos,
+            self.motifs[row["motif"]],
+            None if np.isnan(ref_len) else ref_len,
+            self.traits[self.trait_codes[index]],
+        )
+
+    def find_repeat_id(self, repeat_id: str) -> np.ndarray:
+        """Row indexes of a repeat ID in chrom, pos order (binary search)"""
+        key = str(repeat_id).encode()
+        lo = np.searchsorted(self.sorted_ids, key, side="left")
+        hi = np.searchsorted(self.sorted_ids, key, side="right")
+        return np.sort(self.id_rows[lo:hi])
+
+    def locus_position(self, repeat_id: str) -> Tuple[Optional[str], Optional[int]]:
+        for index in self.find_repeat_id(repeat_id):
+            row = self.table[index]
+            if row["pos"] >= 0:
+                chrom = self.chroms[row["chrom"]]
+                return str(chrom).replace("chr", ""), int(row["pos"])
+        return None, None
+
+    def loci_in_region(self, chrom: str, start: int, end: int) -> LocusList:
+        """Loci with start <= pos <= end on a chromosome ("1" or "chr1")"""
+        label = chrom_label(chrom)
+        ranges = []
+        for code, value in enumerate(self.chroms):
+            if chrom_label(value) != label or code not in self.chrom_ranges:
+                continue
+            first, last = self.chrom_ranges[code]
+            positions = self.table["pos"][first:last]
+            lo = first + np.searchsorted(positions, start, side="left")
+            hi = first + np.searchsorted(positions, end, side="right")
+            ranges.append(np.arange(lo, hi, dtype=np.int32))
+        indexes = np.sort(np.concatenate(ranges)) if ranges else np.empty(0, np.int32)
+        return LocusList(self, indexes, TRAIT_LOCUS_FIELDS)
+
+    def loci_for_trait(self, trait_name: str) -> LocusList:
+        """Loci of one trait, with the overview page fields"""
+        indexes = self.by_trait.get(trait_name, np.empty(0, np.int32))
+        return LocusList(self, indexes, STR_LOCUS_FIELDS)
+
+    def has_other_loci(self, trait_name: str, repeat_id: str) -> bool:
+        """Whether a trait has loci with a repeat ID other than repeat_id"""
+        indexes = self.by_trait.get(trait_name)
+        if indexes is None:
+            return False
+        ids = self.sorted_ids[self.id_rank[indexes]]
+        return bool(np.any(ids != str(repeat_id).encode()))
+
+    def all_loci(self) -> LocusList:
+        """Loci that have a trait, with the browse page fields"""
+        return LocusList(self, self.trait_rows, TRAIT_LOCUS_FIELDS)
+
+    def loci_by_chromosome(self) -> Dict[str, LocusList]:
+        """all_loci grouped by chromosome label, in order of first appearance"""
+        codes = self.table["chrom"][self.trait_rows]
+        _, first = np.unique(codes, return_index=True)
+        groups = {}
+        for code in codes[np.sort(first)]:
+            groups.setdefault(chrom_label(self.chroms[code]), []).append(code)
+        return {
+            label: LocusList(
+                self, self.trait_rows[np.isin(codes, group)], TRAIT_LOCUS_FIELDS
+            )
+            for label, group in groups.items()
+        }
+
+    def locus_traits(self) -> List[str]:
+        """Distinct traits of all_loci"""
+        codes = np.unique(self.trait_codes[self.trait_rows])
+        return [self.traits[code] for code in codes if self.traits[code]]
+
+
+def load_locus_rows() -> List[tuple]:
+    conn = connect(Config.LOCUS_DB_PATH)
+    try:
+        return conn.execute(
+            """
+            SELECT repeat_id, chrom, pos, motif, ref_len, trait_name, phenotype
+            FROM locus_data
+            WHERE repeat_id IS NOT NULL
+            ORDER BY chrom, pos
+        """
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def build_catalog() -> Optional[Catalog]:
+    """Load a fresh catalog, or None if the databases cannot be read"""
+    from src.database.models import load_available_traits, load_traits_with_loci_data
+
+    started = time.time()
+    try:
+        fingerprint = database_fingerprint()
+        catalog = Catalog(
+            load_available_traits(),
+            load_traits_with_loci_data(),
+            load_locus_rows(),
+            fingerprint,
+        )
+    except Exception as e:
+        print(f"Error loading catalog: {e}")
+        return None
+
+    print(
+        f"Loaded catalog: {len(catalog.traits_with_loci)} traits, "
+        f"{len(catalog):,} loci in {time.time() - started:.2f}s"
+    )
+    return catalog
+
+
+_state = {"catalog": None, "checked_at": 0.0, "building": False}
+_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[Catalog]:
+    """
+    The current catalog, loaded on first use
+
+    Every Config.CATALOG_CHECK_SECONDS the database fingerprint is compared
+    with the one the catalog was built from, so trait updates made while the
+    app is running show up without a restart. One thread checks and rebuilds
+    outside the lock while the others keep using the previous catalog; the
+    lock only guards the swap. Returns None when the catalog is disabled or
+    unavailable (or still being loaded for the first time); callers then
+    query the databases directly.
+    """
+    if not Config.CATALOG_ENABLED:
+        return None
+
+    catalog = _state["catalog"]
+    if (
+        catalog is not None
+        and time.time() - _state["checked_at"] < Config.CATALOG_CHECK_SECONDS
+    ):
+        return catalog
+
+    with _lock:
+        if (
+            _state["building"]
+            or time.time() - _state["checked_at"] < Config.CATALOG_CHECK_SECONDS
+        ):
+            return _state["catalog"]
+        _state["building"] = True
+
+    try:
+        if catalog is None or catalog.fingerprint != database_fingerprint():
+            fresh = build_catalog()
+            with _lock:
+                _state["catalog"] = fresh
+    finally:
+        with _lock:
+            _state["checked_at"] = time.time()
+            _state["building"] = False
+    return _state["catalog"]
+
+
+def preload_catalog(force: bool = False) -> Optional[Catalog]:
+    """
+    Load the catalog now (in the server master before workers fork)
+
+    With force, rebuild even if the databases look unchanged.
+    """
+    if force:
+        with _lock:
+            _state["catalog"] = None
+            _state["checked_at"] = 0.0
+    return get_catalog()
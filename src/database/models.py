@@ -1,12 +1,23 @@
 """
 Database models and query functions for STRXplorer
 """
-import sqlite3
 import pandas as pd
 import os
 import math
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Sequence, Tuple, List
 from config import Config
+from src.database.catalog import (
+    STR_LOCUS_FIELDS,
+    TRAIT_LOCUS_FIELDS,
+    RawLocus,
+    format_locus,
+    get_catalog,
+)
+from src.database.schema import GENOME_REDUCTION_QUERY, significant_term, table_exists
+from src.database.shards import group_traits_by_db, gwas_db_path, gwas_db_paths, list_shards
+from src.database.utils import connect
+from src.utils.loader import get_loader
+from src.utils.timing import timed
 
 
 def get_gwas_trait_name(trait_name):
@@ -28,28 +39,19 @@ def get_gwas_trait_name(trait_name):
     return trait_mapping.get(trait_name, trait_name)
 
 
+@timed("db_locus_info")
 def get_locus_info_from_repeat_id(
     repeat_id: str,
 ) -> Tuple[Optional[str], Optional[int]]:
     """Get chromosome and position for a repeat_id"""
-    try:
-        conn = sqlite3.connect(Config.LOCUS_DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT chrom, pos
-            FROM locus_data
-            WHERE repeat_id = ?
-        """,
-            (repeat_id,),
-        )
-
-        result = cursor.fetchone()
-        conn.close()
+    catalog = get_catalog()
+    if catalog is not None:
+        return catalog.locus_position(repeat_id)
 
-        if result:
-            chrom, pos = result
+    try:
+        row = get_locus_row(repeat_id)
+        if row:
+            chrom, pos = row[0], row[1]
             # Ensure chromosome format is consistent (remove 'chr' prefix if present)
             chrom_clean = str(chrom).replace("chr", "")
             return chrom_clean, int(pos)
@@ -61,26 +63,141 @@ def get_locus_info_from_repeat_id(
         return None, None
 
 
+def significance_clause(min_neg_log_p: Optional[float]) -> Tuple[str, tuple]:
+    """
+    SQL condition and parameters keeping variants with neg_log_p >= min_neg_log_p
+
+    Thresholds at or above Config.SIGNIFICANT_NEG_LOG_P_FLOOR repeat the
+    partial index term, so SQLite reads only the significant rows.
+    """
+    if min_neg_log_p is None:
+        return "", ()
+    clause = " AND neg_log_p >= ?"
+    if min_neg_log_p >= Config.SIGNIFICANT_NEG_LOG_P_FLOOR:
+        clause = f" AND {significant_term()}" + clause
+    return clause, (min_neg_log_p,)
+
+
+@timed("db_locus_rows")
+def load_locus_rows_by_id(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], tuple]:
+    """
+    Batch function for get_locus_row(): the first locus_data row of each
+    (db_path, repeat_id), one IN (...) query per chunk of ids
+
+    Rows are (chrom, pos, data_json, phenotype, trait_name); "first" is in
+    rowid order, which is what a `WHERE repeat_id = ?` lookup returns.
+    """
+    repeat_ids_by_db = {}
+    for db_path, repeat_id in keys:
+        repeat_ids_by_db.setdefault(db_path, []).append(repeat_id)
+
+    rows = {}
+    chunk_size = Config.LOCI_BATCH_CHUNK_SIZE
+    for db_path, repeat_ids in repeat_ids_by_db.items():
+        conn = connect(db_path)
+        try:
+            for start in range(0, len(repeat_ids), chunk_size):
+                chunk = repeat_ids[start : start + chunk_size]
+                cursor = conn.execute(
+                    f"""
+                    SELECT repeat_id, chrom, pos, data_json, phenotype, trait_name
+                    FROM locus_data
+                    WHERE repeat_id IN ({",".join("?" * len(chunk))})
+                    ORDER BY rowid
+                """,
+                    chunk,
+                )
+                for repeat_id, *row in cursor.fetchall():
+                    rows.setdefault((db_path, repeat_id), tuple(row))
+        finally:
+            conn.close()
+    return rows
+
+
+def get_locus_row(repeat_id: str, db_path: Optional[str] = None) -> Optional[tuple]:
+    """
+    locus_data row (chrom, pos, data_json, phenotype, trait_name) of a repeat_id
+
+    Loaded at most once per request (see src/utils/loader.py); None if the
+    repeat_id has no rows.
+    """
+    return get_loader().load(
+        load_locus_rows_by_id, (db_path or Config.LOCUS_DB_PATH, repeat_id)
+    )
+
+
+def prefetch_locus_rows(repeat_ids: List[str], db_path: Optional[str] = None):
+    """Load the locus_data rows of many repeat_ids for this request in one batch"""
+    db_path = db_path or Config.LOCUS_DB_PATH
+    get_loader().load_many(
+        load_locus_rows_by_id, [(db_path, repeat_id) for repeat_id in repeat_ids]
+    )
+
+
+@timed("db_trait_metadata")
+def load_trait_metadata(db_paths: List[str]) -> Dict[str, Dict[str, int]]:
+    """Batch function for get_trait_metadata(): trait_metadata of each database"""
+    metadata = {}
+    for db_path in db_paths:
+        conn = connect(db_path)
+        try:
+            metadata[db_path] = dict(
+                conn.execute(
+                    "SELECT trait_name, total_variants FROM trait_metadata"
+                ).fetchall()
+            )
+        finally:
+            conn.close()
+    return metadata
+
+
+def get_trait_metadata() -> Dict[str, int]:
+    """
+    trait_name -> total_variants of the Manhattan database and its shards,
+    read once per request for both the trait list and trait availability
+    checks (a sharded trait's count comes only from its shard)
+    """
+    metadata = {}
+    for db_path, traits in get_loader().load_many(
+        load_trait_metadata, gwas_db_paths()
+    ).items():
+        metadata.update(
+            (trait, count)
+            for trait, count in traits.items()
+            if gwas_db_path(trait) == db_path
+        )
+    return metadata
+
+
+@timed("db_manhattan_data")
 def query_manhattan_data(
-    trait_name: str, chrom: str, start_pos: int, end_pos: int
+    trait_name: str,
+    chrom: str,
+    start_pos: int,
+    end_pos: int,
+    min_neg_log_p: Optional[float] = None,
 ) -> pd.DataFrame:
-    """Query Manhattan plot data from database"""
-    if not os.path.exists(Config.MANHATTAN_DB_PATH):
+    """Query Manhattan plot data from database, optionally significant variants only"""
+    db_path = gwas_db_path(trait_name)
+    if not os.path.exists(db_path):
         return pd.DataFrame()
 
     try:
-        conn = sqlite3.connect(Config.MANHATTAN_DB_PATH)
+        conn = connect(db_path)
 
-        query = """
+        significance, significance_params = significance_clause(min_neg_log_p)
+        query = f"""
             SELECT chrom, pos, variant_id, p_value, neg_log_p, beta, se
             FROM gwas_variants
             WHERE trait_name = ? AND chrom = ? AND pos BETWEEN ? AND ?
-            AND p_value IS NOT NULL AND neg_log_p IS NOT NULL
+            AND p_value IS NOT NULL AND neg_log_p IS NOT NULL{significance}
             ORDER BY pos
         """
 
         df = pd.read_sql_query(
-            query, conn, params=(trait_name, chrom, start_pos, end_pos)
+            query,
+            conn,
+            params=(trait_name, chrom, start_pos, end_pos, *significance_params),
         )
         conn.close()
 
@@ -91,28 +208,95 @@ def query_manhattan_data(
         return pd.DataFrame()
 
 
-def check_trait_availability(trait_name: str) -> Tuple[bool, str]:
-    """Check if a trait is available in the database"""
-    if not os.path.exists(Config.MANHATTAN_DB_PATH):
-        return False, "Manhattan database not found"
+@timed("db_window_counts")
+def get_window_variant_counts(
+    trait_name: str,
+    chrom: str,
+    start_pos: int,
+    end_pos: int,
+    min_neg_log_p: float = Config.GENOME_HIT_NEG_LOG_P,
+) -> Tuple[int, int]:
+    """
+    Total and significant variant counts of a window without reading its rows
+
+    Counts the same rows the window queries plot (variants with a p-value),
+    the total from the (trait_name, chrom, pos) index range and the
+    significant count from the partial index. Returns (0, 0) if the database
+    is missing.
+    """
+    db_path = gwas_db_path(trait_name)
+    if not os.path.exists(db_path):
+        return 0, 0
 
     try:
-        conn = sqlite3.connect(Config.MANHATTAN_DB_PATH)
-        cursor = conn.cursor()
+        conn = connect(db_path)
+        try:
+            window = (
+                "WHERE trait_name = ? AND chrom = ? AND pos BETWEEN ? AND ?"
+                " AND p_value IS NOT NULL AND neg_log_p IS NOT NULL"
+            )
+            params = (trait_name, chrom, start_pos, end_pos)
+
+            (total,) = conn.execute(
+                f"SELECT COUNT(*) FROM gwas_variants {window}", params
+            ).fetchone()
+            significance, significance_params = significance_clause(min_neg_log_p)
+            (significant,) = conn.execute(
+                f"SELECT COUNT(*) FROM gwas_variants {window}{significance}",
+                params + significance_params,
+            ).fetchone()
+        finally:
+            conn.close()
+        return total, significant
 
-        cursor.execute(
-            """
-            SELECT total_variants FROM trait_metadata 
+    except Exception as e:
+        print(f"Error counting window variants: {e}")
+        return 0, 0
+
+
+@timed("db_significant_variants")
+def get_significant_variants(trait_name: str, min_neg_log_p: float) -> pd.DataFrame:
+    """
+    Every variant of a trait with neg_log_p >= min_neg_log_p, genome-wide
+
+    Same columns as get_genome_reduction() (all rows are kind 'hit').
+    """
+    db_path = gwas_db_path(trait_name)
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+
+    try:
+        conn = connect(db_path)
+        significance, significance_params = significance_clause(min_neg_log_p)
+        df = pd.read_sql_query(
+            f"""
+            SELECT chrom, pos, variant_id, p_value, neg_log_p, 'hit' AS kind
+            FROM gwas_variants
             WHERE trait_name = ?
+            AND p_value IS NOT NULL AND neg_log_p IS NOT NULL{significance}
         """,
-            (trait_name,),
+            conn,
+            params=(trait_name, *significance_params),
         )
-
-        result = cursor.fetchone()
         conn.close()
+        return df
 
-        if result:
-            return True, f"Available ({result[0]:,} variants)"
+    except Exception as e:
+        print(f"Error querying significant variants: {e}")
+        return pd.DataFrame()
+
+
+@timed("db_trait_availability")
+def check_trait_availability(trait_name: str) -> Tuple[bool, str]:
+    """Check if a trait is available in the database"""
+    if not os.path.exists(gwas_db_path(trait_name)):
+        return False, "Manhattan database not found"
+
+    try:
+        metadata = get_trait_metadata()
+
+        if trait_name in metadata:
+            return True, f"Available ({metadata[trait_name]:,} variants)"
         else:
             return False, "Not in database"
 
@@ -120,30 +304,39 @@ def check_trait_availability(trait_name: str) -> Tuple[bool, str]:
         return False, f"Error: {e}"
 
 
+@timed("db_available_traits")
 def get_available_traits() -> List[str]:
     """Get list of traits available in the database"""
-    if not os.path.exists(Config.MANHATTAN_DB_PATH):
-        return []
+    catalog = get_catalog()
+    if catalog is not None:
+        return list(catalog.available_traits)
+    return load_available_traits()
 
-    try:
-        conn = sqlite3.connect(Config.MANHATTAN_DB_PATH)
-        cursor = conn.cursor()
 
-        cursor.execute("SELECT trait_name FROM trait_metadata ORDER BY trait_name")
-        traits = [row[0] for row in cursor.fetchall()]
+def load_available_traits() -> List[str]:
+    if not gwas_db_paths():
+        return []
 
-        conn.close()
-        return traits
+    try:
+        return sorted(get_trait_metadata())
 
     except Exception as e:
         print(f"Error getting available traits: {e}")
         return []
 
 
+@timed("db_traits_with_loci")
 def get_traits_with_loci_data() -> List[dict]:
     """Get traits with data availability from locus database"""
+    catalog = get_catalog()
+    if catalog is not None:
+        return [dict(trait) for trait in catalog.traits_with_loci]
+    return load_traits_with_loci_data()
+
+
+def load_traits_with_loci_data() -> List[dict]:
     try:
-        conn = sqlite3.connect(Config.LOCUS_DB_PATH)
+        conn = connect(Config.LOCUS_DB_PATH)
         cursor = conn.execute(
             """
             SELECT DISTINCT 
@@ -166,8 +359,9 @@ def get_traits_with_loci_data() -> List[dict]:
             gwas_trait_name = get_gwas_trait_name(trait)
             has_manhattan_data = False
 
-            if os.path.exists(Config.MANHATTAN_DB_PATH):
-                manhattan_conn = sqlite3.connect(Config.MANHATTAN_DB_PATH)
+            manhattan_db_path = gwas_db_path(gwas_trait_name)
+            if os.path.exists(manhattan_db_path):
+                manhattan_conn = connect(manhattan_db_path)
                 manhattan_cursor = manhattan_conn.execute(
                     "SELECT COUNT(*) FROM gwas_variants WHERE trait_name = ?",
                     (gwas_trait_name,),
@@ -195,10 +389,29 @@ def get_traits_with_loci_data() -> List[dict]:
         return []
 
 
-def get_all_str_loci() -> List[dict]:
+def format_trait_locus(repeat_id, chrom, pos, motif, ref_len, trait) -> dict:
+    """Browse-page row for one locus_data row (trait = trait_name or phenotype)"""
+    return format_locus(
+        TRAIT_LOCUS_FIELDS, RawLocus(repeat_id, chrom, pos, motif, ref_len, trait)
+    )
+
+
+def format_str_locus(repeat_id, chrom, pos, motif, ref_len) -> dict:
+    """Per-trait locus entry used by the overview pages"""
+    return format_locus(
+        STR_LOCUS_FIELDS, RawLocus(repeat_id, chrom, pos, motif, ref_len, None)
+    )
+
+
+@timed("db_all_loci")
+def get_all_str_loci() -> Sequence[dict]:
     """Get all STR loci with their trait associations"""
+    catalog = get_catalog()
+    if catalog is not None:
+        return catalog.all_loci()
+
     try:
-        conn = sqlite3.connect(Config.LOCUS_DB_PATH)
+        conn = connect(Config.LOCUS_DB_PATH)
         cursor = conn.execute(
             """
             SELECT repeat_id, chrom, pos, motif, ref_len,
@@ -210,27 +423,7 @@ def get_all_str_loci() -> List[dict]:
         """
         )
 
-        loci_info = []
-        for row in cursor.fetchall():
-            repeat_id, chrom, pos, motif, ref_len, trait = row
-
-            # Handle None values properly
-            loci_info.append(
-                {
-                    "repeat_id": repeat_id,
-                    "chrom": str(chrom).replace("chr", "") if chrom else "Unknown",
-                    "pos": int(pos) if pos is not None else 0,
-                    "motif": motif if motif else "Unknown",
-                    "ref_len": float(ref_len) if ref_len is not None else 0.0,
-                    "trait": trait if trait else "Unknown",
-                    "display_name": trait.replace("_", " ").title()
-                    if trait
-                    else "Unknown",
-                    "location": f"Chr{str(chrom).replace('chr', '')}:{pos:,}"
-                    if chrom and pos
-                    else "Unknown",
-                }
-            )
+        loci_info = [format_trait_locus(*row) for row in cursor.fetchall()]
 
         conn.close()
         return loci_info
@@ -240,10 +433,37 @@ def get_all_str_loci() -> List[dict]:
         return []
 
 
-def get_str_loci_for_trait(trait_name: str) -> List[dict]:
+@timed("db_loci_by_chrom")
+def get_str_loci_by_chromosome() -> Tuple[Dict[str, Sequence[dict]], List[str]]:
+    """
+    All STR loci with a trait, grouped by chromosome, and the traits they cover
+
+    From the catalog the groups are lazy sequences, so a locus's display
+    strings are only built when the page renders it.
+    """
+    catalog = get_catalog()
+    if catalog is not None:
+        loci_by_chrom = catalog.loci_by_chromosome()
+        traits = catalog.locus_traits()
+    else:
+        loci_by_chrom = {}
+        traits = set()
+        for locus in get_all_str_loci():
+            loci_by_chrom.setdefault(locus["chrom"], []).append(locus)
+            traits.add(locus["trait"])
+
+    return loci_by_chrom, sorted(trait for trait in traits if trait != "Unknown")
+
+
+@timed("db_trait_loci")
+def get_str_loci_for_trait(trait_name: str) -> Sequence[dict]:
     """Get all STR loci for a specific trait"""
+    catalog = get_catalog()
+    if catalog is not None:
+        return catalog.loci_for_trait(trait_name)
+
     try:
-        conn = sqlite3.connect(Config.LOCUS_DB_PATH)
+        conn = connect(Config.LOCUS_DB_PATH)
         cursor = conn.execute(
             """
             SELECT repeat_id, chrom, pos, motif, ref_len 
@@ -255,10 +475,100 @@ def get_str_loci_for_trait(trait_name: str) -> List[dict]:
             (trait_name, trait_name),
         )
 
-        str_loci = []
+        str_loci = [format_str_locus(*row) for row in cursor.fetchall()]
+        conn.close()
+        return str_loci
+
+    except Exception as e:
+        print(f"Error accessing locus database: {e}")
+        return []
+
+
+# ORDER BY clauses of the locus overview sorts; "trend" needs locus_trend
+LOCUS_SUMMARY_ORDER = {
+    "effect": "s.abs_mean_effect DESC",
+    "trend": "t.p_value IS NULL, t.p_value, ABS(t.t_stat) DESC, s.abs_mean_effect DESC",
+}
+
+
+@timed("db_locus_summaries")
+def get_locus_summaries(
+    trait_name: str,
+    count_threshold: int,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    sort: str = "effect",
+) -> Optional[Tuple[List[dict], int]]:
+    """
+    Page of precomputed locus summaries for a trait
+
+    sort "effect" puts the largest |mean effect| first; "trend" puts the most
+    significant dose-response trend first (loci without one last). Each locus
+    carries its trend slope, slope_se and p_value when locus_trend has them.
+
+    Returns (loci, total_count), or None if the locus database has no
+    locus_summary table (or no locus_trend table for "trend") or no
+    summaries at this threshold.
+    """
+    try:
+        conn = connect(Config.LOCUS_DB_PATH)
+        has_trends = table_exists(conn, "locus_trend")
+        if not table_exists(conn, "locus_summary") or (
+            sort == "trend" and not has_trends
+        ):
+            conn.close()
+            return None
+
+        total = conn.execute(
+            """
+            SELECT COUNT(*) FROM locus_summary
+            WHERE trait = ? AND count_threshold = ?
+        """,
+            (trait_name, count_threshold),
+        ).fetchone()[0]
+
+        trend_columns = "t.slope, t.slope_se, t.p_value" if has_trends else "NULL, NULL, NULL"
+        trend_join = (
+            """
+            LEFT JOIN locus_trend t ON t.trait = s.trait
+                AND t.count_threshold = s.count_threshold
+                AND t.repeat_id = s.repeat_id
+            """
+            if has_trends
+            else ""
+        )
+        cursor = conn.execute(
+            f"""
+            SELECT s.repeat_id, l.chrom, l.pos, l.motif, l.ref_len,
+                   s.allele_count, s.total_samples, s.mean_effect, {trend_columns}
+            FROM locus_summary s
+            JOIN locus_data l ON l.rowid = (
+                SELECT rowid FROM locus_data WHERE repeat_id = s.repeat_id LIMIT 1
+            )
+            {trend_join}
+            WHERE s.trait = ? AND s.count_threshold = ?
+            ORDER BY {LOCUS_SUMMARY_ORDER[sort]}
+            LIMIT ? OFFSET ?
+        """,
+            (trait_name, count_threshold, -1 if limit is None else limit, offset),
+        )
+
+        loci = []
         for row in cursor.fetchall():
-            repeat_id, chrom, pos, motif, ref_len = row
-            str_loci.append(
+            (
+                repeat_id,
+                chrom,
+                pos,
+                motif,
+                ref_len,
+                allele_count,
+                total_samples,
+                mean_effect,
+                slope,
+                slope_se,
+                p_value,
+            ) = row
+            loci.append(
                 {
                     "repeat_id": repeat_id,
                     "chrom": str(chrom).replace("chr", "") if chrom else "Unknown",
@@ -268,55 +578,386 @@ def get_str_loci_for_trait(trait_name: str) -> List[dict]:
                     "location": f"chr{str(chrom).replace('chr', '')}:{pos:,}"
                     if chrom and pos
                     else "Unknown",
+                    "allele_count": allele_count,
+                    "total_samples": total_samples,
+                    "mean_effect": mean_effect,
+                    "slope": slope,
+                    "slope_se": slope_se,
+                    "p_value": p_value,
                 }
             )
         conn.close()
-        return str_loci
+
+        if total == 0:
+            return None
+        return loci, total
 
     except Exception as e:
-        print(f"Error accessing locus database: {e}")
-        return []
+        print(f"Error reading locus summaries: {e}")
+        return None
+
+
+@timed("db_locus_trends")
+def get_locus_trends(trait_name: str, count_threshold: int) -> Optional[pd.DataFrame]:
+    """
+    Stored dose-response trends of a trait's loci at one count threshold
+
+    Returns a DataFrame with the trend columns, or None if the locus database
+    has no locus_trend table or no trends for this trait and threshold.
+    """
+    try:
+        conn = connect(Config.LOCUS_DB_PATH)
+        if not table_exists(conn, "locus_trend"):
+            conn.close()
+            return None
+
+        trends = pd.read_sql_query(
+            """
+            SELECT repeat_id, allele_count, total_samples,
+                   slope, slope_se, t_stat, p_value
+            FROM locus_trend
+            WHERE trait = ? AND count_threshold = ?
+        """,
+            conn,
+            params=(trait_name, count_threshold),
+        )
+        conn.close()
+        return trends if not trends.empty else None
+
+    except Exception as e:
+        print(f"Error loading locus trends: {e}")
+        return None
+
+
+@timed("db_locus_windows")
+def get_locus_window_summaries(
+    trait_name: str, window_size: int
+) -> Optional[List[dict]]:
+    """
+    Precomputed GWAS window statistics for a trait's STR loci, strongest first
+
+    Only loci with variants in the window are returned. Returns None if the
+    Manhattan database has no locus_window_summary table or no rows for the
+    trait at this window size.
+    """
+    db_path = gwas_db_path(trait_name)
+    if not os.path.exists(db_path):
+        return None
+
+    try:
+        conn = connect(db_path)
+        if not table_exists(conn, "locus_window_summary"):
+            conn.close()
+            return None
+
+        cursor = conn.execute(
+            """
+            SELECT repeat_id, variant_count, max_neg_log_p, lead_variant_id,
+                   lead_pos, significant_count
+            FROM locus_window_summary
+            WHERE trait_name = ? AND window_size = ?
+            ORDER BY max_neg_log_p DESC
+        """,
+            (trait_name, window_size),
+        )
+
+        summaries = []
+        for row in cursor.fetchall():
+            (
+                repeat_id,
+                variant_count,
+                max_neg_log_p,
+                lead_variant_id,
+                lead_pos,
+                significant_count,
+            ) = row
+            summaries.append(
+                {
+                    "repeat_id": repeat_id,
+                    "variant_count": variant_count,
+                    "max_significance": max_neg_log_p or 0,
+                    "lead_variant_id": lead_variant_id,
+                    "lead_pos": lead_pos,
+                    "significant_count": significant_count,
+                }
+            )
+        conn.close()
+        return summaries or None
+
+    except Exception as e:
+        print(f"Error reading locus window summaries: {e}")
+        return None
+
+
+@timed("db_locus_trait_windows")
+def get_locus_window_statistics(
+    repeat_id: str,
+    chrom: str,
+    pos: int,
+    trait_names: List[str],
+    window_size: int,
+) -> dict:
+    """
+    GWAS statistics in the window around one locus for several traits
+
+    Reads the precomputed STR window summaries in one query per database
+    (the main one and any shards the traits are routed to); traits without
+    summaries are counted from gwas_variants in one grouped range query.
+    Returns {gwas_trait_name: stats} for traits with variants in the window.
+    """
+    stats = {}
+    for db_path, traits in group_traits_by_db(trait_names).items():
+        if os.path.exists(db_path):
+            _read_window_statistics(
+                db_path, repeat_id, chrom, pos, traits, window_size, stats
+            )
+    return stats
+
+
+def _read_window_statistics(
+    db_path: str,
+    repeat_id: str,
+    chrom: str,
+    pos: int,
+    trait_names: List[str],
+    window_size: int,
+    stats: dict,
+):
+    """Add the window statistics of traits stored in one database to stats"""
+    try:
+        conn = connect(db_path)
+        placeholders = ",".join("?" * len(trait_names))
+
+        if table_exists(conn, "locus_window_summary"):
+            cursor = conn.execute(
+                f"""
+                SELECT trait_name, variant_count, max_neg_log_p, lead_variant_id,
+                       lead_pos, significant_count
+                FROM locus_window_summary
+                WHERE trait_name IN ({placeholders})
+                AND window_size = ? AND repeat_id = ?
+            """,
+                (*trait_names, window_size, repeat_id),
+            )
+            for row in cursor.fetchall():
+                trait, variant_count, max_neg_log_p, lead_id, lead_pos, sig_count = row
+                stats[trait] = {
+                    "variant_count": variant_count,
+                    "max_significance": max_neg_log_p or 0,
+                    "lead_variant_id": lead_id,
+                    "lead_pos": lead_pos,
+                    "significant_count": sig_count,
+                }
+
+        missing = [t for t in trait_names if t not in stats]
+        if missing and chrom is not None and pos is not None:
+            placeholders = ",".join("?" * len(missing))
+            cursor = conn.execute(
+                f"""
+                SELECT trait_name, COUNT(*), MAX(neg_log_p), variant_id, pos,
+                       SUM(neg_log_p >= ?)
+                FROM gwas_variants
+                WHERE trait_name IN ({placeholders}) AND chrom = ?
+                AND pos BETWEEN ? AND ?
+                AND p_value IS NOT NULL AND neg_log_p IS NOT NULL
+                GROUP BY trait_name
+            """,
+                (
+                    Config.GENOME_HIT_NEG_LOG_P,
+                    *missing,
+                    chrom,
+                    max(0, pos - window_size),
+                    pos + window_size,
+                ),
+            )
+            # The bare columns come from the row holding MAX(neg_log_p)
+            for row in cursor.fetchall():
+                trait, variant_count, max_neg_log_p, lead_id, lead_pos, sig_count = row
+                stats[trait] = {
+                    "variant_count": variant_count,
+                    "max_significance": max_neg_log_p or 0,
+                    "lead_variant_id": lead_id,
+                    "lead_pos": lead_pos,
+                    "significant_count": sig_count or 0,
+                }
+        conn.close()
+
+    except Exception as e:
+        print(f"Error reading locus window statistics: {e}")
+
+
+@timed("db_genome_reduction")
+def get_genome_reduction(trait_name: str) -> pd.DataFrame:
+    """
+    Genome-wide Manhattan points for a trait from the genome_reduction table
+
+    Databases built before the table existed fall back to computing the same
+    reduction from gwas_variants, which scans the whole trait.
+    """
+    db_path = gwas_db_path(trait_name)
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+
+    try:
+        conn = connect(db_path)
+        df = pd.DataFrame()
+        if table_exists(conn, "genome_reduction"):
+            df = pd.read_sql_query(
+                """
+                SELECT chrom, pos, variant_id, p_value, neg_log_p, kind
+                FROM genome_reduction
+                WHERE trait_name = ?
+            """,
+                conn,
+                params=(trait_name,),
+            )
+
+        if df.empty:
+            print(f"No genome_reduction rows for {trait_name}, computing from gwas_variants")
+            df = pd.read_sql_query(
+                GENOME_REDUCTION_QUERY,
+                conn,
+                params={
+                    "trait": trait_name,
+                    "hit_neg_log_p": Config.GENOME_HIT_NEG_LOG_P,
+                    "bin_size": Config.GENOME_BIN_SIZE,
+                },
+            ).drop(columns=["trait_name"])
+        conn.close()
+        return df
+
+    except Exception as e:
+        print(f"Error querying genome reduction: {e}")
+        return pd.DataFrame()
+
+
+@timed("db_tile")
+def get_manhattan_tile(trait_name: str, chrom: str, zoom: int, x: int) -> dict:
+    """
+    One Manhattan tile: column arrays of the points in tile x at zoom level
+
+    Levels below Config.TILE_RAW_ZOOM return the lead variant of each bin
+    from manhattan_tiles (computed from gwas_variants when the trait has no
+    pyramid yet); deeper levels return the raw variants in the tile.
+    """
+    tile_bits = Config.TILE_SPAN_BITS - zoom
+    bin_bits = tile_bits - int(math.log2(Config.TILE_BINS))
+    start = x << tile_bits
+    end = ((x + 1) << tile_bits) - 1
+    tile = {
+        "trait": trait_name,
+        "chrom": chrom,
+        "z": zoom,
+        "x": x,
+        "start": start,
+        "end": end,
+        "raw": zoom >= Config.TILE_RAW_ZOOM,
+        "pos": [],
+        "variant_id": [],
+        "neg_log_p": [],
+    }
+    db_path = gwas_db_path(trait_name)
+    if not os.path.exists(db_path):
+        return tile
+
+    try:
+        conn = connect(db_path)
+        has_pyramid = (
+            not tile["raw"]
+            and table_exists(conn, "manhattan_tiles")
+            and conn.execute(
+                """
+                SELECT 1 FROM manhattan_tiles
+                WHERE trait_name = ? AND chrom = ? AND zoom = ? LIMIT 1
+            """,
+                (trait_name, chrom, zoom),
+            ).fetchone()
+            is not None
+        )
+
+        if tile["raw"]:
+            cursor = conn.execute(
+                """
+                SELECT pos, variant_id, neg_log_p FROM gwas_variants
+                WHERE trait_name = ? AND chrom = ? AND pos BETWEEN ? AND ?
+                AND neg_log_p IS NOT NULL
+                ORDER BY pos
+            """,
+                (trait_name, chrom, start, end),
+            )
+        elif has_pyramid:
+            first_bin = x * Config.TILE_BINS
+            cursor = conn.execute(
+                """
+                SELECT pos, variant_id, neg_log_p FROM manhattan_tiles
+                WHERE trait_name = ? AND chrom = ? AND zoom = ?
+                AND bin BETWEEN ? AND ?
+                ORDER BY bin
+            """,
+                (trait_name, chrom, zoom, first_bin, first_bin + Config.TILE_BINS - 1),
+            )
+        else:
+            cursor = conn.execute(
+                """
+                SELECT pos, variant_id, MAX(neg_log_p) FROM gwas_variants
+                WHERE trait_name = ? AND chrom = ? AND pos BETWEEN ? AND ?
+                AND neg_log_p IS NOT NULL
+                GROUP BY pos >> ?
+                ORDER BY pos
+            """,
+                (trait_name, chrom, start, end, bin_bits),
+            )
+
+        for pos, variant_id, neg_log_p in cursor.fetchall():
+            tile["pos"].append(pos)
+            tile["variant_id"].append(variant_id)
+            tile["neg_log_p"].append(round(neg_log_p, 4))
+        conn.close()
+        return tile
+
+    except Exception as e:
+        print(f"Error querying Manhattan tile: {e}")
+        return tile
 
 
+@timed("db_stats")
 def get_database_stats() -> dict:
-    """Get database statistics"""
+    """Get database statistics (the main Manhattan database and its shards)"""
+    manhattan_paths = gwas_db_paths()
     stats = {
         "locus_db_exists": os.path.exists(Config.LOCUS_DB_PATH),
-        "manhattan_db_exists": os.path.exists(Config.MANHATTAN_DB_PATH),
-        "available_traits": get_available_traits()
-        if os.path.exists(Config.MANHATTAN_DB_PATH)
-        else [],
+        "manhattan_db_exists": bool(manhattan_paths),
+        "available_traits": get_available_traits() if manhattan_paths else [],
         "manhattan_db_path": Config.MANHATTAN_DB_PATH,
         "locus_db_path": Config.LOCUS_DB_PATH,
+        "gwas_shards": list_shards(),
         "total_variants": 0,
     }
 
     # Get database stats if available
-    if stats["manhattan_db_exists"]:
+    if manhattan_paths:
         try:
-            conn = sqlite3.connect(Config.MANHATTAN_DB_PATH)
-            cursor = conn.cursor()
-
-            # Total variants
-            cursor.execute("SELECT COUNT(*) FROM gwas_variants")
-            stats["total_variants"] = cursor.fetchone()[0]
-
-            # Trait metadata
-            cursor.execute(
+            trait_stats = {}
+            for db_path in manhattan_paths:
+                conn = connect(db_path)
+                cursor = conn.cursor()
+
+                # Trait metadata; a sharded trait is counted from its shard
+                cursor.execute(
+                    """
+                    SELECT trait_name, total_variants, min_p_value, max_p_value
+                    FROM trait_metadata
+                    ORDER BY trait_name
                 """
-                SELECT trait_name, total_variants, min_p_value, max_p_value
-                FROM trait_metadata
-                ORDER BY trait_name
-            """
-            )
+                )
 
-            trait_stats = []
-            for row in cursor.fetchall():
-                trait_name, total_variants, min_p_value, max_p_value = row
+                for row in cursor.fetchall():
+                    trait_name, total_variants, min_p_value, max_p_value = row
+                    if gwas_db_path(trait_name) != db_path:
+                        continue
 
-                # Convert NaN values to None (which becomes null in JSON)
-                trait_stats.append(
-                    {
+                    # Convert NaN values to None (which becomes null in JSON)
+                    trait_stats[trait_name] = {
                         "trait_name": trait_name,
                         "total_variants": total_variants
                         if total_variants is not None
@@ -328,10 +969,12 @@ def get_database_stats() -> dict:
                         if max_p_value is not None and not math.isnan(max_p_value)
                         else None,
                     }
-                )
+                conn.close()
 
-            stats["trait_stats"] = trait_stats
-            conn.close()
+            stats["trait_stats"] = [trait_stats[name] for name in sorted(trait_stats)]
+            stats["total_variants"] = sum(
+                trait["total_variants"] for trait in stats["trait_stats"]
+            )
 
         except Exception as e:
             stats["error"] = str(e)
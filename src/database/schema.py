@@ -0,0 +1,292 @@
+"""
+Database schema definitions for STRXplorer
+Table and index DDL shared by the ingestion commands
+"""
+import re
+import sqlite3
+from typing import List, Optional
+
+from config import Config
+
+GWAS_VARIANTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS gwas_variants (
+        trait_name TEXT NOT NULL,
+        chrom TEXT NOT NULL,
+        pos INTEGER NOT NULL,
+        variant_id TEXT,
+        p_value REAL,
+        neg_log_p REAL,
+        beta REAL,
+        se REAL
+    )
+"""
+
+TRAIT_METADATA_TABLE = """
+    CREATE TABLE IF NOT EXISTS trait_metadata (
+        trait_name TEXT PRIMARY KEY,
+        total_variants INTEGER,
+        min_p_value REAL,
+        max_p_value REAL
+    )
+"""
+
+GWAS_INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_gwas_trait_chrom_pos
+    ON gwas_variants (trait_name, chrom, pos)
+    """,
+]
+
+# Partial index holding only the significant rows of gwas_variants. SQLite
+# only uses it for queries that repeat its WHERE term verbatim, so both are
+# built by significant_term().
+SIGNIFICANT_INDEX = "idx_gwas_significant"
+
+
+def significant_term(floor: Optional[float] = None) -> str:
+    """The partial index condition, as it must appear in queries using it"""
+    floor = Config.SIGNIFICANT_NEG_LOG_P_FLOOR if floor is None else floor
+    return f"neg_log_p >= {float(floor)!r}"
+
+
+LOCUS_DATA_TABLE = """
+    CREATE TABLE IF NOT EXISTS locus_data (
+        repeat_id TEXT,
+        chrom TEXT,
+        pos INTEGER,
+        motif TEXT,
+        ref_len REAL,
+        trait_name TEXT,
+        phenotype TEXT,
+        data_json TEXT
+    )
+"""
+
+LOCUS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_locus_repeat_id ON locus_data (repeat_id)",
+    "CREATE INDEX IF NOT EXISTS idx_locus_trait_name ON locus_data (trait_name)",
+    "CREATE INDEX IF NOT EXISTS idx_locus_phenotype ON locus_data (phenotype)",
+]
+
+# Per-locus allele summaries at standard count thresholds, so overview pages
+# can sort and page loci without decoding data_json
+LOCUS_SUMMARY_TABLE = """
+    CREATE TABLE IF NOT EXISTS locus_summary (
+        trait TEXT NOT NULL,
+        count_threshold INTEGER NOT NULL,
+        repeat_id TEXT NOT NULL,
+        allele_count INTEGER NOT NULL,
+        total_samples INTEGER NOT NULL,
+        mean_effect REAL NOT NULL,
+        abs_mean_effect REAL NOT NULL,
+        PRIMARY KEY (trait, count_threshold, repeat_id)
+    )
+"""
+
+LOCUS_SUMMARY_INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_locus_summary_effect
+    ON locus_summary (trait, count_threshold, abs_mean_effect DESC)
+    """,
+]
+
+# Per-locus dose-response trend (sample-count-weighted regression of mean
+# phenotype on summed allele length) at the same thresholds as locus_summary
+LOCUS_TREND_TABLE = """
+    CREATE TABLE IF NOT EXISTS locus_trend (
+        trait TEXT NOT NULL,
+        count_threshold INTEGER NOT NULL,
+        repeat_id TEXT NOT NULL,
+        allele_count INTEGER NOT NULL,
+        total_samples INTEGER NOT NULL,
+        slope REAL,
+        slope_se REAL,
+        t_stat REAL,
+        p_value REAL,
+        PRIMARY KEY (trait, count_threshold, repeat_id)
+    )
+"""
+
+LOCUS_TREND_INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_locus_trend_p
+    ON locus_trend (trait, count_threshold, p_value)
+    """,
+]
+
+# Genome-wide Manhattan reduction: every significant variant ('hit') plus the
+# strongest remaining variant per chromosome bin ('bin')
+GENOME_REDUCTION_TABLE = """
+    CREATE TABLE IF NOT EXISTS genome_reduction (
+        trait_name TEXT NOT NULL,
+        chrom TEXT NOT NULL,
+        pos INTEGER NOT NULL,
+        variant_id TEXT,
+        p_value REAL,
+        neg_log_p REAL,
+        kind TEXT NOT NULL
+    )
+"""
+
+GENOME_REDUCTION_INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_genome_reduction_trait
+    ON genome_reduction (trait_name, chrom, pos)
+    """,
+]
+
+# Manhattan tile pyramid: the lead variant of each non-empty bin per zoom
+# level; bin is the global bin index along the chromosome at that zoom
+MANHATTAN_TILES_TABLE = """
+    CREATE TABLE IF NOT EXISTS manhattan_tiles (
+        trait_name TEXT NOT NULL,
+        chrom TEXT NOT NULL,
+        zoom INTEGER NOT NULL,
+        bin INTEGER NOT NULL,
+        pos INTEGER NOT NULL,
+        variant_id TEXT,
+        neg_log_p REAL NOT NULL,
+        PRIMARY KEY (trait_name, chrom, zoom, bin)
+    ) WITHOUT ROWID
+"""
+
+# GWAS statistics in a +/- window_size window around each STR locus, keyed
+# by the GWAS trait name; loci without variants in the window have no row
+LOCUS_WINDOW_SUMMARY_TABLE = """
+    CREATE TABLE IF NOT EXISTS locus_window_summary (
+        trait_name TEXT NOT NULL,
+        repeat_id TEXT NOT NULL,
+        window_size INTEGER NOT NULL,
+        chrom TEXT NOT NULL,
+        pos INTEGER NOT NULL,
+        variant_count INTEGER NOT NULL,
+        max_neg_log_p REAL,
+        lead_variant_id TEXT,
+        lead_pos INTEGER,
+        significant_count INTEGER NOT NULL,
+        PRIMARY KEY (trait_name, window_size, repeat_id)
+    )
+"""
+
+LOCUS_WINDOW_SUMMARY_INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_locus_window_rank
+    ON locus_window_summary (trait_name, window_size, max_neg_log_p DESC)
+    """,
+]
+
+# Rows of genome_reduction for one trait. Relies on SQLite's bare-column
+# rule: with MAX(), the other selected columns come from the maximum row.
+GENOME_REDUCTION_QUERY = """
+    SELECT trait_name, chrom, pos, variant_id, p_value, neg_log_p, 'hit' AS kind
+    FROM gwas_variants
+    WHERE trait_name = :trait AND neg_log_p >= :hit_neg_log_p
+    UNION ALL
+    SELECT trait_name, chrom, pos, variant_id, p_value, MAX(neg_log_p), 'bin'
+    FROM gwas_variants
+    WHERE trait_name = :trait AND neg_log_p < :hit_neg_log_p
+    GROUP BY chrom, pos / :bin_size
+"""
+
+# Per-trait change counter, bumped whenever a trait's rows are rewritten, so
+# caches in other processes can tell their entries are stale
+DATASET_VERSIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS dataset_versions (
+        trait_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    )
+"""
+
+
+def create_manhattan_schema(conn: sqlite3.Connection):
+    """Create the Manhattan database tables if they do not exist yet"""
+    conn.execute(GWAS_VARIANTS_TABLE)
+    conn.execute(TRAIT_METADATA_TABLE)
+    conn.execute(GENOME_REDUCTION_TABLE)
+    for sql in GENOME_REDUCTION_INDEXES:
+        conn.execute(sql)
+    conn.execute(MANHATTAN_TILES_TABLE)
+    conn.execute(LOCUS_WINDOW_SUMMARY_TABLE)
+    for sql in LOCUS_WINDOW_SUMMARY_INDEXES:
+        conn.execute(sql)
+
+
+def create_gwas_indexes(conn: sqlite3.Connection):
+    """Create the standard gwas_variants indexes"""
+    for sql in GWAS_INDEXES:
+        conn.execute(sql)
+    create_significant_index(conn)
+
+
+def create_significant_index(conn: sqlite3.Connection):
+    """
+    Create the partial index of significant variants at the configured floor
+
+    An existing index built for a different floor is dropped and rebuilt.
+    """
+    term = significant_term()
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?",
+        (SIGNIFICANT_INDEX,),
+    ).fetchone()
+    if row is not None and not row[0].rstrip().endswith(term):
+        conn.execute(f"DROP INDEX {SIGNIFICANT_INDEX}")
+
+    conn.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS {SIGNIFICANT_INDEX}
+        ON gwas_variants (trait_name, chrom, pos)
+        WHERE {term}
+        """
+    )
+
+
+def create_locus_schema(conn: sqlite3.Connection):
+    """Create the locus database tables and indexes if they do not exist yet"""
+    conn.execute(LOCUS_DATA_TABLE)
+    conn.execute(LOCUS_SUMMARY_TABLE)
+    conn.execute(LOCUS_TREND_TABLE)
+    for sql in LOCUS_INDEXES + LOCUS_SUMMARY_INDEXES + LOCUS_TREND_INDEXES:
+        conn.execute(sql)
+
+
+def table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    """Whether a table exists (derived tables are optional in older databases)"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def drop_table_indexes(conn: sqlite3.Connection, table: str) -> List[str]:
+    """
+    Drop every explicit index on a table and return their CREATE statements
+
+    Used to defer index maintenance during bulk loads; pass the returned
+    statements to restore_indexes() afterwards.
+    """
+    rows = conn.execute(
+        """
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+        """,
+        (table,),
+    ).fetchall()
+
+    for name, _ in rows:
+        conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+    return [sql for _, sql in rows]
+
+
+def restore_indexes(conn: sqlite3.Connection, statements: List[str]):
+    """Recreate indexes dropped by drop_table_indexes()"""
+    for sql in statements:
+        conn.execute(
+            re.sub(
+                r"^CREATE (UNIQUE )?INDEX (?!IF NOT EXISTS)",
+                r"CREATE \1INDEX IF NOT EXISTS ",
+                sql.strip(),
+                flags=re.IGNORECASE,
+            )
+        )
@@ -0,0 +1,195 @@
+"""
+Per-trait GWAS database shards for STRXplorer
+Traits can live in their own SQLite file (same schema as manhattan_data.db,
+one trait per file) listed in a small JSON manifest. Queries about one trait
+are routed to its shard, and to Config.MANHATTAN_DB_PATH for traits without
+one; shards can be attached and detached while the app is running
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are not locked
+    fcntl = None
+
+# (manifest mtime and size, shards) replaced in one assignment, so readers
+# never pair a new stat with an old shard map
+_cache = {"manifest": (None, {})}
+_cache_lock = threading.Lock()
+
+
+def manifest_path() -> str:
+    return os.path.join(Config.GWAS_SHARD_DIR, Config.GWAS_SHARD_MANIFEST)
+
+
+def shard_file_path(trait_name: str) -> str:
+    """Default location of a trait's shard"""
+    return os.path.join(Config.GWAS_SHARD_DIR, f"{trait_name}.db")
+
+
+def _resolve(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(Config.GWAS_SHARD_DIR, path)
+
+
+def load_manifest() -> Dict[str, dict]:
+    """
+    trait_name -> shard entry (path, variants, attached_at) of the manifest
+
+    The file is re-read only when its mtime or size changes, so routing costs
+    one stat() per call and picks up attach/detach from other processes.
+    """
+    path = manifest_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached_key, shards = _cache["manifest"]
+    if cached_key == key:
+        return shards
+
+    with _cache_lock:
+        cached_key, shards = _cache["manifest"]
+        if cached_key != key:
+            try:
+                with open(path) as handle:
+                    shards = json.load(handle).get("shards", {})
+            except (OSError, ValueError) as e:
+                print(f"Error reading GWAS shard manifest: {e}")
+                shards = {}
+            for entry in shards.values():
+                entry["path"] = _resolve(entry["path"])
+            _cache["manifest"] = (key, shards)
+    return shards
+
+
+def gwas_db_path(trait_name: str) -> str:
+    """The database holding a GWAS trait: its shard, or the main database"""
+    entry = load_manifest().get(trait_name)
+    return entry["path"] if entry is not None else Config.MANHATTAN_DB_PATH
+
+
+def gwas_db_paths() -> List[str]:
+    """Every existing GWAS database: the main one first, then the shards"""
+    paths = [Config.MANHATTAN_DB_PATH]
+    paths.extend(entry["path"] for entry in load_manifest().values())
+    return [path for path in dict.fromkeys(paths) if os.path.exists(path)]
+
+
+def group_traits_by_db(trait_names: Iterable[str]) -> Dict[str, List[str]]:
+    """GWAS trait names grouped by the database they are routed to"""
+    groups = defaultdict(list)
+    for trait_name in trait_names:
+        groups[gwas_db_path(trait_name)].append(trait_name)
+    return dict(groups)
+
+
+def _update_manifest(update):
+    """Apply update(shards) to the manifest under a file lock and rewrite it"""
+    os.makedirs(Config.GWAS_SHARD_DIR, exist_ok=True)
+    path = manifest_path()
+    with open(path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path) as handle:
+                shards = json.load(handle).get("shards", {})
+        except (OSError, ValueError):
+            shards = {}
+
+        update(shards)
+
+        fd, temp_path = tempfile.mkstemp(dir=Config.GWAS_SHARD_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w") as handle:
+            json.dump({"updated_at": time.time(), "shards": shards}, handle, indent=2)
+        os.replace(temp_path, path)
+
+
+def shard_variant_count(db_path: str, trait_name: str) -> Optional[int]:
+    """total_variants of trait_name in a shard file, or None if it is not there"""
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute(
+                "SELECT total_variants FROM trait_metadata WHERE trait_name = ?",
+                (trait_name,),
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row is not None else None
+
+
+def attach_shard(trait_name: str, db_path: str) -> int:
+    """
+    Route a trait to a shard file from now on
+
+    The file must hold the trait's rows (trait_metadata included). Paths
+    inside GWAS_SHARD_DIR are stored relative to it. Returns the trait's
+    variant count.
+    """
+    variants = shard_variant_count(db_path, trait_name)
+    if variants is None:
+        raise ValueError(f"{db_path} has no trait_metadata row for '{trait_name}'")
+
+    shard_dir = os.path.abspath(Config.GWAS_SHARD_DIR)
+    stored = os.path.abspath(db_path)
+    if os.path.dirname(stored) == shard_dir:
+        stored = os.path.basename(stored)
+
+    def add(shards):
+        shards[trait_name] = {
+            "path": stored,
+            "variants": variants,
+            "attached_at": time.time(),
+        }
+
+    _update_manifest(add)
+    return variants
+
+
+def detach_shard(trait_name: str) -> dict:
+    """
+    Stop routing a trait to its shard (the file itself is kept)
+
+    The trait is served from the main database again, if it has it.
+    """
+    removed = {}
+
+    def remove(shards):
+        if trait_name not in shards:
+            raise ValueError(f"Trait '{trait_name}' has no attached shard")
+        removed.update(shards.pop(trait_name))
+
+    _update_manifest(remove)
+    removed["path"] = _resolve(removed["path"])
+    return removed
+
+
+def list_shards() -> List[dict]:
+    """Attached shards with their file sizes, by trait name"""
+    shards = []
+    for trait_name, entry in sorted(load_manifest().items()):
+        exists = os.path.exists(entry["path"])
+        shards.append(
+            {
+                "trait_name": trait_name,
+                "path": entry["path"],
+                "variants": entry.get("variants"),
+                "attached_at": entry.get("attached_at"),
+                "exists": exists,
+                "bytes": os.path.getsize(entry["path"]) if exists else None,
+            }
+        )
+    return shards
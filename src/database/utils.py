@@ -0,0 +1,288 @@
+"""
+Database utilities for STRXplorer
+Traced SQLite connections: every statement is timed and counted, and slow
+statements are logged together with their EXPLAIN QUERY PLAN
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from config import Config
+from src.database.shards import gwas_db_paths
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)(?: AS \S+)?$")
+
+_lock = threading.Lock()
+_statement_stats: Dict[str, Dict] = {}
+_slow_queries = deque(maxlen=200)
+_slow_query_logger: Optional[logging.Logger] = None
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literals so equivalent statements group"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def find_full_scans(plan: List[str]) -> List[str]:
+    """Tables read by a full table scan according to EXPLAIN QUERY PLAN details"""
+    tables = []
+    for detail in plan:
+        match = _FULL_SCAN.match(detail.strip())
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def _get_slow_query_logger() -> logging.Logger:
+    """Rotating JSON-lines log of slow statements, created on first use"""
+    global _slow_query_logger
+    if _slow_query_logger is None:
+        logger = logging.getLogger("strxplorer.slow_queries")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            log_dir = os.path.dirname(Config.SLOW_QUERY_LOG_PATH)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            handler = RotatingFileHandler(
+                Config.SLOW_QUERY_LOG_PATH,
+                maxBytes=Config.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=Config.SLOW_QUERY_LOG_BACKUPS,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"Could not open slow query log: {e}")
+        _slow_query_logger = logger
+    return _slow_query_logger
+
+
+def _record_statement(
+    conn: sqlite3.Connection, sql: str, parameters, elapsed_ms: float, row_count: int
+):
+    normalized = normalize_sql(sql)
+
+    with _lock:
+        stats = _statement_stats.get(normalized)
+        if stats is None:
+            stats = _statement_stats[normalized] = {
+                "sql": normalized,
+                "calls": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "rows": 0,
+                "slow_calls": 0,
+                "full_scans": [],
+            }
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["rows"] += row_count
+
+    if elapsed_ms < Config.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    plan = []
+    if normalized.upper().startswith(("SELECT", "WITH")):
+        try:
+            plan_cursor = sqlite3.Cursor(conn)
+            plan_cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            plan = [row[3] for row in plan_cursor.fetchall()]
+            plan_cursor.close()
+        except sqlite3.Error as e:
+            plan = [f"EXPLAIN QUERY PLAN failed: {e}"]
+    full_scans = find_full_scans(plan)
+
+    entry = {
+        "timestamp": time.time(),
+        "sql": normalized,
+        "duration_ms": round(elapsed_ms, 2),
+        "rows": row_count,
+        "plan": plan,
+        "full_scans": full_scans,
+    }
+
+    with _lock:
+        stats["slow_calls"] += 1
+        stats["full_scans"] = full_scans
+        _slow_queries.append(entry)
+
+    _get_slow_query_logger().info(json.dumps(entry))
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement until all of its rows are fetched
+
+    SQLite steps through results lazily, so the time spent in execute() and
+    in every fetch is added up, and the statement is recorded once its rows
+    are exhausted or the cursor is closed, reused or garbage collected. Rows
+    are passed through as they are fetched, never buffered.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # [sql, parameters, elapsed_ms, rows] of the statement being read
+        self._pending = None
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            _record_statement(self.connection, *pending)
+
+    def _timed(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        if self._pending is not None:
+            self._pending[2] += (time.perf_counter() - start) * 1000
+        return result
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._pending = [sql, parameters, (time.perf_counter() - start) * 1000, 0]
+        if self.description is None:
+            # No result rows (INSERT, DDL, ...): done already
+            self._pending[3] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _record_statement(self.connection, sql, (), elapsed_ms, max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if self._pending is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute) are traced"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    """Open a SQLite connection, traced unless QUERY_TRACING_ENABLED is off"""
+    if Config.QUERY_TRACING_ENABLED:
+        kwargs.setdefault("factory", TracedConnection)
+    return sqlite3.connect(db_path, **kwargs)
+
+
+def get_query_stats() -> Dict:
+    """Aggregated statement statistics and the most recent slow statements"""
+    with _lock:
+        statements = [dict(stats) for stats in _statement_stats.values()]
+        slow_queries = list(_slow_queries)
+
+    for stats in statements:
+        stats["mean_ms"] = stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0
+    statements.sort(key=lambda stats: stats["total_ms"], reverse=True)
+
+    return {
+        "threshold_ms": Config.SLOW_QUERY_THRESHOLD_MS,
+        "log_path": Config.SLOW_QUERY_LOG_PATH,
+        "statements": statements,
+        "slow_queries": list(reversed(slow_queries)),
+    }
+
+
+def database_fingerprint() -> Dict[str, list]:
+    """
+    Identify the current contents of both databases and any GWAS shards
+
+    Used to tell whether pre-rendered pages and in-memory catalogs are stale.
+    Records each database's size and mtime plus its dataset_versions rows,
+    since trait updates under WAL mode do not touch the main file until the
+    next checkpoint. Attaching or detaching a shard changes the set of files.
+    """
+    fingerprint = {}
+    for db_path in (Config.LOCUS_DB_PATH, Config.MANHATTAN_DB_PATH, *gwas_db_paths()):
+        if not os.path.exists(db_path):
+            continue
+        stat = os.stat(db_path)
+        versions = []
+        try:
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'dataset_versions'"
+            ).fetchone():
+                versions = conn.execute(
+                    "SELECT trait_name, version FROM dataset_versions ORDER BY trait_name"
+                ).fetchall()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading dataset versions: {e}")
+        name = os.path.basename(db_path)
+        if db_path not in (Config.LOCUS_DB_PATH, Config.MANHATTAN_DB_PATH):
+            name = f"shards/{name}"
+        fingerprint[name] = [
+            stat.st_size,
+            stat.st_mtime,
+            [list(row) for row in versions],
+        ]
+    return fingerprint
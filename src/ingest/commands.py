@@ -0,0 +1,462 @@
+"""
+Flask CLI commands for building the STRXplorer databases
+Run with: flask --app app <command> --help
+"""
+import os
+import sqlite3
+import time
+
+import click
+
+from config import Config
+from src.analysis.colocalization import SORT_KEYS, rank_colocalization
+from src.database.models import get_gwas_trait_name
+from src.database.schema import create_gwas_indexes
+from src.database.shards import (
+    attach_shard,
+    detach_shard,
+    group_traits_by_db,
+    list_shards,
+)
+from src.ingest.gwas import (
+    build_genome_reduction,
+    build_manhattan_tiles,
+    ingest_gwas_files,
+    refresh_locus_window_summaries,
+    trait_name_from_path,
+)
+from src.ingest.locus import build_locus_summaries, build_locus_trends, ingest_locus_files
+from src.ingest.shards import build_shards, ingest_shard_files
+from src.ingest.trait import update_trait, write_gwas_trait
+from src.utils.static_site import export_static_site
+
+
+@click.command("ingest-gwas")
+@click.argument(
+    "files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@click.option(
+    "--trait",
+    "trait_names",
+    multiple=True,
+    help="Trait name for each file, in order (default: derived from the file name)",
+)
+@click.option("--db", "db_path", default=None, help="Manhattan database to load into")
+@click.option(
+    "--locus-db", default=None, help="Locus database for the STR window summaries"
+)
+@click.option(
+    "--workers", type=int, default=None, help="Parser processes (default: CPU count)"
+)
+@click.option("--chunksize", type=int, default=500_000, show_default=True)
+@click.option("--replace", is_flag=True, help="Reload traits that already exist")
+def ingest_gwas_command(
+    files, trait_names, db_path, locus_db, workers, chunksize, replace
+):
+    """Stream GWAS summary-stat files (optionally gzipped) into manhattan_data.db"""
+    if trait_names and len(trait_names) != len(files):
+        raise click.UsageError("Give one --trait per file, or none at all")
+
+    names = trait_names or [trait_name_from_path(path) for path in files]
+    if len(set(names)) != len(names):
+        raise click.UsageError(f"Duplicate trait names: {sorted(names)}")
+
+    try:
+        loaded = ingest_gwas_files(
+            dict(zip(names, files)),
+            db_path or Config.MANHATTAN_DB_PATH,
+            workers=workers,
+            chunksize=chunksize,
+            replace=replace,
+            locus_db_path=locus_db,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Loaded {len(loaded)} traits, {sum(loaded.values()):,} variants")
+
+
+@click.command("ingest-loci")
+@click.argument(
+    "files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@click.option(
+    "--trait",
+    "trait_name",
+    default=None,
+    help="Trait for every locus (default: the file's phenotype column)",
+)
+@click.option("--db", "db_path", default=None, help="Locus database to load into")
+@click.option(
+    "--manhattan-db",
+    default=None,
+    help="Manhattan database whose STR windows to refresh (default: each trait's own)",
+)
+@click.option("--replace", is_flag=True, help="Reload traits that already exist")
+def ingest_loci_command(files, trait_name, db_path, manhattan_db, replace):
+    """Load STR association tables into locus_data and precompute summaries"""
+    db_path = db_path or Config.LOCUS_DB_PATH
+    try:
+        loaded = ingest_locus_files(list(files), db_path, trait_name, replace)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    for trait, count in sorted(loaded.items()):
+        click.echo(f"{trait}: {count:,} loci")
+
+    gwas_traits = sorted({get_gwas_trait_name(t) for t in loaded})
+    targets = (
+        {manhattan_db: gwas_traits} if manhattan_db else group_traits_by_db(gwas_traits)
+    )
+    for target_db, traits in sorted(targets.items()):
+        if not os.path.exists(target_db):
+            continue
+        refreshed = refresh_locus_window_summaries(target_db, db_path, traits)
+        for trait, count in sorted(refreshed.items()):
+            click.echo(f"{trait}: {count:,} STR window summaries")
+
+
+@click.command("build-locus-summaries")
+@click.option(
+    "--trait", "traits", multiple=True, help="Only rebuild these traits (default: all)"
+)
+@click.option("--db", "db_path", default=None, help="Locus database")
+def build_locus_summaries_command(traits, db_path):
+    """Precompute per-locus allele summaries for an existing locus database"""
+    conn = sqlite3.connect(db_path or Config.LOCUS_DB_PATH, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        count = build_locus_summaries(conn, list(traits) or None)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    click.echo(f"Wrote {count:,} locus summaries")
+
+
+@click.command("build-locus-trends")
+@click.option(
+    "--trait", "traits", multiple=True, help="Only rebuild these traits (default: all)"
+)
+@click.option("--db", "db_path", default=None, help="Locus database")
+def build_locus_trends_command(traits, db_path):
+    """Precompute per-locus dose-response trends for an existing locus database"""
+    started = time.time()
+    conn = sqlite3.connect(db_path or Config.LOCUS_DB_PATH, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        count = build_locus_trends(conn, list(traits) or None)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    click.echo(f"Wrote {count:,} locus trends in {time.time() - started:.1f}s")
+
+
+@click.command("build-genome-reductions")
+@click.option(
+    "--trait", "traits", multiple=True, help="Only rebuild these traits (default: all)"
+)
+@click.option("--db", "db_path", default=None, help="Manhattan database")
+def build_genome_reductions_command(traits, db_path):
+    """Precompute genome-wide Manhattan reductions for an existing database"""
+    _rebuild_per_trait(build_genome_reduction, traits, db_path, "points")
+
+
+@click.command("build-manhattan-tiles")
+@click.option(
+    "--trait", "traits", multiple=True, help="Only rebuild these traits (default: all)"
+)
+@click.option("--db", "db_path", default=None, help="Manhattan database")
+def build_manhattan_tiles_command(traits, db_path):
+    """Precompute Manhattan tile pyramids for an existing database"""
+    _rebuild_per_trait(build_manhattan_tiles, traits, db_path, "tile bins")
+
+
+@click.command("build-gwas-indexes")
+@click.option("--db", "db_path", default=None, help="Manhattan database")
+def build_gwas_indexes_command(db_path):
+    """Create the gwas_variants indexes, including the significant-variant index"""
+    started = time.time()
+    conn = sqlite3.connect(db_path or Config.MANHATTAN_DB_PATH)
+    try:
+        create_gwas_indexes(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    click.echo(
+        f"Indexed gwas_variants (significant floor -log10(p) >= "
+        f"{Config.SIGNIFICANT_NEG_LOG_P_FLOOR:g}) in {time.time() - started:.1f}s"
+    )
+
+
+@click.command("build-locus-window-summaries")
+@click.option(
+    "--trait", "traits", multiple=True, help="Only rebuild these GWAS traits (default: all)"
+)
+@click.option("--db", "db_path", default=None, help="Manhattan database")
+@click.option("--locus-db", default=None, help="Locus database")
+def build_locus_window_summaries_command(traits, db_path, locus_db):
+    """Precompute GWAS window statistics around every STR locus"""
+    refreshed = refresh_locus_window_summaries(
+        db_path or Config.MANHATTAN_DB_PATH,
+        locus_db or Config.LOCUS_DB_PATH,
+        list(traits) or None,
+    )
+    for trait, count in sorted(refreshed.items()):
+        click.echo(f"{trait}: {count:,} STR window summaries")
+
+
+@click.command("export-static")
+@click.option("--out", "out_dir", default=None, help="Output directory (default: dist)")
+@click.option(
+    "--workers", type=int, default=None, help="Render processes (default: CPU count)"
+)
+def export_static_command(out_dir, workers):
+    """Pre-render every trait, locus and default Manhattan page to static files"""
+    summary = export_static_site(out_dir or Config.STATIC_SITE_DIR, workers=workers)
+    click.echo(
+        f"Wrote {summary['pages']:,} pages ({summary['bytes'] / 1e6:.1f} MB) "
+        f"in {summary['elapsed_seconds']}s"
+    )
+    for failure in summary["failed"]:
+        click.echo(f"  {failure['status']} {failure['url']}")
+
+
+@click.command("rank-colocalization")
+@click.option(
+    "--trait", "traits", multiple=True, help="Only rank these traits (default: all)"
+)
+@click.option(
+    "--distance",
+    type=int,
+    default=None,
+    help=f"Window half-width in bp (default: {Config.COLOC_DISTANCE:,})",
+)
+@click.option(
+    "--sort",
+    type=click.Choice(list(SORT_KEYS)),
+    default="max_neg_log_p",
+    show_default=True,
+)
+@click.option("--limit", type=int, default=None, help="Only keep the top N loci")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the full table to a .tsv or .csv file",
+)
+def rank_colocalization_command(traits, distance, sort, limit, output):
+    """Rank STR loci by the GWAS signal concentrated around them"""
+    ranked = rank_colocalization(
+        list(traits) or None, distance=distance, sort=sort, limit=limit
+    )
+    if output:
+        ranked.to_csv(output, sep="," if output.endswith(".csv") else "\t", index=False)
+        click.echo(f"Wrote {len(ranked):,} ranked loci to {output}")
+    else:
+        click.echo(ranked.head(limit or 25).to_string(index=False))
+
+
+def _rebuild_per_trait(builder, traits, db_path, unit):
+    """Run a per-trait derived-table builder over a Manhattan database"""
+    conn = sqlite3.connect(db_path or Config.MANHATTAN_DB_PATH, isolation_level=None)
+    try:
+        traits = list(traits) or [
+            row[0] for row in conn.execute("SELECT trait_name FROM trait_metadata")
+        ]
+        conn.execute("BEGIN")
+        for trait_name in traits:
+            count = builder(conn, trait_name)
+            click.echo(f"{trait_name}: {count:,} {unit}")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+@click.group("trait")
+def trait_group():
+    """Add, replace or remove a single trait while the app keeps serving"""
+
+
+def trait_options(command):
+    command = click.option(
+        "--gwas-trait",
+        "gwas_trait_name",
+        default=None,
+        help="Name in gwas_variants (default: mapped from the locus trait name)",
+    )(command)
+    command = click.option("--locus-db", default=None, help="Locus database")(command)
+    command = click.option("--manhattan-db", default=None, help="Manhattan database")(
+        command
+    )
+    return command
+
+
+@trait_group.command("add")
+@click.argument("trait_name")
+@click.option("--gwas", "gwas_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--loci", "loci_file", type=click.Path(exists=True, dir_okay=False))
+@trait_options
+def trait_add_command(trait_name, gwas_file, loci_file, **options):
+    """Load a new trait's summary stats and/or STR loci"""
+    _run_trait_update(trait_name, gwas_file, loci_file, replace=False, **options)
+
+
+@trait_group.command("replace")
+@click.argument("trait_name")
+@click.option("--gwas", "gwas_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--loci", "loci_file", type=click.Path(exists=True, dir_okay=False))
+@trait_options
+def trait_replace_command(trait_name, gwas_file, loci_file, **options):
+    """Reload an existing trait's summary stats and/or STR loci"""
+    _run_trait_update(trait_name, gwas_file, loci_file, replace=True, **options)
+
+
+@trait_group.command("remove")
+@click.argument("trait_name")
+@trait_options
+def trait_remove_command(trait_name, **options):
+    """Delete a trait's variants, metadata, loci and derived rows"""
+    _run_trait_update(trait_name, None, None, remove=True, **options)
+
+
+def _run_trait_update(trait_name, gwas_file, loci_file, **options):
+    if not options.get("remove") and gwas_file is None and loci_file is None:
+        raise click.UsageError("Give --gwas and/or --loci")
+    try:
+        update_trait(
+            trait_name,
+            gwas_file=gwas_file,
+            loci_file=loci_file,
+            gwas_trait_name=options.get("gwas_trait_name"),
+            replace=options.get("replace", False),
+            remove=options.get("remove", False),
+            locus_db_path=options.get("locus_db"),
+            manhattan_db_path=options.get("manhattan_db"),
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+@click.group("shard")
+def shard_group():
+    """Move GWAS traits into per-trait database files and route queries to them"""
+
+
+@shard_group.command("split")
+@click.option(
+    "--trait", "traits", multiple=True, help="Only shard these GWAS traits (default: all)"
+)
+@click.option("--db", "db_path", default=None, help="Manhattan database to copy from")
+@click.option("--locus-db", default=None, help="Locus database for the STR window summaries")
+@click.option(
+    "--workers", type=int, default=None, help="Builder processes (default: CPU count)"
+)
+@click.option(
+    "--remove-from-main",
+    is_flag=True,
+    help="Delete each sharded trait from the source database afterwards",
+)
+def shard_split_command(traits, db_path, locus_db, workers, remove_from_main):
+    """Copy traits out of manhattan_data.db into shards, in parallel"""
+    db_path = db_path or Config.MANHATTAN_DB_PATH
+    started = time.time()
+    try:
+        built = build_shards(list(traits) or None, db_path, workers, locus_db)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"Sharded {len(built)} traits, {sum(built.values()):,} variants "
+        f"in {time.time() - started:.1f}s"
+    )
+
+    if remove_from_main:
+        for trait_name in sorted(built):
+            write_gwas_trait(trait_name, None, db_path)
+            click.echo(f"Removed {trait_name} from {db_path}")
+
+
+@shard_group.command("ingest")
+@click.argument(
+    "files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@click.option(
+    "--trait",
+    "trait_names",
+    multiple=True,
+    help="Trait name for each file, in order (default: derived from the file name)",
+)
+@click.option("--locus-db", default=None, help="Locus database for the STR window summaries")
+@click.option(
+    "--workers", type=int, default=None, help="Loader processes (default: CPU count)"
+)
+@click.option("--replace", is_flag=True, help="Reload traits that already exist")
+def shard_ingest_command(files, trait_names, locus_db, workers, replace):
+    """Load GWAS summary-stat files into one shard per trait, in parallel"""
+    if trait_names and len(trait_names) != len(files):
+        raise click.UsageError("Give one --trait per file, or none at all")
+
+    names = trait_names or [trait_name_from_path(path) for path in files]
+    if len(set(names)) != len(names):
+        raise click.UsageError(f"Duplicate trait names: {sorted(names)}")
+
+    try:
+        loaded = ingest_shard_files(
+            dict(zip(names, files)), workers=workers, replace=replace, locus_db_path=locus_db
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Loaded {len(loaded)} shards, {sum(loaded.values()):,} variants")
+
+
+@shard_group.command("attach")
+@click.argument("trait_name")
+@click.argument("db_path", type=click.Path(exists=True, dir_okay=False))
+def shard_attach_command(trait_name, db_path):
+    """Serve a GWAS trait from an existing database file from now on"""
+    try:
+        variants = attach_shard(trait_name, db_path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Attached {trait_name} ({variants:,} variants) from {db_path}")
+
+
+@shard_group.command("detach")
+@click.argument("trait_name")
+def shard_detach_command(trait_name):
+    """Serve a GWAS trait from the main database again (the shard file is kept)"""
+    try:
+        entry = detach_shard(trait_name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Detached {trait_name} (shard file {entry['path']} kept)")
+
+
+@shard_group.command("list")
+def shard_list_command():
+    """Show the attached shards"""
+    shards = list_shards()
+    if not shards:
+        click.echo(f"No shards attached; every trait is read from {Config.MANHATTAN_DB_PATH}")
+    for shard in shards:
+        size = f"{shard['bytes'] / 1e6:.1f} MB" if shard["exists"] else "missing"
+        click.echo(
+            f"{shard['trait_name']}: {shard['variants'] or 0:,} variants, "
+            f"{size}, {shard['path']}"
+        )
+
+
+def register_commands(app):
+    """Attach the ingestion commands to the app's `flask` CLI"""
+    app.cli.add_command(ingest_gwas_command)
+    app.cli.add_command(ingest_loci_command)
+    app.cli.add_command(build_locus_summaries_command)
+    app.cli.add_command(build_locus_trends_command)
+    app.cli.add_command(build_genome_reductions_command)
+    app.cli.add_command(build_manhattan_tiles_command)
+    app.cli.add_command(build_gwas_indexes_command)
+    app.cli.add_command(build_locus_window_summaries_command)
+    app.cli.add_command(export_static_command)
+    app.cli.add_command(rank_colocalization_command)
+    app.cli.add_command(trait_group)
+    app.cli.add_command(shard_group)
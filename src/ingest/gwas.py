@@ -0,0 +1,560 @@
+"""
+GWAS summary-statistics ingestion for STRXplorer
+Streams (optionally gzipped) summary-stat files in chunks into the
+gwas_variants and trait_metadata tables of the Manhattan database
+"""
+import gzip
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from src.database.models import get_gwas_trait_name
+from src.database.schema import (
+    GENOME_REDUCTION_QUERY,
+    GWAS_VARIANTS_TABLE,
+    create_gwas_indexes,
+    create_manhattan_schema,
+    drop_table_indexes,
+    restore_indexes,
+)
+
+# Accepted header names (lower case) for each gwas_variants column
+COLUMN_ALIASES = {
+    "chrom": ["chrom", "chr", "chromosome", "#chrom", "#chr", "chr_name"],
+    "pos": ["pos", "bp", "position", "base_pair_location", "pos_b37", "pos_b38"],
+    "variant_id": ["variant_id", "snp", "rsid", "id", "markername", "snpid", "variant"],
+    "p_value": ["p_value", "p", "pval", "p-value", "pvalue", "p_bolt_lmm", "p_bolt_lmm_inf"],
+    "neg_log_p": ["neg_log_p", "neg_log10_p", "mlog10p", "log10p", "-log10p"],
+    "beta": ["beta", "effect", "b", "effect_size"],
+    "se": ["se", "standard_error", "stderr", "sebeta"],
+}
+
+# Numeric sex chromosome codes used by PLINK-style files
+CHROM_CODES = {"23": "X", "24": "Y"}
+
+# Bulk-load pragmas: no rollback journal, no fsync, big page cache.
+# A crash mid-load can corrupt the file, so they are only applied to staging
+# and other scratch files that are discarded on failure.
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA locking_mode = EXCLUSIVE",
+]
+
+# Pragmas for the database a load merges into: WAL keeps it crash-safe and
+# lets the running app keep reading; only the page cache is enlarged
+TARGET_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA busy_timeout = 60000",
+]
+
+INSERT_VARIANT = """
+    INSERT INTO gwas_variants
+        (trait_name, chrom, pos, variant_id, p_value, neg_log_p, beta, se)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+VARIANT_COLUMNS = ["chrom", "pos", "variant_id", "p_value", "neg_log_p", "beta", "se"]
+
+
+def trait_name_from_path(path: str) -> str:
+    """Derive a trait name from a file name, e.g. 'platelet_volume.tsv.gz'"""
+    name = os.path.basename(path)
+    name = re.sub(r"(\.(gz|bgz|bz2|zip))$", "", name, flags=re.IGNORECASE)
+    name = re.sub(r"\.(tsv|txt|csv|sumstats|tab)$", "", name, flags=re.IGNORECASE)
+    return name
+
+
+def _open_text(path: str):
+    if path.endswith((".gz", ".bgz")):
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+
+def detect_separator(path: str) -> str:
+    """Guess the column separator from the header line"""
+    with _open_text(path) as handle:
+        header = handle.readline()
+    if "\t" in header:
+        return "\t"
+    if "," in header:
+        return ","
+    return r"\s+"
+
+
+def resolve_columns(header: List[str]) -> Dict[str, str]:
+    """Map gwas_variants columns to the matching header names of a file"""
+    lookup = {name.strip().lower(): name for name in header}
+    resolved = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lookup:
+                resolved[column] = lookup[alias]
+                break
+
+    missing = [c for c in ("chrom", "pos") if c not in resolved]
+    if "p_value" not in resolved and "neg_log_p" not in resolved:
+        missing.append("p_value")
+    if missing:
+        raise ValueError(f"Missing required columns {missing} in header {header}")
+    return resolved
+
+
+def normalize_chromosomes(chrom: pd.Series) -> pd.Series:
+    """
+    Normalize chromosome names to the form used by get_locus_info_from_repeat_id
+    ('chr1' -> '1', 'chrX' -> 'X', PLINK '23' -> 'X')
+    """
+    chrom = chrom.astype(str).str.strip().str.replace(r"^chr", "", regex=True, case=False)
+    chrom = chrom.str.upper()
+    return chrom.replace(CHROM_CODES)
+
+
+def prepare_chunk(chunk: pd.DataFrame, columns: Dict[str, str]) -> pd.DataFrame:
+    """Rename, clean and derive neg_log_p for one chunk of a summary-stat file"""
+    data = pd.DataFrame(
+        {column: chunk[source] for column, source in columns.items()}
+    )
+
+    data["chrom"] = normalize_chromosomes(data["chrom"])
+    data["pos"] = pd.to_numeric(data["pos"], errors="coerce")
+
+    if "p_value" in data:
+        p_value = pd.to_numeric(data["p_value"], errors="coerce").to_numpy(dtype=float)
+        # p = 0 underflows in the source; clamp so -log10 stays finite
+        clipped = np.clip(p_value, np.finfo(float).tiny, 1.0)
+        data["p_value"] = p_value
+        data["neg_log_p"] = -np.log10(clipped)
+    else:
+        neg_log_p = pd.to_numeric(data["neg_log_p"], errors="coerce").to_numpy(dtype=float)
+        data["neg_log_p"] = neg_log_p
+        data["p_value"] = np.power(10.0, -neg_log_p)
+
+    for column in ("beta", "se"):
+        if column in data:
+            data[column] = pd.to_numeric(data[column], errors="coerce")
+        else:
+            data[column] = np.nan
+
+    if "variant_id" not in data:
+        data["variant_id"] = data["chrom"] + ":" + data["pos"].astype("Int64").astype(str)
+
+    data = data.dropna(subset=["pos", "p_value", "neg_log_p"])
+    data["pos"] = data["pos"].astype(np.int64)
+    return data[VARIANT_COLUMNS]
+
+
+def apply_bulk_pragmas(conn: sqlite3.Connection):
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+
+def apply_target_pragmas(conn: sqlite3.Connection):
+    for pragma in TARGET_LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+
+def parse_summary_stats(
+    path: str,
+    trait_name: str,
+    staging_dir: str,
+    chunksize: int = 500_000,
+) -> Tuple[str, str, int, Optional[float], Optional[float]]:
+    """
+    Parse one summary-stat file into a staging SQLite file
+
+    Runs in a worker process. Rows are streamed chunk by chunk, so memory use
+    is bounded by chunksize regardless of the file size.
+
+    Returns:
+        (trait_name, staging_path, variant_count, min_p_value, max_p_value)
+    """
+    separator = detect_separator(path)
+    header = pd.read_csv(path, sep=separator, nrows=0, compression="infer").columns
+    columns = resolve_columns(list(header))
+
+    staging_path = os.path.join(staging_dir, f"{trait_name}.staging.db")
+    conn = sqlite3.connect(staging_path, isolation_level=None)
+    apply_bulk_pragmas(conn)
+    conn.execute(GWAS_VARIANTS_TABLE)
+
+    total = 0
+    min_p = None
+    max_p = None
+
+    reader = pd.read_csv(
+        path,
+        sep=separator,
+        usecols=list(columns.values()),
+        dtype={columns["chrom"]: str},
+        chunksize=chunksize,
+        compression="infer",
+    )
+
+    conn.execute("BEGIN")
+    for chunk in reader:
+        data = prepare_chunk(chunk, columns)
+        if data.empty:
+            continue
+
+        data.insert(0, "trait_name", trait_name)
+        conn.executemany(INSERT_VARIANT, data.itertuples(index=False, name=None))
+
+        total += len(data)
+        chunk_min = float(data["p_value"].min())
+        chunk_max = float(data["p_value"].max())
+        min_p = chunk_min if min_p is None else min(min_p, chunk_min)
+        max_p = chunk_max if max_p is None else max(max_p, chunk_max)
+    conn.execute("COMMIT")
+    conn.close()
+
+    return trait_name, staging_path, total, min_p, max_p
+
+
+def merge_staging(
+    conn: sqlite3.Connection,
+    trait_name: str,
+    staging_path: str,
+    total: int,
+    min_p: Optional[float],
+    max_p: Optional[float],
+    replace: bool = False,
+):
+    """
+    Copy a staged trait into gwas_variants and record its trait_metadata
+
+    With replace, the trait's old rows are deleted in the same transaction,
+    so a failed merge leaves the previous version of the trait in place.
+    """
+    conn.execute("ATTACH DATABASE ? AS staging", (staging_path,))
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if replace:
+            conn.execute("DELETE FROM gwas_variants WHERE trait_name = ?", (trait_name,))
+        conn.execute(
+            """
+            INSERT INTO gwas_variants
+                (trait_name, chrom, pos, variant_id, p_value, neg_log_p, beta, se)
+            SELECT trait_name, chrom, pos, variant_id, p_value, neg_log_p, beta, se
+            FROM staging.gwas_variants
+            """
+        )
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO trait_metadata
+                (trait_name, total_variants, min_p_value, max_p_value)
+            VALUES (?, ?, ?, ?)
+            """,
+            (trait_name, total, min_p, max_p),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DETACH DATABASE staging")
+        os.remove(staging_path)
+
+
+def build_genome_reduction(conn: sqlite3.Connection, trait_name: str) -> int:
+    """
+    (Re)build the genome-wide Manhattan reduction of one trait
+
+    Keeps every variant at or above Config.GENOME_HIT_NEG_LOG_P and the top
+    variant of each Config.GENOME_BIN_SIZE bin below it. Runs in the caller's
+    transaction. Returns the number of rows written.
+    """
+    create_manhattan_schema(conn)
+    conn.execute("DELETE FROM genome_reduction WHERE trait_name = ?", (trait_name,))
+    cursor = conn.execute(
+        """
+        INSERT INTO genome_reduction
+            (trait_name, chrom, pos, variant_id, p_value, neg_log_p, kind)
+        """
+        + GENOME_REDUCTION_QUERY,
+        {
+            "trait": trait_name,
+            "hit_neg_log_p": Config.GENOME_HIT_NEG_LOG_P,
+            "bin_size": Config.GENOME_BIN_SIZE,
+        },
+    )
+    return cursor.rowcount
+
+
+def build_manhattan_tiles(conn: sqlite3.Connection, trait_name: str) -> int:
+    """
+    (Re)build the Manhattan tile pyramid of one trait
+
+    The finest binned level is reduced from gwas_variants; each coarser level
+    merges bin pairs of the level below, so the variants are scanned once.
+    Runs in the caller's transaction. Returns the number of rows written.
+    """
+    create_manhattan_schema(conn)
+    conn.execute("DELETE FROM manhattan_tiles WHERE trait_name = ?", (trait_name,))
+
+    finest = Config.TILE_RAW_ZOOM - 1
+    bin_bits = Config.TILE_SPAN_BITS - finest - int(np.log2(Config.TILE_BINS))
+    written = conn.execute(
+        """
+        INSERT INTO manhattan_tiles
+            (trait_name, chrom, zoom, bin, pos, variant_id, neg_log_p)
+        SELECT trait_name, chrom, :zoom, pos >> :bin_bits, pos, variant_id,
+               MAX(neg_log_p)
+        FROM gwas_variants
+        WHERE trait_name = :trait AND neg_log_p IS NOT NULL
+        GROUP BY chrom, pos >> :bin_bits
+        """,
+        {"trait": trait_name, "zoom": finest, "bin_bits": bin_bits},
+    ).rowcount
+
+    for zoom in range(finest - 1, -1, -1):
+        written += conn.execute(
+            """
+            INSERT INTO manhattan_tiles
+                (trait_name, chrom, zoom, bin, pos, variant_id, neg_log_p)
+            SELECT trait_name, chrom, :zoom, bin >> 1, pos, variant_id,
+                   MAX(neg_log_p)
+            FROM manhattan_tiles
+            WHERE trait_name = :trait AND zoom = :zoom + 1
+            GROUP BY chrom, bin >> 1
+            """,
+            {"trait": trait_name, "zoom": zoom},
+        ).rowcount
+    return written
+
+
+def attach_locus_database(conn: sqlite3.Connection, locus_db_path: Optional[str]) -> bool:
+    """
+    Attach the locus database as `loci` for build_locus_window_summary()
+
+    Must run outside a transaction. Returns False if there is no locus database.
+    """
+    if not locus_db_path or not os.path.exists(locus_db_path):
+        return False
+    conn.execute("ATTACH DATABASE ? AS loci", (locus_db_path,))
+    return True
+
+
+def build_locus_window_summary(conn: sqlite3.Connection, trait_name: str) -> int:
+    """
+    (Re)build locus_window_summary of one GWAS trait
+
+    For every STR locus of the trait and each Config.LOCUS_WINDOW_SIZES window,
+    stores the variant count, the lead variant and the number of genome-wide
+    significant variants. Reads loci from the attached `loci` database (see
+    attach_locus_database); without it the trait's rows are only cleared.
+    Runs in the caller's transaction. Returns the number of rows written.
+    """
+    create_manhattan_schema(conn)
+    conn.execute(
+        "DELETE FROM locus_window_summary WHERE trait_name = ?", (trait_name,)
+    )
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if "loci" not in attached:
+        return 0
+
+    loci = {}
+    for repeat_id, chrom, pos, locus_trait, phenotype in conn.execute(
+        """
+        SELECT DISTINCT repeat_id, chrom, pos, trait_name, phenotype
+        FROM loci.locus_data
+        WHERE repeat_id IS NOT NULL AND chrom IS NOT NULL AND pos IS NOT NULL
+        """
+    ):
+        if trait_name in (get_gwas_trait_name(locus_trait), get_gwas_trait_name(phenotype)):
+            loci[repeat_id] = (str(chrom).replace("chr", ""), int(pos))
+
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS window_loci (repeat_id TEXT, chrom TEXT, pos INTEGER)"
+    )
+    conn.execute("DELETE FROM temp.window_loci")
+    conn.executemany(
+        "INSERT INTO temp.window_loci VALUES (?, ?, ?)",
+        [(repeat_id, chrom, pos) for repeat_id, (chrom, pos) in loci.items()],
+    )
+
+    written = 0
+    for window_size in Config.LOCUS_WINDOW_SIZES:
+        # Same filters as query_manhattan_data(), so counts match the plots
+        written += conn.execute(
+            """
+            INSERT INTO locus_window_summary
+                (trait_name, repeat_id, window_size, chrom, pos, variant_count,
+                 max_neg_log_p, lead_variant_id, lead_pos, significant_count)
+            SELECT :trait, l.repeat_id, :window, l.chrom, l.pos, COUNT(*),
+                   MAX(v.neg_log_p), v.variant_id, v.pos,
+                   SUM(v.neg_log_p >= :hit_neg_log_p)
+            FROM temp.window_loci l
+            JOIN gwas_variants v
+              ON v.trait_name = :trait AND v.chrom = l.chrom
+             AND v.pos BETWEEN l.pos - :window AND l.pos + :window
+            WHERE v.p_value IS NOT NULL AND v.neg_log_p IS NOT NULL
+            GROUP BY l.repeat_id
+            """,
+            {
+                "trait": trait_name,
+                "window": window_size,
+                "hit_neg_log_p": Config.GENOME_HIT_NEG_LOG_P,
+            },
+        ).rowcount
+    return written
+
+
+def refresh_locus_window_summaries(
+    db_path: str,
+    locus_db_path: str,
+    traits: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """
+    Rebuild locus_window_summary after loci changed, in one transaction
+
+    Args:
+        db_path: Manhattan database
+        locus_db_path: Locus database the loci are read from
+        traits: GWAS trait names (default: every loaded trait; unknown ones are skipped)
+
+    Returns:
+        trait_name -> number of summary rows written
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=60)
+    try:
+        create_manhattan_schema(conn)
+        loaded = [
+            row[0] for row in conn.execute("SELECT trait_name FROM trait_metadata")
+        ]
+        traits = [t for t in traits if t in loaded] if traits is not None else loaded
+        attach_locus_database(conn, locus_db_path)
+
+        written = {}
+        conn.execute("BEGIN")
+        for trait_name in traits:
+            written[trait_name] = build_locus_window_summary(conn, trait_name)
+        conn.execute("COMMIT")
+        return written
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def ingest_gwas_files(
+    files: Dict[str, str],
+    db_path: str,
+    workers: Optional[int] = None,
+    chunksize: int = 500_000,
+    replace: bool = False,
+    locus_db_path: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Load summary-stat files into the Manhattan database
+
+    Files are parsed in parallel by a process pool, each into its own staging
+    database; the parent merges finished traits one at a time while the other
+    files are still being parsed. The target stays in WAL mode, so the app
+    can keep reading it and a failed merge rolls back cleanly. A replaced
+    trait's old rows are deleted in its merge transaction, after its new file
+    has parsed. Indexes are dropped for the load and rebuilt once at the end
+    only when the database starts empty; otherwise they are kept so the app's
+    queries (and the deletes of replaced traits) keep using them. Then the
+    loaded traits' derived tables (genome-wide reduction, tile pyramid and
+    STR locus windows) are built.
+
+    Args:
+        files: trait_name -> summary-stat file path
+        db_path: Manhattan database to load into (created if missing)
+        workers: Parser processes (defaults to the CPU count)
+        chunksize: Rows per streamed chunk
+        replace: Replace traits that are already loaded instead of failing
+        locus_db_path: Locus database for the STR window summaries
+            (defaults to Config.LOCUS_DB_PATH)
+
+    Returns:
+        trait_name -> number of variants loaded
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=60)
+    apply_target_pragmas(conn)
+    create_manhattan_schema(conn)
+
+    existing = {
+        row[0]
+        for row in conn.execute("SELECT trait_name FROM trait_metadata").fetchall()
+    }
+    already_loaded = sorted(set(files) & existing)
+    if already_loaded and not replace:
+        conn.close()
+        raise ValueError(
+            f"Traits already loaded: {already_loaded} (use --replace to reload them)"
+        )
+
+    # Indexes are only deferred while the database is empty: the app queries
+    # (and replaced traits are deleted) through them during the load
+    target_empty = conn.execute("SELECT 1 FROM gwas_variants LIMIT 1").fetchone() is None
+    dropped_indexes = drop_table_indexes(conn, "gwas_variants") if target_empty else []
+
+    loaded = {}
+    started = time.time()
+    staging_dir = tempfile.mkdtemp(
+        prefix="strx_ingest_", dir=os.path.dirname(os.path.abspath(db_path))
+    )
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(parse_summary_stats, path, trait, staging_dir, chunksize): trait
+                for trait, path in files.items()
+            }
+            for future in as_completed(futures):
+                trait_name, staging_path, total, min_p, max_p = future.result()
+                merge_staging(
+                    conn,
+                    trait_name,
+                    staging_path,
+                    total,
+                    min_p,
+                    max_p,
+                    replace=trait_name in existing,
+                )
+                loaded[trait_name] = total
+                print(
+                    f"Loaded {trait_name}: {total:,} variants "
+                    f"({time.time() - started:.0f}s elapsed)"
+                )
+
+    finally:
+        # Rebuild indexes even after a failed file so the app stays usable
+        print("Building indexes...")
+        restore_indexes(conn, dropped_indexes)
+        create_gwas_indexes(conn)
+        conn.execute("ANALYZE")
+        conn.close()
+        for name in os.listdir(staging_dir):
+            os.remove(os.path.join(staging_dir, name))
+        os.rmdir(staging_dir)
+
+    print("Building derived tables...")
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=60)
+    attach_locus_database(conn, locus_db_path or Config.LOCUS_DB_PATH)
+    conn.execute("BEGIN")
+    for trait_name in sorted(loaded):
+        build_genome_reduction(conn, trait_name)
+        build_manhattan_tiles(conn, trait_name)
+        build_locus_window_summary(conn, trait_name)
+    conn.execute("COMMIT")
+    conn.close()
+
+    return loaded
@@ -0,0 +1,307 @@
+"""
+STR locus data ingestion for STRXplorer
+Loads STR association tables into locus_data and precomputes the per-locus
+allele summaries stored in locus_summary and the dose-response trends stored
+in locus_trend
+"""
+import json
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from config import Config
+from src.analysis.trend import allele_table, locus_trends
+from src.database.schema import create_locus_schema
+from src.plots.locus import filter_allele_data, parse_allele_json, summarize_allele_data
+
+# Accepted header names (lower case) for the locus_data core columns
+LOCUS_COLUMN_ALIASES = {
+    "repeat_id": ["repeat_id", "str_id", "id"],
+    "chrom": ["chrom", "chr", "chromosome"],
+    "pos": ["pos", "start_pos", "start", "position"],
+    "motif": ["motif", "repeat_unit", "period_motif"],
+    "ref_len": ["ref_len", "reference_length", "ref_length"],
+    "phenotype": ["phenotype", "trait", "trait_name"],
+}
+
+
+def resolve_locus_columns(header: List[str]) -> Dict[str, str]:
+    """Map locus_data core columns to the matching header names of a file"""
+    lookup = {name.strip().lower(): name for name in header}
+    resolved = {}
+    for column, aliases in LOCUS_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lookup:
+                resolved[column] = lookup[alias]
+                break
+
+    missing = [c for c in ("repeat_id", "chrom", "pos") if c not in resolved]
+    if missing:
+        raise ValueError(f"Missing required columns {missing} in header {header}")
+    if "sample_count_per_summed_length" not in header:
+        raise ValueError("Missing allele column 'sample_count_per_summed_length'")
+    return resolved
+
+
+def read_locus_table(path: str, trait_name: Optional[str] = None) -> List[tuple]:
+    """
+    Read one STR association table into locus_data rows
+
+    Every column that is not a core locus_data column (the allele count, mean
+    and CI columns, and any extra statistics) is kept as a string in data_json,
+    which is the layout query_allele_data() expects.
+    """
+    separator = "," if path.endswith((".csv", ".csv.gz")) else "\t"
+    table = pd.read_csv(
+        path, sep=separator, dtype=str, keep_default_na=False, compression="infer"
+    )
+    columns = resolve_locus_columns(list(table.columns))
+    extra_columns = [c for c in table.columns if c not in columns.values()]
+
+    if trait_name is None and "phenotype" not in columns:
+        raise ValueError(f"{path}: no phenotype column, pass --trait")
+
+    rows = []
+    for record in table.to_dict("records"):
+        phenotype = record[columns["phenotype"]] if "phenotype" in columns else None
+        trait = trait_name or phenotype
+        ref_len = record.get(columns.get("ref_len"), "")
+        rows.append(
+            (
+                record[columns["repeat_id"]],
+                str(record[columns["chrom"]]),
+                int(float(record[columns["pos"]])),
+                record.get(columns.get("motif")) or None,
+                float(ref_len) if ref_len not in ("", None) else None,
+                trait,
+                phenotype or trait,
+                json.dumps({c: record[c] for c in extra_columns}),
+            )
+        )
+    return rows
+
+
+def summarize_locus_rows(
+    rows: Iterable[tuple], thresholds: Iterable[int]
+) -> List[tuple]:
+    """
+    Compute locus_summary rows from (repeat_id, trait_name, phenotype, data_json)
+
+    A locus is summarized under both its trait_name and its phenotype, matching
+    the `trait_name = ? OR phenotype = ?` lookup used by the overview pages.
+    """
+    summaries = []
+    for repeat_id, trait_name, phenotype, data_json in rows:
+        if not repeat_id or not data_json:
+            continue
+        try:
+            dosage_dict, mean_dict, ci_dict = parse_allele_json(data_json)
+        except (ValueError, TypeError) as e:
+            print(f"Skipping {repeat_id}: unreadable data_json ({e})")
+            continue
+
+        traits = {t for t in (trait_name, phenotype) if t}
+        for threshold in thresholds:
+            filtered_dosage, filtered_mean, _ = filter_allele_data(
+                dosage_dict, mean_dict, ci_dict, count_threshold=threshold
+            )
+            if not filtered_dosage:
+                continue
+
+            allele_count, total_samples, mean_effect = summarize_allele_data(
+                filtered_dosage, filtered_mean
+            )
+            for trait in traits:
+                summaries.append(
+                    (
+                        trait,
+                        threshold,
+                        repeat_id,
+                        allele_count,
+                        total_samples,
+                        mean_effect,
+                        abs(mean_effect),
+                    )
+                )
+    return summaries
+
+
+def build_locus_summaries(
+    conn: sqlite3.Connection,
+    traits: Optional[List[str]] = None,
+    thresholds: Iterable[int] = None,
+) -> int:
+    """
+    (Re)build locus_summary for some traits, or for every locus if traits is None
+
+    Runs in the caller's transaction. Returns the number of summary rows written.
+    """
+    thresholds = list(thresholds or Config.LOCUS_SUMMARY_THRESHOLDS)
+    create_locus_schema(conn)
+
+    query = """
+        SELECT repeat_id, trait_name, phenotype, data_json
+        FROM locus_data
+        WHERE repeat_id IS NOT NULL AND data_json IS NOT NULL
+    """
+    if traits is None:
+        conn.execute("DELETE FROM locus_summary")
+        rows = conn.execute(query).fetchall()
+    else:
+        rows = []
+        for trait in traits:
+            conn.execute("DELETE FROM locus_summary WHERE trait = ?", (trait,))
+            rows.extend(
+                conn.execute(
+                    query + " AND (trait_name = ? OR phenotype = ?)", (trait, trait)
+                ).fetchall()
+            )
+
+    summaries = summarize_locus_rows(rows, thresholds)
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO locus_summary
+            (trait, count_threshold, repeat_id, allele_count, total_samples,
+             mean_effect, abs_mean_effect)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        summaries,
+    )
+    return len(summaries)
+
+
+def build_locus_trends(
+    conn: sqlite3.Connection,
+    traits: Optional[List[str]] = None,
+    thresholds: Iterable[int] = None,
+) -> int:
+    """
+    (Re)build locus_trend for some traits, or for every locus if traits is None
+
+    Every locus is decoded once; each threshold is then one vectorized fit
+    over all of them. A locus is stored under both its trait_name and its
+    phenotype, like locus_summary. Runs in the caller's transaction and
+    returns the number of trend rows written.
+    """
+    thresholds = list(thresholds or Config.LOCUS_SUMMARY_THRESHOLDS)
+    create_locus_schema(conn)
+
+    query = """
+        SELECT repeat_id, trait_name, phenotype, data_json
+        FROM locus_data
+        WHERE repeat_id IS NOT NULL AND data_json IS NOT NULL
+    """
+    if traits is None:
+        conn.execute("DELETE FROM locus_trend")
+        rows = conn.execute(query).fetchall()
+    else:
+        rows = []
+        for trait in traits:
+            conn.execute("DELETE FROM locus_trend WHERE trait = ?", (trait,))
+            rows.extend(
+                conn.execute(
+                    query + " AND (trait_name = ? OR phenotype = ?)", (trait, trait)
+                ).fetchall()
+            )
+
+    keys, table = allele_table(
+        ((repeat_id, trait_name, phenotype), data_json)
+        for repeat_id, trait_name, phenotype, data_json in rows
+    )
+
+    records = []
+    for threshold in thresholds:
+        trends = locus_trends(keys, table, threshold)
+        values = trends[["allele_count", "total_samples", "slope", "slope_se", "t_stat", "p_value"]]
+        values = values.astype(object).where(values.notna(), None)
+        for index, stats in zip(trends.index, values.itertuples(index=False)):
+            repeat_id, trait_name, phenotype = keys[index]
+            for trait in {t for t in (trait_name, phenotype) if t}:
+                records.append((trait, threshold, repeat_id, *stats))
+
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO locus_trend
+            (trait, count_threshold, repeat_id, allele_count, total_samples,
+             slope, slope_se, t_stat, p_value)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        records,
+    )
+    return len(records)
+
+
+def ingest_locus_files(
+    files: List[str],
+    db_path: str,
+    trait_name: Optional[str] = None,
+    replace: bool = False,
+) -> Dict[str, int]:
+    """
+    Load STR association tables into locus_data and summarize the loaded traits
+
+    Each run commits as a single transaction, so readers never see a trait
+    whose loci are only partly loaded or whose summaries are stale.
+
+    Returns:
+        trait -> number of loci loaded
+    """
+    started = time.time()
+    rows = []
+    for path in files:
+        file_rows = read_locus_table(path, trait_name)
+        print(f"Read {len(file_rows):,} loci from {path}")
+        rows.extend(file_rows)
+
+    loaded = {}
+    for row in rows:
+        loaded[row[5]] = loaded.get(row[5], 0) + 1
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        create_locus_schema(conn)
+        conn.execute("BEGIN")
+
+        existing = [
+            trait
+            for trait in loaded
+            if conn.execute(
+                "SELECT 1 FROM locus_data WHERE trait_name = ? OR phenotype = ? LIMIT 1",
+                (trait, trait),
+            ).fetchone()
+        ]
+        if existing and not replace:
+            raise ValueError(
+                f"Traits already loaded: {sorted(existing)} (use --replace to reload them)"
+            )
+        for trait in existing:
+            conn.execute(
+                "DELETE FROM locus_data WHERE trait_name = ? OR phenotype = ?",
+                (trait, trait),
+            )
+
+        conn.executemany(
+            """
+            INSERT INTO locus_data
+                (repeat_id, chrom, pos, motif, ref_len, trait_name, phenotype, data_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        summary_count = build_locus_summaries(conn, sorted(loaded))
+        build_locus_trends(conn, sorted(loaded))
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    print(
+        f"Wrote {len(rows):,} loci and {summary_count:,} summaries "
+        f"in {time.time() - started:.1f}s"
+    )
+    return loaded
@@ -0,0 +1,204 @@
+"""
+GWAS shard building for STRXplorer
+Builds one database file per trait, either by copying a trait out of the
+main Manhattan database or from a summary-stat file, in parallel across
+traits, and attaches each finished shard to the manifest
+"""
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from src.database.schema import (
+    DATASET_VERSIONS_TABLE,
+    create_gwas_indexes,
+    create_manhattan_schema,
+    table_exists,
+)
+from src.database.shards import attach_shard, shard_file_path
+from src.ingest.gwas import apply_bulk_pragmas, attach_locus_database
+from src.ingest.trait import GWAS_DERIVED_TABLES, bump_data_version, write_gwas_trait
+
+# Per-trait tables copied into a shard along with gwas_variants
+SHARD_TABLES = ["trait_metadata"] + [name for name, _ in GWAS_DERIVED_TABLES]
+
+
+def build_shard(
+    trait_name: str,
+    source_db_path: str,
+    locus_db_path: Optional[str] = None,
+) -> Tuple[str, str, int]:
+    """
+    Copy one trait out of a Manhattan database into its own shard file
+
+    The shard is written to a temporary file with bulk-load pragmas and
+    renamed over shard_file_path(trait_name) when complete, so a shard that
+    is being served is replaced atomically. Derived tables the source lacks
+    for the trait are built in the shard. Runs in a worker process.
+
+    Returns:
+        (trait_name, shard path, variant count)
+    """
+    path = shard_file_path(trait_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.building"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    conn = sqlite3.connect(temp_path, isolation_level=None)
+    try:
+        apply_bulk_pragmas(conn)
+        create_manhattan_schema(conn)
+        conn.execute("ATTACH DATABASE ? AS source", (source_db_path,))
+        attach_locus_database(conn, locus_db_path or Config.LOCUS_DB_PATH)
+
+        conn.execute("BEGIN")
+        total = conn.execute(
+            """
+            INSERT INTO gwas_variants
+                (trait_name, chrom, pos, variant_id, p_value, neg_log_p, beta, se)
+            SELECT trait_name, chrom, pos, variant_id, p_value, neg_log_p, beta, se
+            FROM source.gwas_variants
+            WHERE trait_name = ?
+            ORDER BY chrom, pos
+            """,
+            (trait_name,),
+        ).rowcount
+        if total <= 0:
+            raise ValueError(f"Trait '{trait_name}' is not in {source_db_path}")
+
+        copied = {}
+        for table in SHARD_TABLES:
+            exists = conn.execute(
+                "SELECT 1 FROM source.sqlite_master WHERE type = 'table' AND name = ?",
+                (table,),
+            ).fetchone()
+            copied[table] = (
+                conn.execute(
+                    f"INSERT INTO main.{table} SELECT * FROM source.{table} WHERE trait_name = ?",
+                    (trait_name,),
+                ).rowcount
+                if exists
+                else 0
+            )
+        for table, builder in GWAS_DERIVED_TABLES:
+            if not copied[table]:
+                builder(conn, trait_name)
+        conn.execute(DATASET_VERSIONS_TABLE)
+        bump_data_version(conn, trait_name)
+        conn.execute("COMMIT")
+
+        conn.execute("DETACH DATABASE source")
+        create_gwas_indexes(conn)
+        conn.execute("ANALYZE")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.close()
+        os.remove(temp_path)
+        raise
+    conn.close()
+
+    os.replace(temp_path, path)
+    return trait_name, path, total
+
+
+def build_shards(
+    traits: Optional[List[str]] = None,
+    source_db_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    locus_db_path: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Split traits of the main Manhattan database into shards, in parallel
+
+    Each finished shard is attached right away, so the app starts routing
+    that trait to it while the others are still being built.
+
+    Args:
+        traits: GWAS trait names (default: every trait in the source)
+        source_db_path: Database to copy from (default: Config.MANHATTAN_DB_PATH)
+        workers: Builder processes (defaults to the CPU count)
+        locus_db_path: Locus database for STR window summaries the source lacks
+
+    Returns:
+        trait_name -> number of variants in its shard
+    """
+    source_db_path = source_db_path or Config.MANHATTAN_DB_PATH
+    if traits is None:
+        conn = sqlite3.connect(f"file:{source_db_path}?mode=ro", uri=True)
+        try:
+            if not table_exists(conn, "trait_metadata"):
+                raise ValueError(f"{source_db_path} has no trait_metadata table")
+            traits = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT trait_name FROM trait_metadata ORDER BY trait_name"
+                )
+            ]
+        finally:
+            conn.close()
+
+    built = {}
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(build_shard, trait, source_db_path, locus_db_path)
+            for trait in traits
+        ]
+        for future in as_completed(futures):
+            trait_name, path, total = future.result()
+            attach_shard(trait_name, path)
+            built[trait_name] = total
+            print(
+                f"Built shard {trait_name}: {total:,} variants "
+                f"({time.time() - started:.0f}s elapsed)"
+            )
+    return built
+
+
+def ingest_shard_files(
+    files: Dict[str, str],
+    workers: Optional[int] = None,
+    replace: bool = False,
+    locus_db_path: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Load summary-stat files straight into per-trait shards, in parallel
+
+    Each trait is written by write_gwas_trait() (parse, indexed insert and
+    derived tables) into its own shard file, then attached.
+
+    Args:
+        files: trait_name -> summary-stat file path
+        workers: Loader processes (defaults to the CPU count)
+        replace: Reload traits whose shard already holds them
+        locus_db_path: Locus database for the STR window summaries
+
+    Returns:
+        trait_name -> number of variants loaded
+    """
+    for trait_name in files:
+        os.makedirs(os.path.dirname(shard_file_path(trait_name)), exist_ok=True)
+
+    loaded = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                write_gwas_trait,
+                trait_name,
+                path,
+                shard_file_path(trait_name),
+                replace,
+                locus_db_path,
+            ): trait_name
+            for trait_name, path in files.items()
+        }
+        for future in as_completed(futures):
+            trait_name = futures[future]
+            loaded[trait_name] = future.result()
+            attach_shard(trait_name, shard_file_path(trait_name))
+            print(f"Loaded shard {trait_name}: {loaded[trait_name]:,} variants")
+    return loaded
@@ -0,0 +1,305 @@
+"""
+Incremental single-trait updates for STRXplorer
+Adds, replaces or removes one trait in a live database: each database is
+switched to WAL mode so the app keeps serving reads, and each trait change
+commits atomically together with its derived tables
+"""
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Callable, List, Optional, Tuple
+
+from config import Config
+from src.database.models import get_gwas_trait_name
+from src.database.schema import (
+    DATASET_VERSIONS_TABLE,
+    create_gwas_indexes,
+    create_locus_schema,
+    create_manhattan_schema,
+)
+from src.database.shards import detach_shard, gwas_db_path
+from src.ingest.gwas import (
+    attach_locus_database,
+    build_genome_reduction,
+    build_locus_window_summary,
+    build_manhattan_tiles,
+    parse_summary_stats,
+    refresh_locus_window_summaries,
+)
+from src.ingest.locus import build_locus_summaries, build_locus_trends, read_locus_table
+
+
+def refresh_locus_summaries(conn: sqlite3.Connection, trait_name: str):
+    build_locus_summaries(conn, [trait_name])
+
+
+def refresh_locus_trends(conn: sqlite3.Connection, trait_name: str):
+    build_locus_trends(conn, [trait_name])
+
+
+# Derived tables rebuilt for a trait inside the same transaction as its rows.
+# Builders take (connection, trait_name) and must only touch that trait.
+GWAS_DERIVED_TABLES: List[Tuple[str, Callable]] = [
+    ("genome_reduction", build_genome_reduction),
+    ("manhattan_tiles", build_manhattan_tiles),
+    ("locus_window_summary", build_locus_window_summary),
+]
+LOCUS_DERIVED_TABLES: List[Tuple[str, Callable]] = [
+    ("locus_summary", refresh_locus_summaries),
+    ("locus_trend", refresh_locus_trends),
+]
+
+
+def open_live_database(db_path: str) -> sqlite3.Connection:
+    """
+    Open a database for incremental writes next to a running app
+
+    WAL mode lets readers keep using the last committed snapshot while a
+    trait is being written; the busy timeout waits out concurrent checkpoints.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=60)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA busy_timeout = 60000")
+    conn.execute(DATASET_VERSIONS_TABLE)
+    return conn
+
+
+def bump_data_version(conn: sqlite3.Connection, trait_name: str):
+    """Record that a trait changed so caches keyed on its version go stale"""
+    conn.execute(
+        """
+        INSERT INTO dataset_versions (trait_name, version, updated_at)
+        VALUES (?, 1, ?)
+        ON CONFLICT (trait_name) DO UPDATE
+        SET version = version + 1, updated_at = excluded.updated_at
+        """,
+        (trait_name, time.time()),
+    )
+
+
+def refresh_derived_tables(conn: sqlite3.Connection, builders, trait_name: str):
+    for table_name, builder in builders:
+        started = time.time()
+        builder(conn, trait_name)
+        print(f"  refreshed {table_name} ({time.time() - started:.1f}s)")
+
+
+def write_gwas_trait(
+    trait_name: str,
+    gwas_file: Optional[str],
+    db_path: str,
+    replace: bool = False,
+    locus_db_path: Optional[str] = None,
+) -> int:
+    """
+    Add, replace (gwas_file given) or remove (gwas_file None) one GWAS trait
+
+    The file is parsed into a staging database first, so the write
+    transaction only covers the delete, the indexed insert and the derived
+    table refresh. The locus database is attached for the STR window
+    summaries. Returns the number of variants now stored for the trait.
+    """
+    staging_dir = None
+    staged = None
+    if gwas_file is not None:
+        staging_dir = tempfile.mkdtemp(
+            prefix="strx_trait_", dir=os.path.dirname(os.path.abspath(db_path))
+        )
+        print(f"Parsing {gwas_file}...")
+        staged = parse_summary_stats(gwas_file, trait_name, staging_dir)
+
+    conn = open_live_database(db_path)
+    try:
+        create_manhattan_schema(conn)
+        create_gwas_indexes(conn)
+        if staged is not None:
+            conn.execute("ATTACH DATABASE ? AS staging", (staged[1],))
+        attach_locus_database(conn, locus_db_path or Config.LOCUS_DB_PATH)
+
+        conn.execute("BEGIN IMMEDIATE")
+        exists = conn.execute(
+            "SELECT 1 FROM trait_metadata WHERE trait_name = ?", (trait_name,)
+        ).fetchone()
+        if exists and staged is not None and not replace:
+            raise ValueError(
+                f"Trait '{trait_name}' already loaded (use replace to reload it)"
+            )
+        if not exists and staged is None:
+            raise ValueError(f"Trait '{trait_name}' is not in {db_path}")
+
+        conn.execute("DELETE FROM gwas_variants WHERE trait_name = ?", (trait_name,))
+        conn.execute("DELETE FROM trait_metadata WHERE trait_name = ?", (trait_name,))
+
+        total = 0
+        if staged is not None:
+            _, _, total, min_p, max_p = staged
+            conn.execute(
+                """
+                INSERT INTO gwas_variants
+                    (trait_name, chrom, pos, variant_id, p_value, neg_log_p, beta, se)
+                SELECT trait_name, chrom, pos, variant_id, p_value, neg_log_p, beta, se
+                FROM staging.gwas_variants
+                ORDER BY chrom, pos
+                """
+            )
+            conn.execute(
+                """
+                INSERT INTO trait_metadata
+                    (trait_name, total_variants, min_p_value, max_p_value)
+                VALUES (?, ?, ?, ?)
+                """,
+                (trait_name, total, min_p, max_p),
+            )
+
+        refresh_derived_tables(conn, GWAS_DERIVED_TABLES, trait_name)
+        bump_data_version(conn, trait_name)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+        if staging_dir is not None:
+            for name in os.listdir(staging_dir):
+                os.remove(os.path.join(staging_dir, name))
+            os.rmdir(staging_dir)
+
+    # Refresh planner statistics for the changed table without a full ANALYZE
+    conn = open_live_database(db_path)
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    return total
+
+
+def write_locus_trait(
+    trait_name: str,
+    loci_file: Optional[str],
+    db_path: str,
+    replace: bool = False,
+) -> int:
+    """
+    Add, replace (loci_file given) or remove (loci_file None) one trait's loci
+
+    Summaries and trends are stored under both a locus's trait_name and its
+    phenotype, so they are rebuilt for every name of the removed and the
+    inserted loci, not only for trait_name. Returns the number of loci now
+    stored for the trait.
+    """
+    rows = read_locus_table(loci_file, trait_name) if loci_file is not None else []
+
+    conn = open_live_database(db_path)
+    try:
+        create_locus_schema(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        exists = conn.execute(
+            "SELECT 1 FROM locus_data WHERE trait_name = ? OR phenotype = ? LIMIT 1",
+            (trait_name, trait_name),
+        ).fetchone()
+        if exists and loci_file is not None and not replace:
+            raise ValueError(
+                f"Loci for '{trait_name}' already loaded (use replace to reload them)"
+            )
+        if not exists and loci_file is None:
+            raise ValueError(f"No loci for '{trait_name}' in {db_path}")
+
+        affected = {trait_name}
+        for names in conn.execute(
+            """
+            SELECT DISTINCT trait_name, phenotype FROM locus_data
+            WHERE trait_name = ? OR phenotype = ?
+            """,
+            (trait_name, trait_name),
+        ):
+            affected.update(name for name in names if name)
+        affected.update(name for row in rows for name in (row[5], row[6]) if name)
+
+        conn.execute(
+            "DELETE FROM locus_data WHERE trait_name = ? OR phenotype = ?",
+            (trait_name, trait_name),
+        )
+        conn.executemany(
+            """
+            INSERT INTO locus_data
+                (repeat_id, chrom, pos, motif, ref_len, trait_name, phenotype, data_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+        for name in sorted(affected):
+            refresh_derived_tables(conn, LOCUS_DERIVED_TABLES, name)
+            bump_data_version(conn, name)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return len(rows)
+
+
+def update_trait(
+    trait_name: str,
+    gwas_file: Optional[str] = None,
+    loci_file: Optional[str] = None,
+    gwas_trait_name: Optional[str] = None,
+    replace: bool = False,
+    remove: bool = False,
+    locus_db_path: Optional[str] = None,
+    manhattan_db_path: Optional[str] = None,
+):
+    """
+    Add, replace or remove one trait across the locus and Manhattan databases
+
+    The locus database is written first: a new trait's loci only link to
+    Manhattan plots once its GWAS rows are committed, so readers never follow
+    a link into a half-loaded trait. The two files commit separately; when
+    only loci change, the trait's STR window summaries are refreshed after.
+    """
+    gwas_trait_name = gwas_trait_name or get_gwas_trait_name(trait_name)
+    locus_db_path = locus_db_path or Config.LOCUS_DB_PATH
+    # Without an explicit database, GWAS rows go to the trait's shard if it has one
+    sharded = manhattan_db_path is None and (
+        gwas_db_path(gwas_trait_name) != Config.MANHATTAN_DB_PATH
+    )
+    manhattan_db_path = manhattan_db_path or gwas_db_path(gwas_trait_name)
+
+    if remove:
+        targets = [
+            (write_gwas_trait, gwas_trait_name, manhattan_db_path),
+            (write_locus_trait, trait_name, locus_db_path),
+        ]
+        if sharded and os.path.exists(Config.MANHATTAN_DB_PATH):
+            targets.append((write_gwas_trait, gwas_trait_name, Config.MANHATTAN_DB_PATH))
+
+        errors = []
+        for write, name, db_path in targets:
+            try:
+                write(name, None, db_path)
+                print(f"Removed {name} from {db_path}")
+            except ValueError as e:
+                errors.append(str(e))
+        if sharded:
+            detach_shard(gwas_trait_name)
+            print(f"Detached the {gwas_trait_name} shard")
+        if len(errors) == len(targets):
+            raise ValueError("; ".join(errors))
+        return
+
+    if loci_file is not None:
+        count = write_locus_trait(trait_name, loci_file, locus_db_path, replace)
+        print(f"Wrote {count:,} loci for {trait_name}")
+    if gwas_file is not None:
+        count = write_gwas_trait(
+            gwas_trait_name, gwas_file, manhattan_db_path, replace, locus_db_path
+        )
+        print(f"Wrote {count:,} variants for {gwas_trait_name}")
+    elif os.path.exists(manhattan_db_path):
+        refresh_locus_window_summaries(
+            manhattan_db_path, locus_db_path, [gwas_trait_name]
+        )
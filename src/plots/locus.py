@@ -4,11 +4,14 @@ Includes both full-size and mini locus plots for trait overview pages
 """
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import numpy as np
-import sqlite3
+from src.database.models import get_locus_row
+from src.database.utils import connect
 import json
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, Iterator, List
 from config import Config
+from src.utils.timing import timed
 
 
 def parse_float_or_nan(x):
@@ -18,6 +21,7 @@ def parse_float_or_nan(x):
     return float(x)
 
 
+@timed("db_allele_data")
 def query_allele_data(
     db_path: str, repeat_id: str
 ) -> Tuple[
@@ -31,27 +35,121 @@ def query_allele_data(
       - ci_dict: confidence intervals per summed length
       - phenotype: the phenotype string stored in the table
       - trait_name: the trait_name string stored in the table
+    The row is shared with the request's other lookups of the same repeat_id.
     """
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+    row = get_locus_row(repeat_id, db_path)
 
-    # pull data_json plus phenotype & trait_name
-    cur.execute(
+    if not row:
+        print(f"[WARNING] No data found for repeat_id: {repeat_id}")
+        return None, None, None, None, None
+
+    _, _, data_json, phenotype, trait_name = row
+    dosage_dict, mean_dict, ci_dict = parse_allele_json(data_json)
+
+    return dosage_dict, mean_dict, ci_dict, phenotype, trait_name
+
+
+@timed("db_allele_data_all_traits")
+def query_allele_data_all_traits(db_path: str, repeat_id: str) -> List[Dict]:
+    """
+    Allele data for every trait associated with a repeat_id, in one query.
+    Returns one dict per locus_data row (trait, phenotype, chrom, pos, motif,
+    dosage_dict, mean_dict, ci_dict), ordered by trait name.
+    """
+    conn = connect(db_path)
+    cursor = conn.execute(
         """
-        SELECT data_json, phenotype, trait_name
+        SELECT data_json, phenotype, trait_name, chrom, pos, motif
           FROM locus_data
          WHERE repeat_id = ?
+         ORDER BY COALESCE(trait_name, phenotype)
         """,
         (repeat_id,),
     )
-    row = cur.fetchone()
+    rows = cursor.fetchall()
     conn.close()
 
-    if not row:
-        print(f"[WARNING] No data found for repeat_id: {repeat_id}")
-        return None, None, None, None, None
+    entries = []
+    for data_json, phenotype, trait_name, chrom, pos, motif in rows:
+        dosage_dict, mean_dict, ci_dict = parse_allele_json(data_json)
+        entries.append(
+            {
+                "trait": trait_name or phenotype,
+                "phenotype": phenotype,
+                "chrom": str(chrom).replace("chr", "") if chrom else None,
+                "pos": int(pos) if pos is not None else None,
+                "motif": motif,
+                "dosage_dict": dosage_dict,
+                "mean_dict": mean_dict,
+                "ci_dict": ci_dict,
+            }
+        )
+    return entries
+
 
-    data_json, phenotype, trait_name = row
+def iter_allele_data_batch(
+    db_path: str,
+    repeat_ids: List[str],
+    trait_name: Optional[str] = None,
+    chunk_size: int = 500,
+) -> Iterator[Dict]:
+    """
+    Locus rows for many repeat_ids over one connection, one IN (...) query per
+    chunk of ids. Yields the same fields as query_allele_data_all_traits, in
+    request order and then by trait; ids without rows are skipped.
+    """
+    conn = connect(db_path)
+    try:
+        for start in range(0, len(repeat_ids), chunk_size):
+            chunk = repeat_ids[start : start + chunk_size]
+            sql = f"""
+                SELECT repeat_id, data_json, phenotype, trait_name, chrom, pos, motif
+                  FROM locus_data
+                 WHERE repeat_id IN ({",".join("?" * len(chunk))})
+            """
+            params = list(chunk)
+            if trait_name:
+                sql += " AND (trait_name = ? OR phenotype = ?)"
+                params += [trait_name, trait_name]
+            rows = conn.execute(sql, params).fetchall()
+
+            order = {repeat_id: i for i, repeat_id in enumerate(chunk)}
+            rows.sort(key=lambda row: (order[row[0]], row[3] or row[2] or ""))
+            for repeat_id, data_json, phenotype, trait, chrom, pos, motif in rows:
+                dosage_dict, mean_dict, ci_dict = parse_allele_json(data_json)
+                yield {
+                    "repeat_id": repeat_id,
+                    "trait": trait or phenotype,
+                    "phenotype": phenotype,
+                    "chrom": str(chrom).replace("chr", "") if chrom else None,
+                    "pos": int(pos) if pos is not None else None,
+                    "motif": motif,
+                    "dosage_dict": dosage_dict,
+                    "mean_dict": mean_dict,
+                    "ci_dict": ci_dict,
+                }
+    finally:
+        conn.close()
+
+
+def allele_arrays(dosage_dict: Dict, mean_dict: Dict, ci_dict: Dict) -> Dict[str, list]:
+    """(Filtered) allele dicts as parallel arrays sorted by summed length"""
+    alleles = sorted(dosage_dict.keys(), key=float)
+    return {
+        "length": [float(a) for a in alleles],
+        "count": [parse_float_or_nan(dosage_dict[a]) for a in alleles],
+        "mean": [parse_float_or_nan(mean_dict[a]) for a in alleles],
+        "ci_lower": [parse_float_or_nan(ci_dict[a][0]) for a in alleles],
+        "ci_upper": [parse_float_or_nan(ci_dict[a][1]) for a in alleles],
+    }
+
+
+def parse_allele_json(data_json: str) -> Tuple[Dict, Dict, Dict]:
+    """
+    Decode the data_json column of locus_data.
+    Returns the dosage (sample count), mean phenotype and CI dicts keyed by
+    summed allele length.
+    """
     data = json.loads(data_json)
 
     # Extract the actual allele data from JSON
@@ -60,9 +158,10 @@ def query_allele_data(
     mean_dict = json.loads(data.get(mean_col_name, "{}")) if mean_col_name else {}
     ci_dict = json.loads(data.get("summed_length_0.05_alpha_CI", "{}"))
 
-    return dosage_dict, mean_dict, ci_dict, phenotype, trait_name
+    return dosage_dict, mean_dict, ci_dict
 
 
+@timed("filter_alleles")
 def filter_allele_data(
     dosage_dict: Dict,
     mean_dict: Dict,
@@ -112,6 +211,18 @@ def filter_allele_data(
     return filtered_dosage, filtered_mean, filtered_ci
 
 
+def summarize_allele_data(dosage_dict: Dict, mean_dict: Dict) -> Tuple[int, int, float]:
+    """
+    Summary statistics shown on the locus overview grid.
+    Returns (allele_count, total_samples, mean_effect) for (filtered) allele data.
+    """
+    allele_count = len(dosage_dict)
+    total_samples = sum(float(v) for v in dosage_dict.values())
+    mean_effect = float(np.mean([float(v) for v in mean_dict.values()]))
+    return allele_count, int(total_samples), mean_effect
+
+
+@timed("plot_locus")
 def generate_figure_plotly(
     dosage_dict: Dict,
     mean_dict: Dict,
@@ -332,6 +443,7 @@ def generate_figure_plotly(
     return fig
 
 
+@timed("plot_mini_locus")
 def create_mini_locus_plot(
     dosage_dict: Dict,
     mean_dict: Dict,
@@ -438,3 +550,86 @@ def create_mini_locus_plot(
     )
 
     return fig
+
+
+@timed("plot_locus_phewas")
+def create_locus_phewas_plot(rows: List[Dict], repeat_id: str) -> go.Figure:
+    """
+    Compact cross-trait panel for one STR locus: the allele effect summary
+    (left) and the strongest GWAS signal near the locus (right) per trait
+    """
+    traits = [row["trait"].replace("_", " ").title() for row in rows]
+    effects = [row["mean_effect"] for row in rows]
+    significance = [row["max_significance"] for row in rows]
+
+    fig = make_subplots(
+        rows=1,
+        cols=2,
+        shared_yaxes=True,
+        horizontal_spacing=0.04,
+        subplot_titles=("Mean effect", "Max -log₁₀(p) near locus"),
+    )
+
+    fig.add_trace(
+        go.Bar(
+            x=effects,
+            y=traits,
+            orientation="h",
+            marker_color=[
+                "rgba(40, 167, 69, 0.8)" if (e or 0) > 0 else "rgba(220, 53, 69, 0.8)"
+                for e in effects
+            ],
+            text=[
+                f"{row['allele_count']} alleles, {row['total_samples']:,} samples"
+                if row["allele_count"]
+                else "No alleles after filtering"
+                for row in rows
+            ],
+            hovertemplate="%{y}<br>Effect: %{x:.3f}<br>%{text}<extra></extra>",
+            textposition="none",
+            showlegend=False,
+        ),
+        row=1,
+        col=1,
+    )
+
+    fig.add_trace(
+        go.Bar(
+            x=significance,
+            y=traits,
+            orientation="h",
+            marker_color=[
+                "rgba(220, 53, 69, 0.8)" if (s or 0) >= 7.3 else "rgba(31, 119, 180, 0.8)"
+                for s in significance
+            ],
+            text=[
+                f"{row['variant_count']:,} variants, {row['significant_count']:,} significant"
+                if row["variant_count"]
+                else "No GWAS data"
+                for row in rows
+            ],
+            hovertemplate="%{y}<br>-log₁₀(p): %{x:.2f}<br>%{text}<extra></extra>",
+            textposition="none",
+            showlegend=False,
+        ),
+        row=1,
+        col=2,
+    )
+
+    # Genome-wide significance threshold
+    fig.add_vline(
+        x=-np.log10(5e-8), line_dash="dash", line_color="red", opacity=0.6, row=1, col=2
+    )
+
+    fig.update_layout(
+        title=f"STR {repeat_id} across traits",
+        height=max(250, 60 + 32 * len(rows)),
+        margin=dict(l=180, r=20, t=60, b=40),
+        plot_bgcolor="white",
+        hovermode="closest",
+        bargap=0.3,
+    )
+    fig.update_xaxes(showgrid=True, gridcolor="lightgray", zeroline=True, zerolinecolor="gray")
+    fig.update_yaxes(autorange="reversed")
+
+    return fig
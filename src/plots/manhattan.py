@@ -4,16 +4,28 @@ Manhattan plot generation functions for STRXplorer
 import pandas as pd
 import plotly.graph_objects as go
 import numpy as np
+import plotly.colors
+from config import Config
+from src.analysis.clumping import clump_leads
+from src.utils.timing import timed
 
 
+@timed("plot_manhattan")
 def create_manhattan_plot(
     data: pd.DataFrame,
     trait_name: str,
     target_chrom: str,
     target_pos: int,
     window_size: int,
+    highlight_clumps: bool = False,
 ):
-    """Create Manhattan plot from database data"""
+    """
+    Create Manhattan plot from database data
+
+    If data was annotated by clump_variants(), lead variants are marked and
+    the strongest are labeled; highlight_clumps also colors each clump's
+    variants and shades its extent.
+    """
 
     fig = go.Figure()
 
@@ -30,6 +42,8 @@ def create_manhattan_plot(
             text += f"ID: {row['variant_id']}"
             if pd.notna(row["beta"]):
                 text += f"<br>Beta: {row['beta']:.3f}"
+            if row.get("clump_id", 0) > 0:
+                text += f"<br>Clump {row['clump_id']} (lead {row['lead_variant_id']})"
             hover_text.append(text)
 
         # Add scatter plot
@@ -59,12 +73,17 @@ def create_manhattan_plot(
             line=dict(color="red", width=2, dash="dash"),
         )
 
-        # Add significance threshold
+        if "clump_id" in data.columns:
+            add_clump_traces(fig, data, max_y, highlight_clumps)
+
+        # Add significance threshold (spans the plot width, so it stays put
+        # when the client zooms out with tiles)
         significance_line = -np.log10(5e-8)
         fig.add_shape(
             type="line",
-            x0=start_pos,
-            x1=end_pos,
+            xref="paper",
+            x0=0,
+            x1=1,
             y0=significance_line,
             y1=significance_line,
             line=dict(color="blue", width=1.5, dash="dash"),
@@ -99,6 +118,84 @@ def create_manhattan_plot(
     return fig
 
 
+def add_clump_traces(fig, data: pd.DataFrame, max_y: float, highlight: bool):
+    """
+    Mark and label the clump leads of a clump_variants() table
+
+    Added after the variant trace, which stays trace 0 for tile loading.
+    """
+    leads = clump_leads(data)
+    if leads.empty:
+        return
+
+    if highlight:
+        palette = plotly.colors.qualitative.Plotly
+        members = data[data["clump_id"] > 0]
+        fig.add_trace(
+            go.Scatter(
+                x=members["pos"],
+                y=members["neg_log_p"],
+                mode="markers",
+                marker=dict(
+                    color=[palette[(c - 1) % len(palette)] for c in members["clump_id"]],
+                    size=6,
+                    line=dict(width=0),
+                ),
+                name="Clump members",
+                hoverinfo="skip",
+            )
+        )
+        for lead in leads.itertuples():
+            fig.add_shape(
+                type="rect",
+                x0=lead.clump_start,
+                x1=lead.clump_end,
+                y0=0,
+                y1=max_y,
+                fillcolor=palette[(lead.clump_id - 1) % len(palette)],
+                opacity=0.08,
+                line=dict(width=0),
+                layer="below",
+            )
+
+    fig.add_trace(
+        go.Scatter(
+            x=leads["pos"],
+            y=leads["neg_log_p"],
+            mode="markers",
+            marker=dict(
+                symbol="diamond",
+                color="orange",
+                size=11,
+                line=dict(color="black", width=1),
+            ),
+            name="Clump leads",
+            text=[
+                f"Lead {lead.variant_id} (clump {lead.clump_id})<br>"
+                f"Chr{lead.chrom}:{lead.pos}<br>"
+                f"P-value: {lead.p_value:.2e}<br>"
+                f"{lead.clump_size:,} variants, {lead.clump_start:,}-{lead.clump_end:,}"
+                for lead in leads.itertuples()
+            ],
+            hoverinfo="text",
+            hovertemplate="%{text}<extra></extra>",
+        )
+    )
+
+    for lead in leads.head(Config.CLUMP_LABELED_LEADS).itertuples():
+        fig.add_annotation(
+            x=lead.pos,
+            y=lead.neg_log_p,
+            text=str(lead.variant_id or f"{lead.pos:,}"),
+            showarrow=True,
+            arrowhead=0,
+            ax=0,
+            ay=-25,
+            font=dict(size=10),
+        )
+
+
+@timed("plot_mini_manhattan")
 def create_mini_manhattan_plot(data, trait_name, chrom, target_pos, repeat_id):
     """Create a smaller Manhattan plot for the trait overview grid"""
     fig = go.Figure()
@@ -176,3 +273,119 @@ def create_mini_manhattan_plot(data, trait_name, chrom, target_pos, repeat_id):
     )
 
     return fig
+
+
+def chromosome_sort_key(chrom: str):
+    """Sort chromosomes 1-22 numerically, then X, Y, MT and anything else"""
+    chrom = str(chrom)
+    if chrom.isdigit():
+        return (0, int(chrom), "")
+    order = {"X": 23, "Y": 24, "MT": 25, "M": 25}
+    return (1, order.get(chrom.upper(), 26), chrom)
+
+
+def genome_offsets(data: pd.DataFrame, loci: list) -> dict:
+    """
+    Cumulative x offset of each chromosome for a genome-wide plot
+
+    Chromosome lengths are taken from the largest position seen in the data or
+    the loci, so the layout works for any genome build.
+    """
+    lengths = data.groupby("chrom")["pos"].max().to_dict() if not data.empty else {}
+    for locus in loci:
+        lengths[locus["chrom"]] = max(lengths.get(locus["chrom"], 0), locus["pos"])
+
+    offsets = {}
+    total = 0
+    gap = 10_000_000
+    for chrom in sorted(lengths, key=chromosome_sort_key):
+        offsets[chrom] = (total, lengths[chrom])
+        total += lengths[chrom] + gap
+    return offsets
+
+
+@timed("plot_genome_manhattan")
+def create_genome_manhattan_plot(data: pd.DataFrame, loci: list, trait_name: str):
+    """
+    Genome-wide Manhattan plot in cumulative coordinates
+
+    `data` is a genome_reduction (significant hits plus binned maxima), drawn
+    with WebGL; STR loci are marked along the baseline and carry their
+    repeat_id as customdata so the page can link to the regional plot.
+    """
+    fig = go.Figure()
+    offsets = genome_offsets(data, loci)
+    chroms = list(offsets)
+
+    if not data.empty:
+        x = data["chrom"].map(lambda c: offsets[c][0]) + data["pos"]
+        hover_text = (
+            "Chr" + data["chrom"].astype(str) + ":" + data["pos"].map("{:,}".format)
+            + "<br>P-value: " + data["p_value"].map("{:.2e}".format)
+            + "<br>ID: " + data["variant_id"].fillna("").astype(str)
+        )
+
+        # One trace per alternating colour; per-point colour arrays are slow
+        # to validate in Plotly
+        odd = data["chrom"].map(chroms.index) % 2 == 1
+        for mask, color in (
+            (~odd, "rgba(31, 119, 180, 0.7)"),
+            (odd, "rgba(23, 55, 94, 0.7)"),
+        ):
+            fig.add_trace(
+                go.Scattergl(
+                    x=x[mask],
+                    y=data["neg_log_p"][mask],
+                    mode="markers",
+                    marker=dict(color=color, size=4, line=dict(width=0)),
+                    name="Variants",
+                    legendgroup="variants",
+                    showlegend=not mask.equals(odd),
+                    text=hover_text[mask],
+                    hovertemplate="%{text}<extra></extra>",
+                )
+            )
+
+    if loci:
+        fig.add_trace(
+            go.Scattergl(
+                x=[offsets[locus["chrom"]][0] + locus["pos"] for locus in loci],
+                y=[0] * len(loci),
+                mode="markers",
+                marker=dict(color="red", size=9, symbol="triangle-up"),
+                name="STR loci",
+                customdata=[locus["repeat_id"] for locus in loci],
+                text=[f"STR {locus['repeat_id']}<br>{locus['location']}" for locus in loci],
+                hovertemplate="%{text}<br>Click for regional plot<extra></extra>",
+            )
+        )
+
+    genome_end = max((start + length for start, length in offsets.values()), default=0)
+    significance_line = -np.log10(5e-8)
+    fig.add_shape(
+        type="line",
+        x0=0,
+        x1=genome_end,
+        y0=significance_line,
+        y1=significance_line,
+        line=dict(color="blue", width=1.5, dash="dash"),
+    )
+
+    fig.update_layout(
+        title=f'Genome-wide Manhattan Plot: {trait_name.replace("_", " ").title()}',
+        xaxis=dict(
+            title="Chromosome",
+            tickvals=[start + length / 2 for start, length in offsets.values()],
+            ticktext=chroms,
+            range=[0, genome_end],
+            showgrid=False,
+        ),
+        yaxis=dict(title="-log₁₀(p-value)", showgrid=True, gridcolor="lightgray"),
+        height=550,
+        hovermode="closest",
+        plot_bgcolor="white",
+        showlegend=True,
+        legend=dict(orientation="h", y=1.08, x=1, xanchor="right"),
+    )
+
+    return fig
@@ -0,0 +1,163 @@
+"""
+SVG sparkline thumbnails for STRXplorer overview grids
+Pure-Python counterparts of create_mini_manhattan_plot and
+create_mini_locus_plot that render to small static SVG documents
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.timing import timed
+
+SIGNIFICANCE_NEG_LOG_P = -np.log10(5e-8)
+
+POINT_COLOR = "rgba(31, 119, 180, 0.7)"
+LINE_COLOR = "rgba(31, 119, 180, 0.9)"
+CI_COLOR = "rgba(31, 119, 180, 0.35)"
+
+
+class _Canvas:
+    """Maps data coordinates onto an SVG viewport with fixed padding"""
+
+    def __init__(self, width, height, x_range, y_range, pad=6):
+        self.width = width
+        self.height = height
+        self.pad = pad
+        self.x0, self.x1 = x_range
+        self.y0, self.y1 = y_range
+        if self.x1 <= self.x0:
+            self.x1 = self.x0 + 1
+        if self.y1 <= self.y0:
+            self.y1 = self.y0 + 1
+
+    def x(self, value):
+        span = self.width - 2 * self.pad
+        return self.pad + (np.asarray(value, dtype=float) - self.x0) / (self.x1 - self.x0) * span
+
+    def y(self, value):
+        span = self.height - 2 * self.pad
+        return self.height - self.pad - (np.asarray(value, dtype=float) - self.y0) / (self.y1 - self.y0) * span
+
+
+def _svg(width: int, height: int, title: str, body: list) -> str:
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'width="{width}" height="{height}" role="img">'
+        f"<title>{title}</title>"
+        f'<rect width="{width}" height="{height}" fill="white"/>'
+        + "".join(body)
+        + "</svg>"
+    )
+
+
+def _dots(xs, ys, color: str, size: float) -> str:
+    """All points as one path of zero-length round-capped segments"""
+    path = "".join(f"M{x:.1f} {y:.1f}h0" for x, y in zip(xs, ys))
+    return (
+        f'<path d="{path}" stroke="{color}" stroke-width="{size}" '
+        f'stroke-linecap="round" fill="none"/>'
+    )
+
+
+def downsample_max(x: np.ndarray, y: np.ndarray, bins: int):
+    """Keep the highest point in each of `bins` equal-width x bins"""
+    if len(x) <= bins:
+        return x, y
+    edges = np.linspace(x.min(), x.max(), bins + 1)
+    index = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, bins - 1)
+    order = np.lexsort((-y, index))
+    first = np.concatenate(([True], index[order][1:] != index[order][:-1]))
+    keep = order[first]
+    return x[keep], y[keep]
+
+
+@timed("plot_sparkline")
+def manhattan_sparkline_svg(
+    data: pd.DataFrame,
+    target_pos: int,
+    title: str = "",
+    width: int = 400,
+    height: int = 150,
+    max_points: int = 400,
+) -> str:
+    """
+    Thumbnail Manhattan plot: binned-max points, the 5e-8 line and the STR position
+
+    Mirrors create_mini_manhattan_plot. Downsampling keeps the strongest
+    variant per horizontal pixel bin, so peaks survive.
+    """
+    if data.empty:
+        return _svg(width, height, title, [])
+
+    x = data["pos"].to_numpy(dtype=float)
+    y = data["neg_log_p"].to_numpy(dtype=float)
+    x, y = downsample_max(x, y, max_points)
+
+    canvas = _Canvas(
+        width,
+        height,
+        (float(data["pos"].min()), float(data["pos"].max())),
+        (0.0, max(float(y.max()) * 1.05, SIGNIFICANCE_NEG_LOG_P * 1.05)),
+    )
+    target_x = float(canvas.x(target_pos))
+    significance_y = float(canvas.y(SIGNIFICANCE_NEG_LOG_P))
+
+    body = [
+        _dots(canvas.x(x), canvas.y(y), POINT_COLOR, 3),
+        f'<line x1="{canvas.pad}" x2="{width - canvas.pad}" y1="{significance_y:.1f}" '
+        f'y2="{significance_y:.1f}" stroke="blue" stroke-width="1" stroke-dasharray="4 3"/>',
+        f'<line x1="{target_x:.1f}" x2="{target_x:.1f}" y1="{canvas.pad}" '
+        f'y2="{height - canvas.pad}" stroke="red" stroke-width="1" stroke-dasharray="4 3"/>',
+    ]
+    return _svg(width, height, title, body)
+
+
+@timed("plot_sparkline")
+def locus_sparkline_svg(
+    dosage_dict: Dict,
+    mean_dict: Dict,
+    ci_dict: Dict,
+    title: str = "",
+    width: int = 400,
+    height: int = 150,
+) -> Optional[str]:
+    """
+    Thumbnail locus plot: mean phenotype per allele length with CI whiskers
+
+    Mirrors create_mini_locus_plot. Returns None if there are no alleles.
+    """
+    alleles = sorted(dosage_dict.keys(), key=float)
+    alleles = [a for a in alleles if mean_dict.get(str(a)) is not None]
+    if not alleles:
+        return None
+
+    lengths = np.array([float(a) for a in alleles])
+    means = np.array([float(mean_dict[str(a)]) for a in alleles])
+    ci = [ci_dict.get(str(a), [None, None]) for a in alleles]
+    has_ci = all(low is not None and high is not None for low, high in ci)
+    lows = np.array([c[0] for c in ci], dtype=float) if has_ci else means
+    highs = np.array([c[1] for c in ci], dtype=float) if has_ci else means
+
+    pad_x = 0.5 if len(lengths) == 1 else 0
+    canvas = _Canvas(
+        width,
+        height,
+        (lengths.min() - pad_x, lengths.max() + pad_x),
+        (float(np.nanmin(lows)), float(np.nanmax(highs))),
+    )
+    xs = canvas.x(lengths)
+    ys = canvas.y(means)
+
+    body = []
+    if has_ci:
+        whiskers = "".join(
+            f"M{x:.1f} {low:.1f}V{high:.1f}"
+            for x, low, high in zip(xs, canvas.y(lows), canvas.y(highs))
+        )
+        body.append(f'<path d="{whiskers}" stroke="{CI_COLOR}" stroke-width="1.5" fill="none"/>')
+
+    line = "M" + "L".join(f"{x:.1f} {y:.1f}" for x, y in zip(xs, ys))
+    body.append(f'<path d="{line}" stroke="{LINE_COLOR}" stroke-width="2" fill="none"/>')
+    body.append(_dots(xs, ys, LINE_COLOR, 5))
+    return _svg(width, height, title, body)
@@ -2,12 +2,25 @@
 API route handlers for STRXplorer
 """
 import json
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, g, jsonify, current_app, request, stream_with_context
+from config import Config
+from src.analysis.clumping import clump_leads, clump_variants, lead_records
+from src.analysis.colocalization import rank_colocalization, ranking_records
+from src.analysis.trend import compute_trait_trends, sort_trends, trend_records
 from src.database.models import (
+    get_gwas_trait_name,
+    get_manhattan_tile,
     get_database_stats,
+    get_locus_trends,
     get_traits_with_loci_data,
     nan_to_null,
+    query_manhattan_data,
 )
+from src.plots.locus import allele_arrays, filter_allele_data, iter_allele_data_batch
+from src.utils.metrics import get_metrics_snapshot, observe_streamed_phases, render_prometheus
+from src.utils.response_cache import get_response_cache_stats
+from src.utils.timing import phase
+from src.utils.warmup import get_warmup_status
 
 # Create blueprint
 api_bp = Blueprint("api", __name__)
@@ -18,10 +31,14 @@ def database_status_json():
     """Check database status and available traits - RETURNS JSON"""
 
     status = get_database_stats()
+    status["warmup"] = get_warmup_status()
+
+    with phase("serialize"):
+        payload = json.dumps(status, default=nan_to_null)
 
     # Use current_app instead of api_bp for response_class
     return current_app.response_class(
-        response=json.dumps(status, default=nan_to_null),
+        response=payload,
         status=200,
         mimetype="application/json",
     )
@@ -45,3 +62,283 @@ def api_trait_list():
     except Exception as e:
         print(f"Error in api_trait_list: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/api/tiles/<trait_name>/<chrom>/<int:z>/<int:x>")
+def manhattan_tile(trait_name, chrom, z, x):
+    """Manhattan tile x at zoom level z of one chromosome - RETURNS JSON"""
+    if not 0 <= z <= Config.TILE_MAX_ZOOM or not 0 <= x < 2**z:
+        return (
+            jsonify({"error": f"Tile {z}/{x} out of range (max zoom {Config.TILE_MAX_ZOOM})"}),
+            400,
+        )
+
+    tile = get_manhattan_tile(
+        get_gwas_trait_name(trait_name), chrom.replace("chr", ""), z, x
+    )
+
+    with phase("serialize"):
+        payload = json.dumps(tile, separators=(",", ":"))
+
+    response = current_app.response_class(
+        response=payload,
+        status=200,
+        mimetype="application/json",
+    )
+    response.headers["Cache-Control"] = f"public, max-age={Config.TILE_CACHE_MAX_AGE}"
+    return response
+
+
+@api_bp.route("/api/colocalization")
+@api_bp.route("/api/colocalization/<trait_name>")
+def colocalization(trait_name=None):
+    """STR loci ranked by the GWAS signal around them, for one or all traits - RETURNS JSON"""
+    distance = request.args.get("distance", default=Config.COLOC_DISTANCE, type=int)
+    sort = request.args.get("sort", default="max_neg_log_p")
+    limit = request.args.get("limit", type=int)
+
+    if distance <= 0:
+        return jsonify({"error": "distance must be positive"}), 400
+
+    try:
+        ranked = rank_colocalization(
+            [trait_name] if trait_name else None,
+            distance=distance,
+            sort=sort,
+            limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if trait_name and ranked.empty:
+        return jsonify({"error": f"No STR loci found for trait '{trait_name}'"}), 404
+
+    with phase("serialize"):
+        payload = json.dumps(
+            {
+                "trait": trait_name,
+                "distance": distance,
+                "sort": sort,
+                "loci": ranking_records(ranked),
+            },
+            separators=(",", ":"),
+        )
+
+    return current_app.response_class(
+        response=payload,
+        status=200,
+        mimetype="application/json",
+    )
+
+
+@api_bp.route("/api/clumps/<trait_name>/<chrom>")
+def manhattan_clumps(trait_name, chrom):
+    """Independent lead variants of a region by distance clumping - RETURNS JSON"""
+    start = request.args.get("start", type=int)
+    end = request.args.get("end", type=int)
+    distance = request.args.get("distance", default=Config.CLUMP_DISTANCE, type=int)
+    lead_p = request.args.get("lead_p", type=float)
+    min_neg_log_p = request.args.get("min_neg_log_p", type=float)
+
+    if start is None or end is None or not 0 <= start <= end:
+        return jsonify({"error": "start and end are required, with 0 <= start <= end"}), 400
+    if end - start > Config.CLUMP_MAX_REGION:
+        return (
+            jsonify({"error": f"Region wider than {Config.CLUMP_MAX_REGION:,} bp"}),
+            400,
+        )
+    if distance < Config.CLUMP_MIN_DISTANCE:
+        return (
+            jsonify({"error": f"distance must be at least {Config.CLUMP_MIN_DISTANCE:,} bp"}),
+            400,
+        )
+
+    if min_neg_log_p is not None and not min_neg_log_p >= 0:
+        return jsonify({"error": "min_neg_log_p must be a number >= 0"}), 400
+
+    # With min_neg_log_p only the significant variants are read and clumped
+    gwas_trait_name = get_gwas_trait_name(trait_name)
+    chrom = chrom.replace("chr", "")
+    data = query_manhattan_data(gwas_trait_name, chrom, start, end, min_neg_log_p)
+    if data.empty:
+        return (
+            jsonify({"error": f"No data found for {gwas_trait_name} in region Chr{chrom}:{start}-{end}"}),
+            404,
+        )
+
+    leads = clump_leads(clump_variants(data, distance, lead_p))
+
+    with phase("serialize"):
+        payload = json.dumps(
+            {
+                "trait": gwas_trait_name,
+                "chrom": chrom,
+                "start": start,
+                "end": end,
+                "distance": distance,
+                "lead_p": lead_p,
+                "min_neg_log_p": min_neg_log_p,
+                "total_variants": len(data),
+                "leads": lead_records(leads),
+            },
+            separators=(",", ":"),
+        )
+
+    return current_app.response_class(
+        response=payload,
+        status=200,
+        mimetype="application/json",
+    )
+
+
+@api_bp.route("/api/locus_trends/<trait_name>")
+def locus_trends(trait_name):
+    """Dose-response trend of every STR locus of a trait, ranked - RETURNS JSON"""
+    count_threshold = request.args.get(
+        "count_threshold", default=Config.OVERVIEW_COUNT_THRESHOLD, type=int
+    )
+    sort = request.args.get("sort", default="p_value")
+    limit = request.args.get("limit", type=int)
+
+    # Stored trends cover the standard thresholds; others are fitted now
+    trends = get_locus_trends(trait_name, count_threshold)
+    source = "stored"
+    if trends is None:
+        trends = compute_trait_trends(trait_name, count_threshold)
+        source = "computed"
+
+    try:
+        ranked = sort_trends(trends, sort)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if ranked.empty:
+        return jsonify({"error": f"No STR loci found for trait '{trait_name}'"}), 404
+    if limit is not None:
+        ranked = ranked.head(limit)
+
+    with phase("serialize"):
+        payload = json.dumps(
+            {
+                "trait": trait_name,
+                "count_threshold": count_threshold,
+                "sort": sort,
+                "source": source,
+                "total": len(trends),
+                "loci": trend_records(ranked),
+            },
+            separators=(",", ":"),
+        )
+
+    return current_app.response_class(
+        response=payload,
+        status=200,
+        mimetype="application/json",
+    )
+
+
+def _optional_number(body, key, cast):
+    value = body.get(key)
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' must be a number")
+
+
+@api_bp.route("/api/loci/batch", methods=["POST"])
+def loci_batch():
+    """
+    Coordinates, trait, motif and filtered allele arrays for many repeat_ids
+    in one request - RETURNS streamed JSON
+
+    Body: {"repeat_ids": [...], "trait": optional, "count_threshold": 100,
+           "min_length": optional, "max_length": optional,
+           "max_relative_ci_range": optional}
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get("repeat_ids"), list):
+        return jsonify({"error": "Expected a JSON object with a 'repeat_ids' list"}), 400
+
+    # De-duplicate while keeping the caller's order
+    repeat_ids = list(dict.fromkeys(str(repeat_id) for repeat_id in body["repeat_ids"]))
+    if len(repeat_ids) > Config.LOCI_BATCH_MAX_IDS:
+        return (
+            jsonify({"error": f"At most {Config.LOCI_BATCH_MAX_IDS:,} repeat_ids per request"}),
+            400,
+        )
+
+    try:
+        count_threshold = _optional_number(body, "count_threshold", int)
+        filters = {
+            "count_threshold": 100 if count_threshold is None else count_threshold,
+            "min_length": _optional_number(body, "min_length", float),
+            "max_length": _optional_number(body, "max_length", float),
+            "max_relative_ci_range": _optional_number(body, "max_relative_ci_range", float),
+        }
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    trait_name = body.get("trait")
+
+    def generate():
+        # Loci are written as they are decoded, so memory stays flat for
+        # thousands of ids; ids without rows are listed at the end. The
+        # request hooks ran before the body, so the phases timed while
+        # streaming are added to the metrics here, a chunk at a time.
+        phases = g.setdefault("phases", [])
+        reported = len(phases)
+        try:
+            yield '{"filters":' + json.dumps(filters) + ',"loci":['
+            found = set()
+            for i, entry in enumerate(
+                iter_allele_data_batch(
+                    Config.LOCUS_DB_PATH,
+                    repeat_ids,
+                    trait_name,
+                    chunk_size=Config.LOCI_BATCH_CHUNK_SIZE,
+                )
+            ):
+                found.add(entry["repeat_id"])
+                filtered = filter_allele_data(
+                    entry["dosage_dict"], entry["mean_dict"], entry["ci_dict"], **filters
+                )
+                record = {
+                    "repeat_id": entry["repeat_id"],
+                    "trait": entry["trait"],
+                    "chrom": entry["chrom"],
+                    "pos": entry["pos"],
+                    "motif": entry["motif"],
+                    "alleles": allele_arrays(*filtered),
+                }
+                yield ("," if i else "") + json.dumps(record, separators=(",", ":"))
+                if len(phases) - reported >= Config.LOCI_BATCH_CHUNK_SIZE:
+                    observe_streamed_phases(phases[reported:])
+                    del phases[reported:]
+            missing = [repeat_id for repeat_id in repeat_ids if repeat_id not in found]
+            yield '],"missing":' + json.dumps(missing) + "}"
+        finally:
+            observe_streamed_phases(phases[reported:])
+            del phases[reported:]
+
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype="application/json"
+    )
+
+
+@api_bp.route("/metrics")
+def metrics():
+    """Performance metrics in Prometheus text format"""
+    return current_app.response_class(
+        response=render_prometheus(),
+        status=200,
+        mimetype="text/plain; version=0.0.4",
+    )
+
+
+@api_bp.route("/metrics.json")
+def metrics_json():
+    """Performance metrics summary for the live status dashboard - RETURNS JSON"""
+    snapshot = get_metrics_snapshot()
+    snapshot["response_cache"] = get_response_cache_stats()
+    return jsonify(snapshot)
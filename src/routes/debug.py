@@ -0,0 +1,29 @@
+"""
+Debug route handlers for STRXplorer
+Registered only when the app runs in debug mode or DEBUG_ROUTES_ENABLED is
+set, since they publish raw SQL, bound parameters and query plans
+"""
+from datetime import datetime
+
+from flask import Blueprint, jsonify
+
+from src.database.utils import get_query_stats
+from src.utils.timing import render_template
+
+# Create blueprint
+debug_bp = Blueprint("debug", __name__)
+
+
+@debug_bp.route("/debug/slow_queries")
+def slow_queries():
+    """Slow query log with query plans and full-scan flags"""
+    stats = get_query_stats()
+    for query in stats["slow_queries"]:
+        query["time"] = datetime.fromtimestamp(query["timestamp"]).strftime("%H:%M:%S")
+    return render_template("slow_queries.html", stats=stats)
+
+
+@debug_bp.route("/debug/slow_queries.json")
+def slow_queries_json():
+    """Traced SQL statement statistics and recent slow queries - RETURNS JSON"""
+    return jsonify(get_query_stats())
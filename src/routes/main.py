@@ -1,16 +1,18 @@
 """
 Main route handlers for STRXplorer
 """
-from flask import Blueprint, render_template
+from flask import Blueprint
 from src.database.models import (
     get_available_traits,
     get_database_stats,
     get_traits_with_loci_data,
-    get_all_str_loci,
+    get_str_loci_by_chromosome,
     get_gwas_trait_name,
 )
+from src.utils.timing import phase, render_template
 import os
-import sqlite3
+from src.database.shards import gwas_db_path
+from src.database.utils import connect
 
 
 # Create blueprint
@@ -43,54 +45,59 @@ def browse_traits():
     """Browse all available traits with enhanced plot type checking"""
     try:
         # Get traits with STR loci
-        conn = sqlite3.connect("data/locus_data.db")
-        cursor = conn.execute(
+        conn = connect("data/locus_data.db")
+        with phase("db_trait_loci_counts"):
+            cursor = conn.execute(
+                """
+                SELECT DISTINCT 
+                    COALESCE(trait_name, phenotype) as trait,
+                    COUNT(repeat_id) as loci_count
+                FROM locus_data 
+                WHERE repeat_id IS NOT NULL
+                AND (trait_name IS NOT NULL OR phenotype IS NOT NULL)
+                GROUP BY trait
+                HAVING loci_count > 0
+                ORDER BY loci_count DESC, trait
             """
-            SELECT DISTINCT 
-                COALESCE(trait_name, phenotype) as trait,
-                COUNT(repeat_id) as loci_count
-            FROM locus_data 
-            WHERE repeat_id IS NOT NULL
-            AND (trait_name IS NOT NULL OR phenotype IS NOT NULL)
-            GROUP BY trait
-            HAVING loci_count > 0
-            ORDER BY loci_count DESC, trait
-        """
-        )
+            )
+            trait_rows = cursor.fetchall()
 
         trait_info = []
-        for row in cursor.fetchall():
+        for row in trait_rows:
             trait, loci_count = row
 
             # Map trait name and check if trait has Manhattan data
             gwas_trait_name = get_gwas_trait_name(trait)
             has_manhattan_data = False
 
-            if os.path.exists("data/manhattan_data.db"):
-                manhattan_conn = sqlite3.connect("data/manhattan_data.db")
-                manhattan_cursor = manhattan_conn.execute(
-                    "SELECT COUNT(*) FROM gwas_variants WHERE trait_name = ?",
-                    (gwas_trait_name,),
-                )
-                variant_count = manhattan_cursor.fetchone()[0]
-                has_manhattan_data = variant_count > 0
-                manhattan_conn.close()
+            manhattan_db_path = gwas_db_path(gwas_trait_name)
+            if os.path.exists(manhattan_db_path):
+                with phase("db_trait_variant_count"):
+                    manhattan_conn = connect(manhattan_db_path)
+                    manhattan_cursor = manhattan_conn.execute(
+                        "SELECT COUNT(*) FROM gwas_variants WHERE trait_name = ?",
+                        (gwas_trait_name,),
+                    )
+                    variant_count = manhattan_cursor.fetchone()[0]
+                    has_manhattan_data = variant_count > 0
+                    manhattan_conn.close()
 
             # Check if trait has locus plot data (JSON format with allele data)
             has_locus_data = False
             try:
-                locus_cursor = conn.execute(
-                    """
-                    SELECT data_json FROM locus_data 
-                    WHERE (trait_name = ? OR phenotype = ?)
-                    AND repeat_id IS NOT NULL 
-                    AND data_json IS NOT NULL
-                    LIMIT 1
-                """,
-                    (trait, trait),
-                )
-
-                sample_row = locus_cursor.fetchone()
+                with phase("db_sample_allele_data"):
+                    locus_cursor = conn.execute(
+                        """
+                        SELECT data_json FROM locus_data 
+                        WHERE (trait_name = ? OR phenotype = ?)
+                        AND repeat_id IS NOT NULL 
+                        AND data_json IS NOT NULL
+                        LIMIT 1
+                    """,
+                        (trait, trait),
+                    )
+
+                    sample_row = locus_cursor.fetchone()
                 if sample_row:
                     import json
 
@@ -126,20 +133,9 @@ def browse_traits():
 def browse_loci():
     """Browse STR loci with search/filter capabilities"""
     try:
-        loci_info = get_all_str_loci()
-
-        # Group by chromosome for better organization
-        loci_by_chrom = {}
-        for locus in loci_info:
-            chrom = locus["chrom"]
-            if chrom not in loci_by_chrom:
-                loci_by_chrom[chrom] = []
-            loci_by_chrom[chrom].append(locus)
-
-        # Get unique traits for the filter dropdown
-        unique_traits = list(
-            set([locus["trait"] for locus in loci_info if locus["trait"] != "Unknown"])
-        )
+        # Catalog rows grouped by chromosome; display strings are formatted
+        # only as the template renders each locus
+        loci_by_chrom, unique_traits = get_str_loci_by_chromosome()
 
         # ADD THESE MISSING VARIABLES:
 
@@ -149,24 +145,15 @@ def browse_loci():
             trait_mapping[trait] = get_gwas_trait_name(trait)
 
         # 2. Get available Manhattan traits from the database
-        available_manhattan_traits = set()
-        if os.path.exists("data/manhattan_data.db"):
-            try:
-                manhattan_conn = sqlite3.connect("data/manhattan_data.db")
-                cursor = manhattan_conn.execute(
-                    "SELECT DISTINCT trait_name FROM gwas_variants"
-                )
-                available_manhattan_traits = set(row[0] for row in cursor.fetchall())
-                manhattan_conn.close()
-            except Exception as e:
-                print(f"Error loading Manhattan traits: {e}")
-                available_manhattan_traits = set()
+        # GWAS traits from trait_metadata (held in the catalog) instead of a
+        # DISTINCT over every variant row
+        available_manhattan_traits = set(get_available_traits())
 
         return render_template(
             "browse_loci.html",
             loci_by_chrom=loci_by_chrom,
-            total_loci=len(loci_info),
-            unique_traits=sorted(unique_traits),
+            total_loci=sum(len(loci) for loci in loci_by_chrom.values()),
+            unique_traits=unique_traits,
             trait_mapping=trait_mapping,  # ADD THIS
             available_manhattan_traits=available_manhattan_traits,
         )  # ADD THIS
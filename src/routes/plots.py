@@ -2,7 +2,7 @@
 Plot route handlers for STRXplorer
 """
 import os
-from flask import Blueprint, render_template, request, redirect
+from flask import Blueprint, current_app, jsonify, request, redirect
 from src.database.models import (
     get_gwas_trait_name,
     get_locus_info_from_repeat_id,
@@ -10,21 +10,51 @@ from src.database.models import (
     get_available_traits,
     query_manhattan_data,
     get_str_loci_for_trait,
+    get_locus_summaries,
+    get_genome_reduction,
+    get_locus_window_summaries,
+    get_locus_window_statistics,
+    get_significant_variants,
+    get_trait_metadata,
+    get_window_variant_counts,
+    prefetch_locus_rows,
+    LOCUS_SUMMARY_ORDER,
 )
-from src.plots.manhattan import create_manhattan_plot, create_mini_manhattan_plot
+from src.analysis.clumping import clump_leads, clump_variants, lead_records
+from src.analysis.trend import compute_trait_trends, trend_records
+from src.plots.manhattan import (
+    create_manhattan_plot,
+    create_mini_manhattan_plot,
+    create_genome_manhattan_plot,
+)
+from src.plots.sparkline import locus_sparkline_svg, manhattan_sparkline_svg
 from src.plots.locus import (
     query_allele_data,
     generate_figure_plotly,
     filter_allele_data,
+    create_mini_locus_plot,
+    create_locus_phewas_plot,
+    query_allele_data_all_traits,
+    summarize_allele_data,
 )
+from src.utils.fanout import fan_out
+from src.utils.timing import phase, render_template
 from config import Config
-import sqlite3
+from src.database.catalog import get_catalog
+from src.database.shards import gwas_db_path
+from src.database.utils import connect
 import numpy as np
 
 # Create blueprint
 plots_bp = Blueprint("plots", __name__)
 
 
+def serialize_figure(fig) -> str:
+    """Serialize a Plotly figure to JSON, timed as the 'serialize' phase"""
+    with phase("serialize"):
+        return fig.to_json()
+
+
 @plots_bp.route("/trait_overview/<trait_name>")
 def trait_overview(trait_name):
     """Show all Manhattan plots for a trait in a grid layout"""
@@ -44,26 +74,50 @@ def trait_overview(trait_name):
             404,
         )
 
-    # Check which loci have Manhattan data available (use GWAS trait name)
+    # Availability and ranking come from the precomputed STR window summaries
+    # in one indexed query; older databases fall back to a count per locus.
+    # Both use the same window as the mini plots.
+    window_size = Config.OVERVIEW_WINDOW
     available_loci = []
-    if os.path.exists(Config.MANHATTAN_DB_PATH):
+    summaries = get_locus_window_summaries(gwas_trait_name, window_size)
+    if summaries is not None:
+        loci_by_id = {locus["repeat_id"]: locus for locus in str_loci}
+        for locus in str_loci:
+            locus["has_data"] = False
+        for summary in summaries:
+            locus = loci_by_id.get(summary["repeat_id"])
+            if locus is not None:
+                locus["variant_count"] = summary["variant_count"]
+                locus["max_significance"] = summary["max_significance"]
+                locus["has_data"] = True
+                available_loci.append(locus)
+
+    elif os.path.exists(gwas_db_path(gwas_trait_name)):
         try:
-            conn = sqlite3.connect(Config.MANHATTAN_DB_PATH)
+            conn = connect(gwas_db_path(gwas_trait_name))
 
             for locus in str_loci:
                 # Check if this region has data (use GWAS trait name)
-                cursor = conn.execute(
-                    """
-                    SELECT COUNT(*) FROM gwas_variants 
-                    WHERE trait_name = ? AND chrom = ? 
-                    AND ? BETWEEN (pos - 250000) AND (pos + 250000)
-                """,
-                    (gwas_trait_name, locus["chrom"], locus["pos"]),
-                )
+                with phase("db_region_count"):
+                    cursor = conn.execute(
+                        """
+                        SELECT COUNT(*), MAX(neg_log_p) FROM gwas_variants
+                        WHERE trait_name = ? AND chrom = ?
+                        AND pos BETWEEN ? AND ?
+                        AND p_value IS NOT NULL AND neg_log_p IS NOT NULL
+                    """,
+                        (
+                            gwas_trait_name,
+                            locus["chrom"],
+                            max(0, locus["pos"] - window_size),
+                            locus["pos"] + window_size,
+                        ),
+                    )
 
-                variant_count = cursor.fetchone()[0]
+                    variant_count, max_neg_log_p = cursor.fetchone()
                 if variant_count > 0:
                     locus["variant_count"] = variant_count
+                    locus["max_significance"] = max_neg_log_p or 0
                     locus["has_data"] = True
                     available_loci.append(locus)
                 else:
@@ -77,42 +131,16 @@ def trait_overview(trait_name):
             for locus in str_loci:
                 locus["has_data"] = False
 
-    # Generate mini Manhattan plots for each available locus
-    plot_data = []
-    for locus in available_loci:
-        try:
-            # Get data for this locus (use GWAS trait name)
-            start_pos = max(0, locus["pos"] - 500000)
-            end_pos = locus["pos"] + 500000
-
-            data = query_manhattan_data(
-                gwas_trait_name, locus["chrom"], start_pos, end_pos
-            )
-
-            if not data.empty:
-                # Create mini plot
-                mini_fig = create_mini_manhattan_plot(
-                    data,
-                    gwas_trait_name,
-                    locus["chrom"],
-                    locus["pos"],
-                    locus["repeat_id"],
-                )
-
-                plot_data.append(
-                    {
-                        "locus": locus,
-                        "plot_json": mini_fig.to_json(),
-                        "max_significance": data["neg_log_p"].max()
-                        if len(data) > 0
-                        else 0,
-                        "variant_count": len(data),
-                    }
-                )
-
-        except Exception as e:
-            print(f"Error creating plot for {locus['repeat_id']}: {e}")
-            continue
+    # Grid cells show SVG thumbnails (/thumbnail/manhattan/...) and load the
+    # interactive mini plot only when clicked, so no figures are built here
+    plot_data = [
+        {
+            "locus": locus,
+            "max_significance": locus["max_significance"],
+            "variant_count": locus["variant_count"],
+        }
+        for locus in available_loci
+    ]
 
     # Sort by significance (most significant first)
     plot_data.sort(key=lambda x: x["max_significance"], reverse=True)
@@ -126,6 +154,52 @@ def trait_overview(trait_name):
     )
 
 
+@plots_bp.route("/genome_manhattan/<trait_name>")
+def genome_manhattan(trait_name):
+    """Genome-wide Manhattan plot for a trait with its STR loci marked"""
+    gwas_trait_name = get_gwas_trait_name(trait_name)
+
+    print(f"Genome Manhattan: {trait_name} -> GWAS: {gwas_trait_name}")
+
+    # ?min_neg_log_p= plots only the variants above a threshold, read from the
+    # significant-variant index, instead of the binned reduction
+    min_neg_log_p = request.args.get("min_neg_log_p", type=float)
+    if min_neg_log_p is not None and not min_neg_log_p >= 0:
+        return (
+            render_template("error.html", error="min_neg_log_p must be a number >= 0"),
+            400,
+        )
+
+    if min_neg_log_p is None:
+        data = get_genome_reduction(gwas_trait_name)
+    else:
+        data = get_significant_variants(gwas_trait_name, min_neg_log_p)
+    if data.empty:
+        return (
+            render_template(
+                "error.html",
+                error=f"No GWAS data found for trait '{gwas_trait_name}'",
+                available_traits=get_available_traits(),
+            ),
+            404,
+        )
+
+    str_loci = get_str_loci_for_trait(trait_name)
+    fig = create_genome_manhattan_plot(data, str_loci, gwas_trait_name)
+
+    hits = data[data["neg_log_p"] >= Config.GENOME_HIT_NEG_LOG_P]
+    return render_template(
+        "genome_manhattan.html",
+        trait_name=trait_name,
+        plot_json=serialize_figure(fig),
+        point_count=len(data),
+        significant_count=len(hits),
+        str_locus_count=len(str_loci),
+        min_p=data["p_value"].min(),
+        min_neg_log_p=min_neg_log_p,
+    )
+
+
 @plots_bp.route("/manhattan_plot")
 def manhattan_plot_route():
     """Manhattan plot route with improved error handling"""
@@ -134,6 +208,10 @@ def manhattan_plot_route():
     trait_name = request.args.get("trait")
     repeat_id = request.args.get("repeat_id")
     window_size = request.args.get("window", default=500000, type=int)
+    clump_distance = request.args.get("clump", default=0, type=int)
+    clump_p = request.args.get("clump_p", type=float)
+    highlight_clumps = request.args.get("highlight_clumps", default=0, type=int) == 1
+    min_neg_log_p = request.args.get("min_neg_log_p", type=float)
 
     # Map trait name for GWAS data lookup
     gwas_trait_name = get_gwas_trait_name(trait_name)
@@ -149,11 +227,26 @@ def manhattan_plot_route():
             400,
         )
 
+    if clump_distance and clump_distance < Config.CLUMP_MIN_DISTANCE:
+        return (
+            render_template(
+                "error.html",
+                error=f"Clumping distance must be at least {Config.CLUMP_MIN_DISTANCE:,} bp",
+            ),
+            400,
+        )
+
+    if min_neg_log_p is not None and not min_neg_log_p >= 0:
+        return (
+            render_template("error.html", error="min_neg_log_p must be a number >= 0"),
+            400,
+        )
+
     # Check if databases exist
     if not os.path.exists(Config.LOCUS_DB_PATH):
         return render_template("error.html", error="Locus database not found"), 404
 
-    if not os.path.exists(Config.MANHATTAN_DB_PATH):
+    if not os.path.exists(gwas_db_path(gwas_trait_name)):
         return (
             render_template(
                 "error.html",
@@ -162,8 +255,16 @@ def manhattan_plot_route():
             404,
         )
 
+    # Locus position, trait availability and the dropdown list are independent
+    results = fan_out(
+        locus_info=lambda: get_locus_info_from_repeat_id(repeat_id),
+        trait_availability=lambda: check_trait_availability(gwas_trait_name),
+        available_traits=get_available_traits,
+    )
+    available_traits = results["available_traits"]
+
     # Get locus information
-    target_chrom, target_pos = get_locus_info_from_repeat_id(repeat_id)
+    target_chrom, target_pos = results["locus_info"]
     if target_chrom is None or target_pos is None:
         return (
             render_template(
@@ -174,9 +275,8 @@ def manhattan_plot_route():
         )
 
     # Check trait availability (use GWAS trait name)
-    trait_available, trait_status = check_trait_availability(gwas_trait_name)
+    trait_available, trait_status = results["trait_availability"]
     if not trait_available:
-        available_traits = get_available_traits()
         return (
             render_template(
                 "error.html",
@@ -193,25 +293,46 @@ def manhattan_plot_route():
     print(
         f"Querying {gwas_trait_name} data for Chr{target_chrom}:{start_pos}-{end_pos}"
     )
-    data = query_manhattan_data(gwas_trait_name, target_chrom, start_pos, end_pos)
+    data = query_manhattan_data(
+        gwas_trait_name, target_chrom, start_pos, end_pos, min_neg_log_p
+    )
 
     if data.empty:
+        threshold = "" if min_neg_log_p is None else f" with -log10(p) >= {min_neg_log_p:g}"
         return (
             render_template(
                 "error.html",
-                error=f"No data found for {gwas_trait_name} in region Chr{target_chrom}:{start_pos}-{end_pos}",
+                error=f"No data found for {gwas_trait_name}{threshold} in region Chr{target_chrom}:{start_pos}-{end_pos}",
             ),
             404,
         )
 
+    # Only significant rows were read: count the rest of the window from the
+    # indexes instead of loading it
+    if min_neg_log_p is None:
+        total_variants = len(data)
+        significant_variants = int((data["p_value"] < 5e-8).sum())
+    else:
+        total_variants, significant_variants = get_window_variant_counts(
+            gwas_trait_name, target_chrom, start_pos, end_pos, -np.log10(5e-8)
+        )
+
+    # Independent lead variants of the window
+    clump_lead_rows = None
+    if clump_distance:
+        data = clump_variants(data, clump_distance, clump_p)
+        clump_lead_rows = lead_records(clump_leads(data))
+
     # Create plot (use GWAS trait name)
     fig = create_manhattan_plot(
-        data, gwas_trait_name, target_chrom, target_pos, window_size
+        data,
+        gwas_trait_name,
+        target_chrom,
+        target_pos,
+        window_size,
+        highlight_clumps=highlight_clumps,
     )
 
-    # Get available traits for dropdown
-    available_traits = get_available_traits()
-
     breadcrumbs = [
         {"name": "Trait Overview", "url": f"/trait_overview/{trait_name}"},
         {"name": f"Chr{target_chrom}:{target_pos:,}", "url": None},
@@ -219,7 +340,7 @@ def manhattan_plot_route():
 
     # Prepare template data
     template_data = {
-        "manhattan_plot_json": fig.to_json(),
+        "manhattan_plot_json": serialize_figure(fig),
         "trait_name": trait_name,
         "repeat_id": repeat_id,
         "locus_chrom": target_chrom,
@@ -227,21 +348,146 @@ def manhattan_plot_route():
         "window_size": window_size,
         "available_traits": available_traits,
         "data_summary": {
-            "total_variants": len(data),
+            "total_variants": total_variants,
+            "shown_variants": len(data),
             "min_p": data["p_value"].min() if len(data) > 0 else None,
             "max_p": data["p_value"].max() if len(data) > 0 else None,
-            "significant_variants": len(data[data["p_value"] < 5e-8])
-            if len(data) > 0
-            else 0,
+            "significant_variants": significant_variants,
         },
+        "min_neg_log_p": min_neg_log_p,
+        "clump_distance": clump_distance,
+        "highlight_clumps": highlight_clumps,
+        "clump_leads": clump_lead_rows,
         "breadcrumbs": breadcrumbs,
         "show_trait_overview_link": True,
+        "tile_config": {
+            "span_bits": Config.TILE_SPAN_BITS,
+            "raw_zoom": Config.TILE_RAW_ZOOM,
+            "max_zoom": Config.TILE_MAX_ZOOM,
+        },
     }
 
     return render_template("manhattan_plot.html", **template_data)
 
 
-# Add this route to your src/routes/plots.py file
+def build_locus_overview_entry(
+    locus, trait_name, count_threshold, summary=None, trend=None
+):
+    """
+    Build one locus overview grid cell (summary stats and the dose-response
+    trend; the thumbnail and the interactive mini plot are loaded by the page
+    from their own routes).
+    Returns None if the locus has no allele data left after filtering.
+    """
+    # Use precomputed summary stats when available
+    if summary is None:
+        filtered_dosage, filtered_mean, _ = load_filtered_alleles(
+            locus["repeat_id"], count_threshold
+        )
+        if not filtered_dosage:
+            return None
+        summary = summarize_allele_data(filtered_dosage, filtered_mean)
+    allele_count, total_samples, mean_effect = summary
+
+    return {
+        "locus": locus,
+        "allele_count": allele_count,
+        "total_samples": int(total_samples),
+        "mean_effect": abs(mean_effect),  # Use absolute value for sorting
+        "effect_direction": "+" if mean_effect > 0 else "-",
+        "trend": trend if trend and trend.get("slope") is not None else None,
+    }
+
+
+def load_filtered_alleles(repeat_id, count_threshold):
+    """Allele dosage, mean and CI dicts of a locus after count filtering"""
+    dosage_dict, mean_dict, ci_dict, _, _ = query_allele_data(
+        Config.LOCUS_DB_PATH, repeat_id
+    )
+    if not dosage_dict or not mean_dict:
+        return {}, {}, {}
+    return filter_allele_data(
+        dosage_dict, mean_dict, ci_dict, count_threshold=count_threshold
+    )
+
+
+def load_mini_manhattan_data(trait_name, repeat_id):
+    """GWAS data in the overview window around a locus, or None if unknown"""
+    chrom, pos = get_locus_info_from_repeat_id(repeat_id)
+    if chrom is None or pos is None:
+        return None
+    window_size = Config.OVERVIEW_WINDOW
+    data = query_manhattan_data(
+        get_gwas_trait_name(trait_name),
+        chrom,
+        max(0, pos - window_size),
+        pos + window_size,
+    )
+    return chrom, pos, data
+
+
+def thumbnail_response(svg):
+    """SVG thumbnail with caching headers and ETag revalidation"""
+    response = current_app.response_class(svg, mimetype="image/svg+xml")
+    response.headers["Cache-Control"] = f"public, max-age={Config.THUMBNAIL_CACHE_MAX_AGE}"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def figure_response(fig):
+    return current_app.response_class(serialize_figure(fig), mimetype="application/json")
+
+
+@plots_bp.route("/thumbnail/manhattan/<trait_name>/<repeat_id>.svg")
+def manhattan_thumbnail(trait_name, repeat_id):
+    """SVG sparkline of the GWAS window around a locus for the overview grid"""
+    region = load_mini_manhattan_data(trait_name, repeat_id)
+    if region is None:
+        return "Unknown repeat_id", 404
+    chrom, pos, data = region
+    return thumbnail_response(
+        manhattan_sparkline_svg(data, pos, title=f"Chr{chrom}:{pos:,}")
+    )
+
+
+@plots_bp.route("/mini_plot/manhattan/<trait_name>/<repeat_id>.json")
+def manhattan_mini_plot(trait_name, repeat_id):
+    """Interactive mini Manhattan figure, loaded when a grid cell is clicked"""
+    region = load_mini_manhattan_data(trait_name, repeat_id)
+    if region is None or region[2].empty:
+        return jsonify({"error": f"No GWAS data around {repeat_id}"}), 404
+    chrom, pos, data = region
+    return figure_response(
+        create_mini_manhattan_plot(
+            data, get_gwas_trait_name(trait_name), chrom, pos, repeat_id
+        )
+    )
+
+
+@plots_bp.route("/thumbnail/locus/<trait_name>/<repeat_id>.svg")
+def locus_thumbnail(trait_name, repeat_id):
+    """SVG sparkline of allele length vs mean phenotype for the overview grid"""
+    count_threshold = request.args.get(
+        "count_threshold", default=Config.OVERVIEW_COUNT_THRESHOLD, type=int
+    )
+    dosage, mean, ci = load_filtered_alleles(repeat_id, count_threshold)
+    svg = locus_sparkline_svg(dosage, mean, ci, title=f"STR {repeat_id}")
+    if svg is None:
+        return "No allele data", 404
+    return thumbnail_response(svg)
+
+
+@plots_bp.route("/mini_plot/locus/<trait_name>/<repeat_id>.json")
+def locus_mini_plot(trait_name, repeat_id):
+    """Interactive mini locus figure, loaded when a grid cell is clicked"""
+    count_threshold = request.args.get(
+        "count_threshold", default=Config.OVERVIEW_COUNT_THRESHOLD, type=int
+    )
+    dosage, mean, ci = load_filtered_alleles(repeat_id, count_threshold)
+    fig = create_mini_locus_plot(dosage, mean, ci, trait_name, repeat_id) if dosage else None
+    if fig is None:
+        return jsonify({"error": f"No allele data for {repeat_id}"}), 404
+    return figure_response(fig)
 
 
 @plots_bp.route("/locus_trait_overview/<trait_name>")
@@ -249,6 +495,20 @@ def locus_trait_overview(trait_name):
     """Show all locus plots for a trait in a grid layout (similar to trait_overview but for locus plots)"""
     print(f"Locus trait overview: {trait_name}")
 
+    page = max(1, request.args.get("page", default=1, type=int))
+    per_page = Config.OVERVIEW_PAGE_SIZE
+    offset = (page - 1) * per_page
+    count_threshold = Config.OVERVIEW_COUNT_THRESHOLD
+    sort = request.args.get("sort", default="effect")
+    if sort not in LOCUS_SUMMARY_ORDER:
+        return (
+            render_template(
+                "error.html",
+                error=f"Unknown sort '{sort}' (use one of {', '.join(LOCUS_SUMMARY_ORDER)})",
+            ),
+            400,
+        )
+
     # Get all STR loci for this trait
     str_loci = get_str_loci_for_trait(trait_name)
 
@@ -260,78 +520,146 @@ def locus_trait_overview(trait_name):
             404,
         )
 
-    # Generate mini locus plots for each locus
-    plot_data = []
-    for locus in str_loci:
-        try:
-            # Query allele data for this repeat_id
-            from src.plots.locus import (
-                query_allele_data,
-                filter_allele_data,
-                create_mini_locus_plot,
-            )
+    # Sort and page with the precomputed summaries, so only the loci on this
+    # page have their allele data decoded
+    summaries = get_locus_summaries(
+        trait_name, count_threshold, limit=per_page, offset=offset, sort=sort
+    )
 
-            (
-                dosage_dict,
-                mean_dict,
-                ci_dict,
-                phenotype,
-                db_trait_name,
-            ) = query_allele_data(Config.LOCUS_DB_PATH, locus["repeat_id"])
-
-            if dosage_dict and mean_dict:
-                # Apply basic filtering
-                filtered_dosage, filtered_mean, filtered_ci = filter_allele_data(
-                    dosage_dict, mean_dict, ci_dict, count_threshold=50
+    plot_data = []
+    if summaries is not None:
+        page_loci, available_count = summaries
+        for locus in page_loci:
+            try:
+                entry = build_locus_overview_entry(
+                    locus,
+                    trait_name,
+                    count_threshold,
+                    summary=(
+                        locus["allele_count"],
+                        locus["total_samples"],
+                        locus["mean_effect"],
+                    ),
+                    trend={
+                        key: locus[key] for key in ("slope", "slope_se", "p_value")
+                    },
                 )
+                if entry:
+                    plot_data.append(entry)
+            except Exception as e:
+                print(f"Error creating locus plot for {locus['repeat_id']}: {e}")
+    else:
+        # No summaries for this database: summarize every locus, fit all
+        # their trends in one pass, then sort and page. The loci's rows are
+        # fetched in one batch up front instead of one query per locus.
+        prefetch_locus_rows([locus["repeat_id"] for locus in str_loci])
+        trends = {
+            row["repeat_id"]: row
+            for row in trend_records(compute_trait_trends(trait_name, count_threshold))
+        }
+        for locus in str_loci:
+            try:
+                entry = build_locus_overview_entry(
+                    locus,
+                    trait_name,
+                    count_threshold,
+                    trend=trends.get(locus["repeat_id"]),
+                )
+                if entry:
+                    plot_data.append(entry)
+            except Exception as e:
+                print(f"Error creating locus plot for {locus['repeat_id']}: {e}")
+                continue
+
+        if sort == "trend":
+            # Most significant trend first, loci without one last
+            plot_data.sort(
+                key=lambda x: (
+                    x["trend"] is None or x["trend"]["p_value"] is None,
+                    (x["trend"] or {}).get("p_value") or 0.0,
+                )
+            )
+        else:
+            # Sort by effect size (largest absolute effect first)
+            plot_data.sort(key=lambda x: x["mean_effect"], reverse=True)
+        available_count = len(plot_data)
+        plot_data = plot_data[offset : offset + per_page]
 
-                if filtered_dosage:
-                    # Create mini locus plot
-                    mini_fig = create_mini_locus_plot(
-                        filtered_dosage,
-                        filtered_mean,
-                        filtered_ci,
-                        trait_name,
-                        locus["repeat_id"],
-                    )
-
-                    if mini_fig:
-                        # Calculate some summary stats
-                        allele_count = len(filtered_dosage)
-                        total_samples = sum(float(v) for v in filtered_dosage.values())
-                        mean_effect = np.mean(
-                            [float(v) for v in filtered_mean.values()]
-                        )
-
-                        plot_data.append(
-                            {
-                                "locus": locus,
-                                "plot_json": mini_fig.to_json(),
-                                "allele_count": allele_count,
-                                "total_samples": int(total_samples),
-                                "mean_effect": abs(
-                                    mean_effect
-                                ),  # Use absolute value for sorting
-                                "effect_direction": "+" if mean_effect > 0 else "-",
-                            }
-                        )
-
-        except Exception as e:
-            print(f"Error creating locus plot for {locus['repeat_id']}: {e}")
-            continue
-
-    # Sort by effect size (largest absolute effect first)
-    plot_data.sort(key=lambda x: x["mean_effect"], reverse=True)
+    total_pages = max(1, -(-available_count // per_page))
 
     return render_template(
         "locus_trait_overview.html",
         trait_name=trait_name,
         plot_data=plot_data,
         total_loci=len(str_loci),
-        available_loci=len(plot_data),
+        available_loci=available_count,
+        page=page,
+        total_pages=total_pages,
+        sort=sort,
     )
 
 
+def load_locus_traits():
+    """Traits named in the locus database, for when the GWAS list is empty"""
+    with phase("db_locus_traits"):
+        conn = connect(Config.LOCUS_DB_PATH)
+        cursor = conn.execute(
+            """
+            SELECT DISTINCT COALESCE(trait_name, phenotype) as trait
+            FROM locus_data 
+            WHERE (trait_name IS NOT NULL OR phenotype IS NOT NULL)
+            ORDER BY trait
+        """
+        )
+        traits = [row[0] for row in cursor.fetchall()]
+        conn.close()
+    return traits
+
+
+def has_manhattan_data(gwas_trait_name):
+    """
+    Whether the Manhattan database has variants for a trait
+
+    Answered from trait_metadata (the catalog, or one read per request), the
+    same table the Manhattan plot route checks.
+    """
+    catalog = get_catalog()
+    if catalog is not None:
+        return gwas_trait_name in catalog.available_traits
+    if not os.path.exists(gwas_db_path(gwas_trait_name)):
+        return False
+    try:
+        return bool(get_trait_metadata().get(gwas_trait_name))
+    except Exception as e:
+        print(f"Error checking Manhattan data: {e}")
+        return False
+
+
+def has_other_loci(trait_name, repeat_id):
+    """Whether a trait has loci besides repeat_id (for the trait overview link)"""
+    catalog = get_catalog()
+    if catalog is not None:
+        return catalog.has_other_loci(trait_name, repeat_id)
+    try:
+        with phase("db_other_loci_count"):
+            conn = connect(Config.LOCUS_DB_PATH)
+            cursor = conn.execute(
+                """
+                SELECT COUNT(*) FROM locus_data 
+                WHERE (trait_name = ? OR phenotype = ?)
+                AND repeat_id IS NOT NULL
+                AND repeat_id != ?
+            """,
+                (trait_name, trait_name, repeat_id),
+            )
+            other_count = cursor.fetchone()[0]
+            conn.close()
+        return other_count > 0
+    except Exception as e:
+        print(f"Error checking other loci: {e}")
+        return False
+
+
 @plots_bp.route("/locus_plot")
 def locus_plot_route():
     """Locus plot route for STR allele-phenotype associations with trait switching"""
@@ -366,10 +694,29 @@ def locus_plot_route():
             filter_allele_data,
         )
 
+        def trait_lookups(name):
+            return {
+                "manhattan_available": lambda: has_manhattan_data(
+                    get_gwas_trait_name(name)
+                ),
+                "other_loci_available": lambda: has_other_loci(name, repeat_id),
+            }
+
+        # Allele data, locus position, the trait list and (when the trait is
+        # in the URL) the link checks don't depend on each other
+        lookups = {
+            "allele_data": lambda: query_allele_data(Config.LOCUS_DB_PATH, repeat_id),
+            "locus_info": lambda: get_locus_info_from_repeat_id(repeat_id),
+            "available_traits": get_available_traits,
+        }
+        if trait_name:
+            lookups.update(trait_lookups(trait_name))
+        results = fan_out(**lookups)
+
         # Query allele data
-        dosage_dict, mean_dict, ci_dict, phenotype, db_trait_name = query_allele_data(
-            Config.LOCUS_DB_PATH, repeat_id
-        )
+        dosage_dict, mean_dict, ci_dict, phenotype, db_trait_name = results[
+            "allele_data"
+        ]
 
         if dosage_dict is None:
             return (
@@ -382,6 +729,7 @@ def locus_plot_route():
         # Use trait from database if not provided in URL, or use provided trait
         if not trait_name:
             trait_name = db_trait_name or phenotype or "Unknown Trait"
+            results.update(fan_out(**trait_lookups(trait_name)))
 
         # Apply filtering
         filtered_dosage, filtered_mean, filtered_ci = filter_allele_data(
@@ -417,26 +765,16 @@ def locus_plot_route():
             )
 
         # Get locus information for display
-        target_chrom, target_pos = get_locus_info_from_repeat_id(repeat_id)
+        target_chrom, target_pos = results["locus_info"]
 
         # FIXED: Get ALL available traits instead of just traits for this repeat_id
         # This makes the dropdown work like the Manhattan plot dropdown
-        available_traits = get_available_traits()
+        available_traits = results["available_traits"]
 
         # If no traits found, fall back to traits from locus database
         if not available_traits:
             try:
-                conn = sqlite3.connect(Config.LOCUS_DB_PATH)
-                cursor = conn.execute(
-                    """
-                    SELECT DISTINCT COALESCE(trait_name, phenotype) as trait
-                    FROM locus_data 
-                    WHERE (trait_name IS NOT NULL OR phenotype IS NOT NULL)
-                    ORDER BY trait
-                """
-                )
-                available_traits = [row[0] for row in cursor.fetchall()]
-                conn.close()
+                available_traits = load_locus_traits()
             except Exception as e:
                 print(f"Error getting available traits: {e}")
                 available_traits = [trait_name]  # At least include current trait
@@ -450,44 +788,13 @@ def locus_plot_route():
             {"name": f"{repeat_id}", "url": None},
         ]
 
-        # Check if Manhattan data is available for this trait
-        manhattan_available = False
-        if os.path.exists(Config.MANHATTAN_DB_PATH):
-            try:
-                conn = sqlite3.connect(Config.MANHATTAN_DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT COUNT(*) FROM gwas_variants WHERE trait_name = ?",
-                    (gwas_trait_name,),
-                )
-                variant_count = cursor.fetchone()[0]
-                manhattan_available = variant_count > 0
-                conn.close()
-            except Exception as e:
-                print(f"Error checking Manhattan data: {e}")
-
-        # Check if there are other loci for this trait (for trait overview link)
-        other_loci_available = False
-        try:
-            conn = sqlite3.connect(Config.LOCUS_DB_PATH)
-            cursor = conn.execute(
-                """
-                SELECT COUNT(*) FROM locus_data 
-                WHERE (trait_name = ? OR phenotype = ?)
-                AND repeat_id IS NOT NULL
-                AND repeat_id != ?
-            """,
-                (trait_name, trait_name, repeat_id),
-            )
-            other_count = cursor.fetchone()[0]
-            other_loci_available = other_count > 0
-            conn.close()
-        except Exception as e:
-            print(f"Error checking other loci: {e}")
+        # Manhattan data for this trait, and other loci for the trait overview link
+        manhattan_available = results["manhattan_available"]
+        other_loci_available = results["other_loci_available"]
 
         # Prepare template data
         template_data = {
-            "locus_plot_json": fig.to_json(),
+            "locus_plot_json": serialize_figure(fig),
             "repeat_id": repeat_id,
             "trait_name": trait_name,
             "phenotype": phenotype,
@@ -519,6 +826,93 @@ def locus_plot_route():
         )
 
 
+@plots_bp.route("/locus_phewas")
+def locus_phewas():
+    """Effect and GWAS significance of one STR locus across all of its traits"""
+    repeat_id = request.args.get("repeat_id")
+    count_threshold = request.args.get(
+        "count_threshold", default=Config.OVERVIEW_COUNT_THRESHOLD, type=int
+    )
+
+    if not repeat_id:
+        return (
+            render_template(
+                "error.html", error="Missing required parameter: repeat_id"
+            ),
+            400,
+        )
+
+    if not os.path.exists(Config.LOCUS_DB_PATH):
+        return render_template("error.html", error="Locus database not found"), 404
+
+    # One query per database: every trait's allele data for the locus, then
+    # the GWAS window statistics of all the matching GWAS traits
+    entries = query_allele_data_all_traits(Config.LOCUS_DB_PATH, repeat_id)
+    if not entries:
+        return (
+            render_template(
+                "error.html", error=f"No data found for repeat_id: {repeat_id}"
+            ),
+            404,
+        )
+
+    chrom = entries[0]["chrom"]
+    pos = entries[0]["pos"]
+    window_size = Config.OVERVIEW_WINDOW
+    gwas_names = {entry["trait"]: get_gwas_trait_name(entry["trait"]) for entry in entries}
+    window_stats = get_locus_window_statistics(
+        repeat_id, chrom, pos, sorted(set(gwas_names.values())), window_size
+    )
+
+    rows = []
+    for entry in entries:
+        filtered_dosage, filtered_mean, _ = filter_allele_data(
+            entry["dosage_dict"],
+            entry["mean_dict"],
+            entry["ci_dict"],
+            count_threshold=count_threshold,
+        )
+        if filtered_dosage:
+            allele_count, total_samples, mean_effect = summarize_allele_data(
+                filtered_dosage, filtered_mean
+            )
+        else:
+            allele_count, total_samples, mean_effect = 0, 0, 0.0
+
+        gwas_trait_name = gwas_names[entry["trait"]]
+        stats = window_stats.get(gwas_trait_name, {})
+        rows.append(
+            {
+                "trait": entry["trait"],
+                "gwas_trait_name": gwas_trait_name,
+                "allele_count": allele_count,
+                "total_samples": total_samples,
+                "mean_effect": mean_effect,
+                "max_significance": stats.get("max_significance", 0),
+                "variant_count": stats.get("variant_count", 0),
+                "significant_count": stats.get("significant_count", 0),
+                "lead_variant_id": stats.get("lead_variant_id"),
+                "lead_pos": stats.get("lead_pos"),
+            }
+        )
+
+    # Strongest nearby GWAS signal first
+    rows.sort(key=lambda row: row["max_significance"], reverse=True)
+    fig = create_locus_phewas_plot(rows, repeat_id)
+
+    return render_template(
+        "locus_phewas.html",
+        repeat_id=repeat_id,
+        locus_chrom=chrom,
+        locus_pos=pos,
+        motif=entries[0]["motif"],
+        rows=rows,
+        count_threshold=count_threshold,
+        window_kb=window_size // 1000,
+        plot_json=serialize_figure(fig),
+    )
+
+
 @plots_bp.route("/test_locus")
 def test_locus():
     """Redirect to locus_plot for backwards compatibility"""
@@ -545,6 +939,9 @@ def download_manhattan_data():
     trait_name = request.args.get("trait")
     repeat_id = request.args.get("repeat_id")
     window_size = request.args.get("window", default=500000, type=int)
+    clump_distance = request.args.get("clump", default=0, type=int)
+    clump_p = request.args.get("clump_p", type=float)
+    min_neg_log_p = request.args.get("min_neg_log_p", type=float)
 
     # Map trait name for GWAS data lookup
     gwas_trait_name = get_gwas_trait_name(trait_name)
@@ -553,6 +950,12 @@ def download_manhattan_data():
     if not trait_name or not repeat_id:
         return "Missing required parameters: trait and repeat_id", 400
 
+    if clump_distance and clump_distance < Config.CLUMP_MIN_DISTANCE:
+        return f"Clumping distance must be at least {Config.CLUMP_MIN_DISTANCE:,} bp", 400
+
+    if min_neg_log_p is not None and not min_neg_log_p >= 0:
+        return "min_neg_log_p must be a number >= 0", 400
+
     # Get locus information
     target_chrom, target_pos = get_locus_info_from_repeat_id(repeat_id)
     if target_chrom is None or target_pos is None:
@@ -563,7 +966,9 @@ def download_manhattan_data():
     end_pos = target_pos + window_size
 
     try:
-        data = query_manhattan_data(gwas_trait_name, target_chrom, start_pos, end_pos)
+        data = query_manhattan_data(
+            gwas_trait_name, target_chrom, start_pos, end_pos, min_neg_log_p
+        )
 
         if data.empty:
             return (
@@ -571,40 +976,48 @@ def download_manhattan_data():
                 404,
             )
 
+        clump_columns = []
+        if clump_distance:
+            data = clump_variants(data, clump_distance, clump_p)
+            clump_columns = ["clump_id", "is_lead", "lead_variant_id"]
+
         # Create CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        writer.writerow(
-            [
-                "chromosome",
-                "position",
-                "variant_id",
-                "p_value",
-                "neg_log10_p",
-                "beta",
-                "se",
-            ]
-        )
+        with phase("serialize"):
+            output = io.StringIO()
+            writer = csv.writer(output)
 
-        # Write data
-        for _, row in data.iterrows():
+            # Write header
             writer.writerow(
                 [
-                    row["chrom"],
-                    row["pos"],
-                    row["variant_id"],
-                    row["p_value"],
-                    row["neg_log_p"],
-                    row.get("beta", ""),
-                    row.get("se", ""),
+                    "chromosome",
+                    "position",
+                    "variant_id",
+                    "p_value",
+                    "neg_log10_p",
+                    "beta",
+                    "se",
                 ]
+                + clump_columns
             )
 
-        # Create response
-        csv_content = output.getvalue()
-        output.close()
+            # Write data
+            for _, row in data.iterrows():
+                writer.writerow(
+                    [
+                        row["chrom"],
+                        row["pos"],
+                        row["variant_id"],
+                        row["p_value"],
+                        row["neg_log_p"],
+                        row.get("beta", ""),
+                        row.get("se", ""),
+                    ]
+                    + [row[column] for column in clump_columns]
+                )
+
+            # Create response
+            csv_content = output.getvalue()
+            output.close()
 
         response = make_response(csv_content)
         response.headers["Content-Type"] = "text/csv"
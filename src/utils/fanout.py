@@ -0,0 +1,56 @@
+"""
+Concurrent data loading for STRXplorer routes
+Runs the independent database calls of a page on a shared thread pool and
+waits for all of them, so the page waits for its slowest query instead of
+the sum of all of them
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+from src.utils.timing import phase
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    The shared pool, created on first use
+
+    Creating it lazily keeps the threads out of the gunicorn master, which
+    imports the app before forking its workers.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.FANOUT_WORKERS, thread_name_prefix="fanout"
+                )
+    return _executor
+
+
+def fan_out(**calls: Callable[[], Any]) -> Dict[str, Any]:
+    """
+    Run zero-argument callables concurrently and return their results by name
+
+    Each call runs in a copy of the caller's context, so it sees the same
+    request and g, and its phases show up in the request's Server-Timing.
+    SQLite releases the GIL while a statement runs, so queries on separate
+    connections overlap. If a call raises, the exception is re-raised here
+    once all calls have finished.
+    """
+    if len(calls) <= 1 or not Config.FANOUT_ENABLED:
+        return {name: call() for name, call in calls.items()}
+
+    executor = get_executor()
+    with phase("fanout"):
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, call)
+            for name, call in calls.items()
+        }
+        wait(futures.values())
+    return {name: future.result() for name, future in futures.items()}
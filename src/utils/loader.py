@@ -0,0 +1,81 @@
+"""
+Request-scoped data loading for STRXplorer
+Memoizes row lookups by key for the lifetime of one request, so a route and
+the helpers it calls fetch each row at most once, and fetches the keys asked
+for together in one batch query
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+from flask import g, has_request_context
+
+# A batch function takes a list of keys and returns {key: value}; keys it
+# leaves out load as None
+BatchFunction = Callable[[list], Dict[Hashable, Any]]
+
+_create_lock = threading.Lock()
+
+
+class RequestLoader:
+    """
+    Per-request memo of batch lookups
+
+    Results are keyed by (batch function, key). A key being fetched by one
+    thread is waited on, not fetched again, by the others (fan_out() runs a
+    request's lookups on several threads).
+    """
+
+    def __init__(self):
+        self._results: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def load(self, batch: BatchFunction, key: Hashable) -> Any:
+        return self.load_many(batch, [key])[key]
+
+    def load_many(self, batch: BatchFunction, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Values of keys, fetching the ones not loaded yet in one batch call"""
+        futures = {}
+        owned = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._results.get((batch, key))
+                if future is None:
+                    future = self._results[(batch, key)] = Future()
+                    owned.append(key)
+                futures[key] = future
+
+        if owned:
+            try:
+                values = batch(owned)
+            except BaseException as e:
+                # Forget the failed keys so a later call can retry them
+                with self._lock:
+                    for key in owned:
+                        del self._results[(batch, key)]
+                for key in owned:
+                    futures[key].set_exception(e)
+                raise
+            for key in owned:
+                futures[key].set_result(values.get(key))
+
+        return {key: future.result() for key, future in futures.items()}
+
+
+def get_loader() -> RequestLoader:
+    """
+    The current request's loader, created on first use
+
+    Outside a request (CLI commands, catalog builds) every call gets a fresh
+    loader, so lookups behave like direct queries.
+    """
+    if not has_request_context():
+        return RequestLoader()
+
+    loader = g.get("loader")
+    if loader is None:
+        with _create_lock:
+            loader = g.get("loader")
+            if loader is None:
+                loader = g.loader = RequestLoader()
+    return loader
@@ -0,0 +1,525 @@
+"""
+Performance metrics for STRXplorer
+Aggregates request counts, latency histograms, database and figure build
+times, cache hit ratios and payload sizes, and renders them in Prometheus
+text format or as JSON for the status dashboard. Each worker process shares
+its metrics through a file in Config.METRICS_DIR, so every scrape reports
+the totals of all workers of the server
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from flask import g, request
+
+from config import Config
+from src.utils.timing import is_warmup_request
+
+try:
+    import fcntl
+except ImportError:  # Windows: retired worker metrics are merged unlocked
+    fcntl = None
+
+# Latency buckets in seconds and payload buckets in bytes (upper bounds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+START_TIME = time.time()
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Tuple[str, ...], labels: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(label_names, labels)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_bound(bound: float) -> str:
+    return f"{bound:g}"
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def items(self) -> List[Tuple[Tuple, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def empty(self) -> "Counter":
+        return Counter(self.name, self.help_text, self.label_names)
+
+    def dump(self) -> list:
+        return [[list(labels), value] for labels, value in self.items()]
+
+    def merge(self, dumped: list):
+        for labels, value in dumped:
+            self.inc(*labels, amount=value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with labels
+
+    Observations only bisect into the bucket list and bump a few numbers under
+    a lock; cumulative counts are computed when the metrics are read.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Tuple[float, ...],
+        label_names: Tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        # labels -> [per-bucket counts (last slot is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def items(self) -> List[Tuple[Tuple, List[int], float, int]]:
+        with self._lock:
+            return [
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            ]
+
+    def empty(self) -> "Histogram":
+        return Histogram(self.name, self.help_text, self.buckets, self.label_names)
+
+    def dump(self) -> list:
+        return [[list(labels), counts, total, count] for labels, counts, total, count in self.items()]
+
+    def merge(self, dumped: list):
+        with self._lock:
+            for labels, counts, total, count in dumped:
+                labels = tuple(labels)
+                series = self._series.get(labels)
+                if series is None:
+                    series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+    def quantile(self, counts: List[int], count: int, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside the bucket"""
+        if count == 0:
+            return None
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count > 0:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index >= len(self.buckets):
+                    # Open-ended +Inf bucket: best we can say is the last bound
+                    return self.buckets[-1]
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total, count in sorted(self.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_bound(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+                )
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, inf)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-series count, mean and estimated percentiles for the JSON view"""
+        result = {}
+        for labels, counts, total, count in self.items():
+            key = ",".join(str(label) for label in labels) or "all"
+            result[key] = {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else None,
+                "p50": self.quantile(counts, count, 0.50),
+                "p95": self.quantile(counts, count, 0.95),
+                "p99": self.quantile(counts, count, 0.99),
+            }
+        return result
+
+
+REQUESTS = Counter(
+    "strx_requests_total",
+    "HTTP requests by route, method and status code",
+    ("route", "method", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "strx_request_duration_seconds",
+    "Request latency by route",
+    LATENCY_BUCKETS,
+    ("route",),
+)
+RESPONSE_SIZE = Histogram(
+    "strx_response_size_bytes",
+    "Response payload size by route",
+    SIZE_BUCKETS,
+    ("route",),
+)
+DB_QUERY_TIME = Histogram(
+    "strx_db_query_duration_seconds",
+    "Database query time by query phase",
+    LATENCY_BUCKETS,
+    ("query",),
+)
+FIGURE_BUILD_TIME = Histogram(
+    "strx_figure_build_duration_seconds",
+    "Plotly figure build time by figure type",
+    LATENCY_BUCKETS,
+    ("figure",),
+)
+PHASE_TIME = Histogram(
+    "strx_phase_duration_seconds",
+    "Time spent in other request phases (serialization, rendering, ...)",
+    LATENCY_BUCKETS,
+    ("phase",),
+)
+CACHE_REQUESTS = Counter(
+    "strx_cache_requests_total",
+    "Cache lookups by cache name and result",
+    ("cache", "result"),
+)
+
+ALL_METRICS = (
+    REQUESTS,
+    REQUEST_LATENCY,
+    RESPONSE_SIZE,
+    DB_QUERY_TIME,
+    FIGURE_BUILD_TIME,
+    PHASE_TIME,
+    CACHE_REQUESTS,
+)
+
+
+def record_cache_access(cache_name: str, hit: bool):
+    """Count a cache lookup so hit ratios show up in /metrics"""
+    CACHE_REQUESTS.inc(cache_name, "hit" if hit else "miss")
+
+
+def observe_phase(name: str, elapsed_ms: float):
+    """Route a timed request phase into the matching histogram"""
+    seconds = elapsed_ms / 1000
+    if name.startswith("db_"):
+        DB_QUERY_TIME.observe(seconds, name[3:])
+    elif name.startswith("plot_"):
+        FIGURE_BUILD_TIME.observe(seconds, name[5:])
+    else:
+        PHASE_TIME.observe(seconds, name)
+
+
+def observe_streamed_phases(phases: List[Tuple[str, float]]):
+    """
+    Record phases timed while a streamed response body was generated
+
+    The request hook has already run by then, so streaming views pass the
+    phases they collected here when the body is complete.
+    """
+    for name, elapsed_ms in phases:
+        observe_phase(name, elapsed_ms)
+    share_metrics()
+
+
+_shared = {"written_at": 0.0, "timer": None}
+_shared_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def _dump_process() -> dict:
+    return {
+        "pid": os.getpid(),
+        "ppid": os.getppid(),
+        "start_time": START_TIME,
+        "metrics": {metric.name: metric.dump() for metric in ALL_METRICS},
+    }
+
+
+def _write_json(path: str, payload: dict):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as handle:
+        json.dump(payload, handle)
+    os.replace(temp_path, path)
+
+
+def _write_process_metrics():
+    with _write_lock:
+        try:
+            os.makedirs(Config.METRICS_DIR, exist_ok=True)
+            _write_json(
+                os.path.join(Config.METRICS_DIR, f"{os.getpid()}.json"), _dump_process()
+            )
+        except OSError as e:
+            print(f"Error sharing metrics: {e}")
+
+
+def _flush_shared_metrics():
+    with _shared_lock:
+        _shared["timer"] = None
+        _shared["written_at"] = time.time()
+    _write_process_metrics()
+
+
+def share_metrics(force: bool = False):
+    """
+    Write this process's metrics to METRICS_DIR/<pid>.json
+
+    Called after requests. The file is rewritten at most every
+    METRICS_SHARE_SECONDS unless force is set; a request inside that interval
+    schedules a write at its end, so an idle worker's file is never stale.
+    """
+    if not Config.METRICS_DIR:
+        return
+    now = time.time()
+    with _shared_lock:
+        wait = _shared["written_at"] + Config.METRICS_SHARE_SECONDS - now
+        if not force and wait > 0:
+            if _shared["timer"] is None:
+                timer = threading.Timer(wait, _flush_shared_metrics)
+                timer.daemon = True
+                _shared["timer"] = timer
+                timer.start()
+            return
+        _shared["written_at"] = now
+    _write_process_metrics()
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _retire(path: str, state: dict):
+    """Fold an exited worker's metrics into retired.json, so totals never drop"""
+    retired_path = os.path.join(Config.METRICS_DIR, "retired.json")
+    with open(retired_path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            return  # another worker retired it first
+        combined = {metric.name: metric.empty() for metric in ALL_METRICS}
+        for dumped in (_read_state(retired_path), state):
+            if dumped is not None and dumped.get("ppid") == os.getppid():
+                for name, values in dumped["metrics"].items():
+                    if name in combined:
+                        combined[name].merge(values)
+        _write_json(
+            retired_path,
+            {
+                "pid": None,
+                "ppid": os.getppid(),
+                "start_time": state["start_time"],
+                "metrics": {name: metric.dump() for name, metric in combined.items()},
+            },
+        )
+        os.remove(path)
+
+
+def _read_state(path: str) -> Optional[dict]:
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _server_states() -> List[dict]:
+    """
+    Shared metrics of the other workers of this server (same parent process)
+
+    Files of exited workers are folded into retired.json, which is returned
+    with the live ones; files left by earlier server runs are deleted.
+    """
+    try:
+        names = os.listdir(Config.METRICS_DIR)
+    except OSError:
+        return []
+
+    states = []
+    for name in names:
+        if not name.endswith(".json") or name == "retired.json":
+            continue
+        path = os.path.join(Config.METRICS_DIR, name)
+        state = _read_state(path)
+        if state is None or state.get("pid") == os.getpid():
+            continue
+        same_server = state.get("ppid") == os.getppid()
+        if _process_alive(state["pid"]):
+            if same_server:
+                states.append(state)
+            continue
+        try:
+            if same_server:
+                _retire(path, state)
+            else:
+                os.remove(path)
+        except OSError as e:
+            print(f"Error retiring worker metrics: {e}")
+
+    retired = _read_state(os.path.join(Config.METRICS_DIR, "retired.json"))
+    if retired is not None and retired.get("ppid") == os.getppid():
+        states.append(retired)
+    return states
+
+
+def server_metrics() -> Tuple[Dict[str, object], int, float]:
+    """
+    Metrics summed over every worker of the server
+
+    Returns (metric name -> combined metric, number of live workers, earliest
+    worker start time). Without METRICS_DIR only this process is counted.
+    """
+    combined = {metric.name: metric.empty() for metric in ALL_METRICS}
+    for metric in ALL_METRICS:
+        combined[metric.name].merge(metric.dump())
+    if not Config.METRICS_DIR:
+        return combined, 1, START_TIME
+
+    share_metrics(force=True)
+    workers = 1
+    start_time = START_TIME
+    for state in _server_states():
+        for name, values in state["metrics"].items():
+            if name in combined:
+                combined[name].merge(values)
+        start_time = min(start_time, state.get("start_time") or start_time)
+        if state.get("pid") is not None:
+            workers += 1
+    return combined, workers, start_time
+
+
+def render_prometheus() -> str:
+    """All metrics, summed over the server's workers, in Prometheus text format"""
+    metrics, workers, start_time = server_metrics()
+    lines = [
+        "# HELP strx_uptime_seconds Seconds since the oldest worker started",
+        "# TYPE strx_uptime_seconds gauge",
+        f"strx_uptime_seconds {time.time() - start_time:.0f}",
+        "# HELP strx_workers Worker processes whose metrics are included",
+        "# TYPE strx_workers gauge",
+        f"strx_workers {workers}",
+    ]
+    for metric in ALL_METRICS:
+        lines.extend(metrics[metric.name].render())
+    return "\n".join(lines) + "\n"
+
+
+def get_metrics_snapshot() -> Dict:
+    """JSON-friendly summary of the server-wide metrics for the status dashboard"""
+    metrics, workers, start_time = server_metrics()
+
+    requests_by_route = {}
+    errors_by_route = {}
+    for (route, _method, status), value in metrics[REQUESTS.name].items():
+        requests_by_route[route] = requests_by_route.get(route, 0) + value
+        if str(status).startswith("5"):
+            errors_by_route[route] = errors_by_route.get(route, 0) + value
+
+    caches = {}
+    for (cache_name, result), value in metrics[CACHE_REQUESTS.name].items():
+        cache = caches.setdefault(cache_name, {"hit": 0, "miss": 0})
+        cache[result] += value
+    for cache in caches.values():
+        lookups = cache["hit"] + cache["miss"]
+        cache["hit_ratio"] = cache["hit"] / lookups if lookups else None
+
+    return {
+        "timestamp": time.time(),
+        "uptime_seconds": time.time() - start_time,
+        "workers": workers,
+        "requests": {
+            route: {"count": count, "server_errors": errors_by_route.get(route, 0)}
+            for route, count in requests_by_route.items()
+        },
+        "latency_seconds": metrics[REQUEST_LATENCY.name].summary(),
+        "response_size_bytes": metrics[RESPONSE_SIZE.name].summary(),
+        "db_query_seconds": metrics[DB_QUERY_TIME.name].summary(),
+        "figure_build_seconds": metrics[FIGURE_BUILD_TIME.name].summary(),
+        "phase_seconds": metrics[PHASE_TIME.name].summary(),
+        "caches": caches,
+    }
+
+
+def reset_shared_metrics():
+    """Delete the shared metric files (gunicorn calls this when the server starts)"""
+    if not Config.METRICS_DIR or not os.path.isdir(Config.METRICS_DIR):
+        return
+    for name in os.listdir(Config.METRICS_DIR):
+        try:
+            os.remove(os.path.join(Config.METRICS_DIR, name))
+        except OSError:
+            pass
+
+
+def init_metrics(app):
+    """Register the request hook feeding the in-process metrics"""
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get("request_start")
+        if start is None or is_warmup_request():
+            return response
+
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUESTS.inc(route, request.method, str(response.status_code))
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route)
+
+        if response.content_length is not None:
+            RESPONSE_SIZE.observe(response.content_length, route)
+
+        for name, elapsed_ms in g.get("phases", []):
+            observe_phase(name, elapsed_ms)
+
+        share_metrics()
+        return response
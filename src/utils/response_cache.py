@@ -0,0 +1,488 @@
+"""
+Response caching with single-flight coalescing for STRXplorer
+Rendered overview pages, grid thumbnails and mini plots are cached per
+normalized URL while the databases are unchanged. Identical requests that
+arrive while one is being computed wait for it and share its result: inside
+a process through an in-flight table, across worker processes through a lock
+file per URL and a shared on-disk copy of the result
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import current_app, g, request
+
+from config import Config
+from src.database.utils import database_fingerprint
+from src.utils.metrics import record_cache_access
+
+try:
+    import fcntl
+except ImportError:  # Windows: requests are only coalesced within a process
+    fcntl = None
+
+# Response headers kept with a cached body; everything else is per request
+STORED_HEADERS = ("Content-Type", "Cache-Control", "ETag")
+
+# Seconds between attempts to take another process's URL lock
+_LOCK_POLL_SECONDS = 0.05
+
+# Disk entries are pruned again after this fraction of
+# RESPONSE_CACHE_DISK_MAX_BYTES has been written
+_PRUNE_WRITE_FRACTION = 0.05
+
+# Lock and temp files older than this many seconds are left over by a crash
+_ORPHAN_SECONDS = 3600
+
+
+class CachedResponse:
+    """Status, body and the STORED_HEADERS of a rendered response"""
+
+    def __init__(self, status: int, body: bytes, headers: Dict[str, str]):
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+    @classmethod
+    def from_response(cls, response) -> "CachedResponse":
+        return cls(
+            response.status_code,
+            response.get_data(),
+            {
+                name: response.headers[name]
+                for name in STORED_HEADERS
+                if name in response.headers
+            },
+        )
+
+    def to_response(self, source: str):
+        """A fresh Flask response for the current request"""
+        response = current_app.response_class(self.body, status=self.status)
+        for name, value in self.headers.items():
+            response.headers[name] = value
+        response.headers["X-Response-Cache"] = source
+        if "ETag" in self.headers:
+            response = response.make_conditional(request)
+        return response
+
+
+class ResponseCache:
+    """In-memory LRU of CachedResponse entries bounded by total body size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class Flight:
+    """One in-progress computation that identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[CachedResponse] = None
+
+    def finish(self, result: Optional[CachedResponse]):
+        self.result = result
+        self.done.set()
+
+
+_cache = ResponseCache(Config.RESPONSE_CACHE_MAX_BYTES)
+_flights: Dict[str, Flight] = {}
+_flights_lock = threading.Lock()
+_version = {"checked_at": 0.0, "digest": None}
+_version_lock = threading.Lock()
+_prune = {"written": 0, "version": None, "running": False}
+_prune_lock = threading.Lock()
+
+
+def normalize_url(path: str, args) -> str:
+    """A URL with its (name, value) query parameters in sorted order"""
+    args = sorted(args)
+    return path + ("?" + urlencode(args) if args else "")
+
+
+def cache_key() -> Optional[str]:
+    """
+    The current request's path and the query arguments its endpoint reads
+
+    Only the arguments listed for the endpoint in RESPONSE_CACHE_ENDPOINTS are
+    part of the key. Returns None (not cacheable) when the request carries any
+    other argument or repeats one, so junk query strings cannot add entries.
+    Endpoints that are not cached are keyed by all their arguments.
+    """
+    known = Config.RESPONSE_CACHE_ENDPOINTS.get(request.endpoint)
+    args = list(request.args.items(multi=True))
+    if known is None:
+        return normalize_url(request.path, args)
+    names = [name for name, _ in args]
+    if len(set(names)) != len(names) or not set(names) <= set(known):
+        return None
+    return normalize_url(request.path, args)
+
+
+def data_version(force: bool = False) -> str:
+    """
+    Digest of database_fingerprint(), rechecked every RESPONSE_CACHE_CHECK_SECONDS
+
+    When it changes the in-memory cache is emptied; entries on disk carry the
+    digest they were rendered under and are ignored once it no longer matches
+    (prune_disk_cache() deletes them). force rechecks right away.
+    """
+    now = time.time()
+    if not force and now - _version["checked_at"] < Config.RESPONSE_CACHE_CHECK_SECONDS:
+        return _version["digest"]
+
+    with _version_lock:
+        if force or now - _version["checked_at"] >= Config.RESPONSE_CACHE_CHECK_SECONDS:
+            digest = hashlib.sha1(
+                json.dumps(database_fingerprint(), sort_keys=True).encode()
+            ).hexdigest()
+            if _version["digest"] is not None and digest != _version["digest"]:
+                _cache.clear()
+            _version.update(checked_at=time.time(), digest=digest)
+    return _version["digest"]
+
+
+def _disk_path(key: str, suffix: str) -> str:
+    name = hashlib.sha1(key.encode()).hexdigest()
+    return os.path.join(Config.RESPONSE_CACHE_DIR, name[:2], name + suffix)
+
+
+def read_disk_entry(key: str, version: str) -> Optional[CachedResponse]:
+    """
+    The result another process stored for key under the current data version
+
+    Entry files are one line of JSON metadata followed by the raw body.
+    """
+    try:
+        with open(_disk_path(key, ".entry"), "rb") as handle:
+            meta = json.loads(handle.readline())
+            body = handle.read()
+    except (OSError, ValueError):
+        return None
+    if meta.get("key") != key or meta.get("version") != version:
+        return None
+    return CachedResponse(meta["status"], body, meta["headers"])
+
+
+def has_cached_response(key: str) -> bool:
+    """Whether key is cached in this process or on disk for the current data"""
+    if _cache.get(key) is not None:
+        return True
+    if not Config.RESPONSE_CACHE_DIR:
+        return False
+    try:
+        with open(_disk_path(key, ".entry"), "rb") as handle:
+            meta = json.loads(handle.readline())
+    except (OSError, ValueError):
+        return False
+    return meta.get("key") == key and meta.get("version") == data_version()
+
+
+def write_disk_entry(key: str, version: str, entry: CachedResponse):
+    """Store a result for other processes (written to a temp file, then renamed)"""
+    path = _disk_path(key, ".entry")
+    meta = {"key": key, "version": version, "status": entry.status, "headers": entry.headers}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(json.dumps(meta).encode() + b"\n")
+            handle.write(entry.body)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Error writing response cache entry: {e}")
+        return
+
+    with _prune_lock:
+        _prune["written"] += len(entry.body)
+        due = (
+            _prune["version"] != version
+            or _prune["written"]
+            >= Config.RESPONSE_CACHE_DISK_MAX_BYTES * _PRUNE_WRITE_FRACTION
+        ) and not _prune["running"]
+        if due:
+            _prune.update(written=0, version=version, running=True)
+    if due:
+        threading.Thread(target=_run_prune, name="response-cache-prune", daemon=True).start()
+
+
+def _run_prune():
+    try:
+        prune_disk_cache()
+    except Exception as e:
+        print(f"Error pruning response cache: {e}")
+    finally:
+        with _prune_lock:
+            _prune["running"] = False
+
+
+def prune_disk_cache() -> Dict[str, int]:
+    """
+    Delete stale files from RESPONSE_CACHE_DIR and bound its size
+
+    Removes entries rendered under another data version, lock and temp files
+    left behind by crashed processes, then the least recently written entries
+    until the directory fits RESPONSE_CACHE_DISK_MAX_BYTES. Only one process
+    prunes at a time. Returns the number of files removed by kind.
+    """
+    removed = {"stale": 0, "evicted": 0, "orphaned": 0}
+    root = Config.RESPONSE_CACHE_DIR
+    if not root or not os.path.isdir(root):
+        return removed
+
+    lock = acquire_url_lock("prune", 0)
+    if lock is None and fcntl is not None:
+        return removed
+    try:
+        version = data_version(force=True)
+        now = time.time()
+        entries = []
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                    if name.endswith(".entry"):
+                        with open(path, "rb") as handle:
+                            try:
+                                meta = json.loads(handle.readline())
+                            except ValueError:
+                                meta = {}
+                        if meta.get("version") != version:
+                            os.remove(path)
+                            removed["stale"] += 1
+                        else:
+                            entries.append((stat.st_mtime, stat.st_size, path))
+                    elif now - stat.st_mtime > _ORPHAN_SECONDS and _remove_orphan(path):
+                        removed["orphaned"] += 1
+                except OSError:
+                    continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= Config.RESPONSE_CACHE_DISK_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed["evicted"] += 1
+    finally:
+        release_url_lock(lock, "prune")
+    return removed
+
+
+def _remove_orphan(path: str) -> bool:
+    """Remove an old temp file, or a lock file no process holds"""
+    if path.endswith(".lock") and fcntl is not None:
+        with open(path, "a") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            os.remove(path)
+        return True
+    os.remove(path)
+    return True
+
+
+def acquire_url_lock(key: str, timeout: float):
+    """
+    Take the cross-process lock for key, waiting at most timeout seconds
+
+    Returns the open lock file, or None if locking is unavailable, failed or
+    timed out (the caller then computes without it).
+    """
+    if fcntl is None or not Config.RESPONSE_CACHE_DIR:
+        return None
+
+    path = _disk_path(key, ".lock")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle = open(path, "a")
+    except OSError as e:
+        print(f"Error opening response cache lock: {e}")
+        return None
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                handle.close()
+                return None
+            time.sleep(_LOCK_POLL_SECONDS)
+            continue
+
+        # The holder deletes the lock file on release; a lock taken on a file
+        # that was deleted meanwhile protects nothing, so open it again
+        try:
+            if os.fstat(handle.fileno()).st_ino == os.stat(path).st_ino:
+                return handle
+        except FileNotFoundError:
+            pass
+        handle.close()
+        try:
+            handle = open(path, "a")
+        except OSError as e:
+            print(f"Error opening response cache lock: {e}")
+            return None
+
+
+def release_url_lock(handle, key: Optional[str] = None):
+    """Release a lock taken by acquire_url_lock() and delete its file"""
+    if handle is None:
+        return
+    if key is not None:
+        try:
+            os.remove(_disk_path(key, ".lock"))
+        except OSError:
+            pass
+    fcntl.flock(handle, fcntl.LOCK_UN)
+    handle.close()
+
+
+def join_flight(key: str) -> Tuple[Flight, bool]:
+    """The flight computing key, and whether this request leads (computes) it"""
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            return flight, False
+        flight = _flights[key] = Flight()
+        return flight, True
+
+
+def land_flight(key: str, flight: Flight, result: Optional[CachedResponse]):
+    """Hand the result (None if there is nothing to share) to the waiting requests"""
+    with _flights_lock:
+        if _flights.get(key) is flight:
+            del _flights[key]
+    flight.finish(result)
+
+
+def get_response_cache_stats() -> Dict[str, int]:
+    """Entries and bytes held in this process, and requests being computed"""
+    stats = _cache.stats()
+    with _flights_lock:
+        stats["in_flight"] = len(_flights)
+    return stats
+
+
+def init_response_cache(app):
+    """
+    Cache and coalesce GET requests to Config.RESPONSE_CACHE_ENDPOINTS
+
+    Register after init_static_site(), so pre-rendered pages are served first.
+    """
+    app.config.setdefault("RESPONSE_CACHE_ENABLED", Config.RESPONSE_CACHE_ENABLED)
+
+    @app.before_request
+    def serve_cached_response():
+        if (
+            request.method != "GET"
+            or not app.config["RESPONSE_CACHE_ENABLED"]
+            or request.endpoint not in Config.RESPONSE_CACHE_ENDPOINTS
+        ):
+            return None
+
+        key = cache_key()
+        if key is None:
+            return None
+        version = data_version()
+        entry = _cache.get(key)
+        record_cache_access("responses", entry is not None)
+        if entry is not None:
+            return entry.to_response("hit")
+
+        flight, leader = join_flight(key)
+        if not leader:
+            # An identical request is being computed in this process
+            shared = flight.done.wait(Config.SINGLE_FLIGHT_TIMEOUT) and flight.result
+            record_cache_access("single_flight", bool(shared))
+            return shared.to_response("coalesced") if shared else None
+
+        # Lead this process's flight; wait for any other process computing it
+        lock = acquire_url_lock(key, Config.SINGLE_FLIGHT_TIMEOUT)
+        entry = read_disk_entry(key, version) if Config.RESPONSE_CACHE_DIR else None
+        if entry is not None:
+            release_url_lock(lock, key)
+            _cache.put(key, entry)
+            land_flight(key, flight, entry)
+            record_cache_access("single_flight", True)
+            return entry.to_response("shared")
+
+        record_cache_access("single_flight", False)
+        g.response_flight = (key, version, flight, lock)
+        return None
+
+    @app.after_request
+    def store_cached_response(response):
+        state = g.pop("response_flight", None)
+        if state is None:
+            return response
+
+        key, version, flight, lock = state
+        entry = None
+        if (
+            response.status_code != 304
+            and not response.direct_passthrough
+            and not response.is_streamed
+        ):
+            entry = CachedResponse.from_response(response)
+            if entry.status == 200:
+                _cache.put(key, entry)
+                if Config.RESPONSE_CACHE_DIR:
+                    write_disk_entry(key, version, entry)
+        release_url_lock(lock, key)
+        land_flight(key, flight, entry)
+        response.headers["X-Response-Cache"] = "miss"
+        return response
+
+    @app.teardown_request
+    def abandon_flight(exc):
+        # The view raised before after_request ran: let the waiters compute
+        state = g.pop("response_flight", None)
+        if state is not None:
+            key, _, flight, lock = state
+            release_url_lock(lock, key)
+            land_flight(key, flight, None)
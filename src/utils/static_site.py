@@ -0,0 +1,231 @@
+"""
+Static pre-rendering for STRXplorer
+Exports the default trait overview, locus and Manhattan pages (and the JSON
+API and grid thumbnails they use) to a directory with a process pool, and serves those files
+in place of dynamic rendering while they match the current databases
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from flask import request, send_file
+
+from config import Config
+from src.database.utils import database_fingerprint
+from src.utils.metrics import record_cache_access
+
+# Pages whose only parameter is a path segment
+TRAIT_PAGES = ("trait_overview", "locus_trait_overview", "genome_manhattan")
+
+# Overview grid assets, /<prefix>/<kind>/<trait>/<repeat_id><suffix>
+GRID_ASSETS = {"thumbnail": ".svg", "mini_plot": ".json"}
+GRID_KINDS = ("manhattan", "locus")
+
+MIMETYPES = {".html": "text/html", ".json": "application/json", ".svg": "image/svg+xml"}
+
+# JSON payloads exported as-is (/database_status_json is not one: it reports
+# live warmup and shard state)
+JSON_PAGES = {
+    "/api/trait_list": "api/trait_list.json",
+}
+
+MANIFEST_NAME = "manifest.json"
+
+_SEGMENT = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+def _safe(segment: Optional[str]) -> bool:
+    return bool(segment) and segment not in (".", "..") and bool(_SEGMENT.fullmatch(segment))
+
+
+def static_page_path(path: str, args: Dict[str, str]) -> Optional[str]:
+    """
+    File (relative to the export directory) holding the page for a request
+
+    Only default-parameter pages are exported; returns None for anything else,
+    which is then rendered dynamically.
+    """
+    if path in JSON_PAGES:
+        return JSON_PAGES[path] if not args else None
+
+    parts = path.strip("/").split("/")
+    if len(parts) == 2 and parts[0] in TRAIT_PAGES and not args and _safe(parts[1]):
+        return f"{parts[0]}/{parts[1]}/index.html"
+
+    if len(parts) == 4 and parts[0] in GRID_ASSETS and parts[1] in GRID_KINDS and not args:
+        if _safe(parts[2]) and _safe(parts[3]) and parts[3].endswith(GRID_ASSETS[parts[0]]):
+            return "/".join(parts)
+
+    if path in ("/locus_plot", "/locus_phewas") and set(args) == {"repeat_id"}:
+        if _safe(args["repeat_id"]):
+            return f"{path.strip('/')}/{args['repeat_id']}/index.html"
+
+    if path == "/manhattan_plot" and set(args) == {"trait", "repeat_id"}:
+        if _safe(args["trait"]) and _safe(args["repeat_id"]):
+            return f"manhattan_plot/{args['trait']}/{args['repeat_id']}/index.html"
+
+    return None
+
+
+def collect_export_urls() -> List[str]:
+    """Every default-parameter page and JSON payload to pre-render"""
+    from src.database.models import get_str_loci_for_trait, get_traits_with_loci_data
+
+    urls = list(JSON_PAGES)
+    locus_ids = set()
+    for trait in get_traits_with_loci_data():
+        name = trait["trait"]
+        if not _safe(name):
+            continue
+        urls.extend(f"/{page}/{name}" for page in TRAIT_PAGES)
+        for locus in get_str_loci_for_trait(name):
+            if not _safe(locus["repeat_id"]):
+                continue
+            locus_ids.add(locus["repeat_id"])
+            urls.append(f"/manhattan_plot?trait={name}&repeat_id={locus['repeat_id']}")
+            for prefix, suffix in GRID_ASSETS.items():
+                urls.extend(
+                    f"/{prefix}/{kind}/{name}/{locus['repeat_id']}{suffix}"
+                    for kind in GRID_KINDS
+                )
+
+    for repeat_id in sorted(locus_ids):
+        urls.append(f"/locus_plot?repeat_id={repeat_id}")
+        urls.append(f"/locus_phewas?repeat_id={repeat_id}")
+    return urls
+
+
+_worker_client = None
+
+
+def _init_worker():
+    global _worker_client
+    from app import create_app
+
+    app = create_app()
+    # Render fresh pages, never copies of an older export
+    app.config["STATIC_SITE_SERVE"] = False
+    app.config["WARMUP_ENABLED"] = False
+    _worker_client = app.test_client()
+
+
+def _render_batch(urls: List[str], out_dir: str) -> List[tuple]:
+    """Render a batch of URLs in a worker process and write the 200 responses"""
+    results = []
+    for url in urls:
+        started = time.time()
+        response = _worker_client.get(url)
+        parts = urlsplit(url)
+        target = static_page_path(parts.path, dict(parse_qsl(parts.query)))
+
+        if response.status_code == 200 and target is not None:
+            file_path = os.path.join(out_dir, target)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "wb") as handle:
+                handle.write(response.get_data())
+        results.append(
+            (url, response.status_code, len(response.get_data()), time.time() - started)
+        )
+    return results
+
+
+def export_static_site(
+    out_dir: str, workers: Optional[int] = None, batch_size: int = 8
+) -> dict:
+    """
+    Pre-render every default page into out_dir using a process pool
+
+    Each worker builds its own app and test client, so pages render in
+    parallel across CPU cores. The manifest records the database fingerprint
+    the pages were built from.
+
+    Returns:
+        Export summary (page counts, failures, elapsed seconds)
+    """
+    started = time.time()
+    os.makedirs(out_dir, exist_ok=True)
+    fingerprint = database_fingerprint()
+    urls = collect_export_urls()
+    batches = [urls[i : i + batch_size] for i in range(0, len(urls), batch_size)]
+
+    written = 0
+    total_bytes = 0
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_render_batch, batch, out_dir) for batch in batches]
+        for future in as_completed(futures):
+            for url, status, size, _ in future.result():
+                if status == 200:
+                    written += 1
+                    total_bytes += size
+                else:
+                    failed.append({"url": url, "status": status})
+            print(f"Rendered {written + len(failed):,}/{len(urls):,} pages")
+
+    summary = {
+        "created_at": time.time(),
+        "databases": fingerprint,
+        "pages": written,
+        "bytes": total_bytes,
+        "failed": failed,
+        "elapsed_seconds": round(time.time() - started, 1),
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as handle:
+        json.dump(summary, handle, indent=2)
+    return summary
+
+
+_current_check = {"checked_at": 0.0, "current": False}
+
+
+def static_site_is_current(out_dir: str) -> bool:
+    """
+    Whether an export exists and was built from the current databases
+
+    The answer is cached for Config.STATIC_SITE_CHECK_SECONDS.
+    """
+    now = time.time()
+    if now - _current_check["checked_at"] < Config.STATIC_SITE_CHECK_SECONDS:
+        return _current_check["current"]
+
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as handle:
+            manifest = json.load(handle)
+        current = manifest.get("databases") == database_fingerprint()
+    except (OSError, ValueError):
+        current = False
+
+    _current_check.update(checked_at=now, current=current)
+    return current
+
+
+def init_static_site(app):
+    """Serve pre-rendered pages from Config.STATIC_SITE_DIR when they are current"""
+    app.config.setdefault("STATIC_SITE_SERVE", True)
+
+    @app.before_request
+    def serve_static_page():
+        if request.method != "GET" or not app.config["STATIC_SITE_SERVE"]:
+            return None
+
+        target = static_page_path(request.path, request.args.to_dict())
+        if target is None:
+            return None
+
+        out_dir = Config.STATIC_SITE_DIR
+        file_path = os.path.join(out_dir, target)
+        hit = os.path.exists(file_path) and static_site_is_current(out_dir)
+        record_cache_access("static_pages", hit)
+        if not hit:
+            return None
+
+        response = send_file(
+            os.path.abspath(file_path),
+            mimetype=MIMETYPES[os.path.splitext(target)[1]],
+        )
+        response.headers["X-Static-Render"] = "hit"
+        return response
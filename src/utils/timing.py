@@ -0,0 +1,123 @@
+"""
+Per-request phase timing for STRXplorer
+Records how long the database, plotting, serialization and rendering phases
+of a request take and reports them in a Server-Timing response header
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Tuple
+
+import flask
+from flask import g, has_request_context, request
+
+# Pages replayed by the cache warmer (src/utils/warmup.py) carry this header;
+# they are left out of request metrics, access counts and slow-request logs
+WARMUP_HEADER = "X-Warmup"
+
+
+def is_warmup_request() -> bool:
+    """Whether the current request was sent by the cache warmer"""
+    return WARMUP_HEADER in request.headers
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Time a block of code as a named phase of the current request
+
+    Outside of a request (CLI commands, scripts) the block simply runs untimed.
+    Repeated phases with the same name are summed in the report.
+    """
+    if not has_request_context():
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        phases = g.setdefault("phases", [])
+        phases.append((name, elapsed_ms))
+
+
+def timed(name: str):
+    """Decorator recording every call of a function as a request phase"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def render_template(template_name: str, **context) -> str:
+    """flask.render_template, timed as the 'render' phase"""
+    with phase("render"):
+        return flask.render_template(template_name, **context)
+
+
+def get_phase_summary() -> Dict[str, Tuple[float, int]]:
+    """Phase name -> (total milliseconds, call count) for the current request"""
+    summary = {}
+    for name, elapsed_ms in g.get("phases", []):
+        total, count = summary.get(name, (0.0, 0))
+        summary[name] = (total + elapsed_ms, count + 1)
+    return summary
+
+
+def format_server_timing(summary: Dict[str, Tuple[float, int]], total_ms: float) -> str:
+    """Format a phase summary as a Server-Timing header value"""
+    entries: List[str] = []
+    for name, (elapsed_ms, count) in summary.items():
+        entry = f"{name};dur={elapsed_ms:.1f}"
+        if count > 1:
+            entry += f';desc="x{count}"'
+        entries.append(entry)
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
+
+
+def init_timing(app):
+    """Register the request hooks that collect phases and emit Server-Timing"""
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.phases = []
+
+    @app.after_request
+    def add_server_timing(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+
+        total_ms = (time.perf_counter() - start) * 1000
+        summary = get_phase_summary()
+
+        if app.config.get("SERVER_TIMING_ENABLED", True):
+            response.headers["Server-Timing"] = format_server_timing(summary, total_ms)
+
+        threshold_ms = app.config.get("SLOW_REQUEST_THRESHOLD_MS")
+        if (
+            threshold_ms is not None
+            and total_ms >= threshold_ms
+            and not is_warmup_request()
+        ):
+            breakdown = ", ".join(
+                f"{name}={elapsed_ms:.0f}ms" + (f" (x{count})" if count > 1 else "")
+                for name, (elapsed_ms, count) in sorted(
+                    summary.items(), key=lambda item: item[1][0], reverse=True
+                )
+            )
+            app.logger.warning(
+                f"Slow request {request.method} {request.full_path.rstrip('?')} "
+                f"{response.status_code} took {total_ms:.0f}ms: {breakdown or 'no phases'}"
+            )
+
+        return response
@@ -0,0 +1,323 @@
+"""
+Cache warming for STRXplorer
+After a worker starts (or is replaced on reload), replays the configured and
+the most requested pages (trait overviews, locus pages, Manhattan windows,
+grid assets) through the app in a background thread, so the response cache,
+the catalog and the SQLite page cache are warm before users arrive. Which
+pages are hot is learned from decayed request counts kept on disk
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from flask import request
+
+from config import Config
+from src.utils.response_cache import (
+    cache_key,
+    data_version,
+    has_cached_response,
+    normalize_url,
+)
+from src.utils.static_site import TRAIT_PAGES
+from src.utils.timing import WARMUP_HEADER, is_warmup_request
+
+try:
+    import fcntl
+except ImportError:  # Windows: every worker warms, stats writes are unlocked
+    fcntl = None
+
+# Most URLs kept in the access statistics file
+_MAX_TRACKED_URLS = 1000
+
+# Failed URLs listed in the warmup status
+_MAX_REPORTED_FAILURES = 20
+
+
+class AccessStats:
+    """
+    Request counts per normalized URL, merged into Config.WARMUP_STATS_PATH
+
+    Counts are buffered in memory and added to the shared file at most every
+    WARMUP_STATS_FLUSH_SECONDS. Stored counts halve every
+    WARMUP_STATS_HALF_LIFE seconds, so the top of the list follows recent
+    traffic.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, int] = {}
+        self._flushed_at = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, url: str):
+        with self._lock:
+            self._pending[url] = self._pending.get(url, 0) + 1
+            due = time.time() - self._flushed_at >= Config.WARMUP_STATS_FLUSH_SECONDS
+            if due:
+                pending, self._pending = self._pending, {}
+                self._flushed_at = time.time()
+        if due:
+            self.flush(pending)
+
+    def flush(self, pending: Dict[str, int]):
+        if not pending:
+            return
+        try:
+            with _file_lock(Config.WARMUP_STATS_PATH + ".lock"):
+                stored = read_access_stats()
+                counts = stored["counts"]
+                for url, count in pending.items():
+                    counts[url] = counts.get(url, 0.0) + count
+                top = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+                _write_json(
+                    Config.WARMUP_STATS_PATH,
+                    {
+                        "updated_at": time.time(),
+                        "counts": dict(top[:_MAX_TRACKED_URLS]),
+                    },
+                )
+        except OSError as e:
+            print(f"Error writing access statistics: {e}")
+
+
+def read_access_stats() -> dict:
+    """Stored request counts, decayed to the current time"""
+    try:
+        with open(Config.WARMUP_STATS_PATH) as handle:
+            stored = json.load(handle)
+    except (OSError, ValueError):
+        return {"updated_at": time.time(), "counts": {}}
+
+    age = max(0.0, time.time() - stored.get("updated_at", time.time()))
+    decay = 0.5 ** (age / Config.WARMUP_STATS_HALF_LIFE)
+    counts = {
+        url: count * decay
+        for url, count in stored.get("counts", {}).items()
+        if count * decay >= 0.01
+    }
+    return {"updated_at": stored.get("updated_at"), "counts": counts}
+
+
+def top_requested_urls(limit: int) -> List[str]:
+    """The limit most requested URLs of the recent access statistics"""
+    counts = read_access_stats()["counts"]
+    return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+
+@contextmanager
+def _file_lock(path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _try_file_lock(path: str):
+    """An exclusively locked open file, or None if another process holds it"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle
+    except BlockingIOError:
+        handle.close()
+        return None
+
+
+def _write_json(path: str, payload: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w") as handle:
+        json.dump(payload, handle)
+    os.replace(temp_path, path)
+
+
+def normalize_plan_url(url: str) -> str:
+    parts = urlsplit(url)
+    return normalize_url(parts.path, parse_qsl(parts.query))
+
+
+def warmup_plan() -> List[str]:
+    """
+    URLs to warm, in order
+
+    Config.WARMUP_URLS, the trait pages of WARMUP_TRAITS and the locus pages
+    of WARMUP_LOCI come first, then the WARMUP_TOP_N most requested pages.
+    With neither configured nor recorded, the overviews of the traits with
+    the most loci are warmed instead.
+    """
+    urls = list(Config.WARMUP_URLS)
+    for trait in Config.WARMUP_TRAITS:
+        urls.extend(f"/{page}/{trait}" for page in TRAIT_PAGES)
+    urls.extend(
+        "/locus_plot?" + urlencode({"repeat_id": repeat_id})
+        for repeat_id in Config.WARMUP_LOCI
+    )
+    urls.extend(top_requested_urls(Config.WARMUP_TOP_N))
+
+    if not urls:
+        from src.database.models import get_traits_with_loci_data
+
+        for trait in get_traits_with_loci_data():
+            urls.extend(f"/{page}/{trait['trait']}" for page in TRAIT_PAGES)
+        urls = urls[: Config.WARMUP_TOP_N]
+
+    return list(dict.fromkeys(normalize_plan_url(url) for url in urls))
+
+
+def write_status(status: dict):
+    try:
+        _write_json(Config.WARMUP_STATUS_PATH, status)
+    except OSError as e:
+        print(f"Error writing warmup status: {e}")
+
+
+def run_warmup(app):
+    """
+    Replay the warmup plan through a test client of app
+
+    Only one process warms at a time (the others leave it to the process
+    holding the lock; the response cache shares its results through disk).
+    After each page the thread sleeps long enough to keep its share of a
+    core at WARMUP_CPU_FRACTION, and it stops after WARMUP_MAX_SECONDS.
+    """
+    lock = _try_file_lock(Config.WARMUP_STATUS_PATH + ".lock")
+    if lock is None:
+        print("Cache warmup: another worker is warming the caches")
+        return
+
+    try:
+        started = time.time()
+        plan = warmup_plan()
+        status = {
+            "state": "running",
+            "pid": os.getpid(),
+            "data_version": data_version(),
+            "started_at": started,
+            "finished_at": None,
+            "planned": plan,
+            "warmed": 0,
+            "failed": [],
+            "busy_seconds": 0.0,
+        }
+        write_status(status)
+
+        client = app.test_client()
+        fraction = min(max(Config.WARMUP_CPU_FRACTION, 0.01), 1.0)
+        for url in plan:
+            if time.time() - started >= Config.WARMUP_MAX_SECONDS:
+                status["state"] = "stopped (time budget)"
+                break
+
+            page_started = time.perf_counter()
+            try:
+                response = client.get(url, headers={WARMUP_HEADER: "1"})
+                ok = response.status_code == 200
+                result = response.status_code
+            except Exception as e:
+                ok, result = False, str(e)
+            busy = time.perf_counter() - page_started
+
+            status["busy_seconds"] += busy
+            if ok:
+                status["warmed"] += 1
+            elif len(status["failed"]) < _MAX_REPORTED_FAILURES:
+                status["failed"].append({"url": url, "result": result})
+            write_status(status)
+            time.sleep(busy * (1.0 / fraction - 1.0))
+        else:
+            status["state"] = "done"
+
+        status["finished_at"] = time.time()
+        write_status(status)
+        print(
+            f"Cache warmup: {status['warmed']}/{len(plan)} pages in "
+            f"{status['finished_at'] - started:.1f}s"
+        )
+    finally:
+        lock.close()
+
+
+_started = {"started": False}
+_start_lock = threading.Lock()
+_access_stats = AccessStats()
+
+
+def start_warmup(app):
+    """Start warming in a background thread, once per process"""
+    if _started["started"] or not app.config.get("WARMUP_ENABLED"):
+        return
+    with _start_lock:
+        if _started["started"]:
+            return
+        _started["started"] = True
+
+    def warm():
+        time.sleep(Config.WARMUP_DELAY_SECONDS)
+        try:
+            run_warmup(app)
+        except Exception as e:
+            print(f"Error warming caches: {e}")
+
+    threading.Thread(target=warm, name="warmup", daemon=True).start()
+
+
+def get_warmup_status() -> Optional[dict]:
+    """
+    Progress of the latest warmup run and how much of its plan is warm now
+
+    coverage is the fraction of planned pages replayed successfully; cached
+    counts planned pages currently in the response cache (this process or
+    disk), which falls as the data changes or entries are evicted.
+    """
+    try:
+        with open(Config.WARMUP_STATUS_PATH) as handle:
+            status = json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+    planned = status.pop("planned", [])
+    status["planned"] = len(planned)
+    status["coverage"] = status["warmed"] / len(planned) if planned else None
+    status["cached"] = sum(1 for url in planned if has_cached_response(url))
+    status["stale"] = status.get("data_version") != data_version()
+    return status
+
+
+def init_warmup(app):
+    """
+    Count requests to Config.WARMUP_ENDPOINTS and warm on the first request
+
+    gunicorn workers start warming right after they boot (post_worker_init
+    in gunicorn.conf.py); the first request covers other servers.
+    """
+    app.config.setdefault("WARMUP_ENABLED", Config.WARMUP_ENABLED)
+
+    @app.before_request
+    def start_cache_warmup():
+        start_warmup(app)
+
+    @app.after_request
+    def record_access(response):
+        if (
+            request.method == "GET"
+            and response.status_code == 200
+            and request.endpoint in Config.WARMUP_ENDPOINTS
+            and not is_warmup_request()
+        ):
+            key = cache_key()
+            if key is not None:
+                _access_stats.record(key)
+        return response
@@ -47,7 +47,7 @@ fi
 
 # Run tests
 echo "Running endpoint tests..."
-python3 test_endpoints.py
+python3 test_endpoints.py "$@"
 
 # Capture test exit code
 TEST_EXIT_CODE=$?
@@ -5,15 +5,47 @@ Automatically tests all endpoints and logs results
 Updated to use correct database data
 """
 import requests
+import argparse
 import json
+import random
+import subprocess
+import threading
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+import shutil
 import sqlite3
 import os
 
 
+# Relative weights for the load-test route mix, roughly following real traffic:
+# detail pages dominate, overview pages are rarer but far more expensive.
+DEFAULT_LOAD_MIX = {
+    "home": 10,
+    "browse_traits": 5,
+    "browse_loci": 3,
+    "database_status_json": 2,
+    "trait_list_api": 5,
+    "trait_overview": 5,
+    "locus_trait_overview": 5,
+    "manhattan_plot": 30,
+    "locus_plot": 35,
+}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile of a list of values (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
 class EndpointTester:
     def __init__(self, base_url: str = "http://localhost:5000"):
         self.base_url = base_url.rstrip("/")
@@ -33,6 +65,7 @@ class EndpointTester:
         expected_status: int = 200,
         params: Dict = None,
         description: str = None,
+        json_body: Dict = None,
     ) -> bool:
         """Test a single endpoint"""
         url = f"{self.base_url}{endpoint}"
@@ -42,7 +75,7 @@ class EndpointTester:
             if method == "GET":
                 response = requests.get(url, params=params, timeout=10)
             elif method == "POST":
-                response = requests.post(url, data=params, timeout=10)
+                response = requests.post(url, data=params, json=json_body, timeout=10)
             else:
                 raise ValueError(f"Unsupported method: {method}")
 
@@ -103,6 +136,16 @@ class EndpointTester:
             )
             return False
 
+    def record_check(self, test_name: str, success: bool, detail: str = ""):
+        """Record a check that is not a plain status-code comparison"""
+        self.results.append({"test": test_name, "success": success, "detail": detail})
+        if success:
+            self.log(f"{test_name} - {detail}")
+        else:
+            self.log(f"❌ {test_name} - {detail}", "ERROR")
+            self.errors.append({"test": test_name, "error": detail, "response_text": None})
+        return success
+
     def get_sample_data(self) -> Dict:
         """Get sample data from databases for testing"""
         sample_data = {
@@ -171,6 +214,23 @@ class EndpointTester:
             "/database_status_json", description="Database status JSON API"
         )
         self.test_endpoint("/api/trait_list", description="Trait list API")
+        self.test_endpoint("/metrics", description="Prometheus metrics")
+        self.test_endpoint("/metrics.json", description="Metrics JSON API")
+
+        # Debug pages exist only in debug mode or with DEBUG_ROUTES_ENABLED=1
+        try:
+            debug_status = requests.get(
+                f"{self.base_url}/debug/slow_queries.json", timeout=10
+            ).status_code
+        except requests.exceptions.RequestException:
+            debug_status = None
+        if debug_status == 404:
+            self.log("Skipping slow query pages: debug routes are not enabled", "WARN")
+        else:
+            self.test_endpoint("/debug/slow_queries", description="Slow query log page")
+            self.test_endpoint(
+                "/debug/slow_queries.json", description="Slow query log JSON API"
+            )
 
     def run_parameterized_tests(self):
         """Run tests with parameters using sample data"""
@@ -184,6 +244,28 @@ class EndpointTester:
             self.test_endpoint(
                 f"/trait_overview/{trait}", description=f"Trait overview for {trait}"
             )
+            self.test_endpoint(
+                f"/genome_manhattan/{trait}",
+                description=f"Genome-wide Manhattan plot for {trait}",
+            )
+            self.test_endpoint(
+                f"/genome_manhattan/{trait}",
+                params={"min_neg_log_p": 1},
+                description=f"Significant-only genome-wide Manhattan plot for {trait}",
+            )
+            self.test_endpoint(
+                f"/api/colocalization/{trait}",
+                description=f"Colocalization ranking for {trait}",
+            )
+            self.test_endpoint(
+                f"/api/locus_trends/{trait}",
+                description=f"Locus dose-response trends for {trait}",
+            )
+            self.test_endpoint(
+                f"/locus_trait_overview/{trait}",
+                params={"sort": "trend"},
+                description=f"Locus overview for {trait} ranked by trend",
+            )
 
         # Test with valid combinations
         if sample_data["valid_combinations"]:
@@ -196,12 +278,76 @@ class EndpointTester:
                 description=f"Manhattan plot for {combo['trait']} at {combo['repeat_id']}",
             )
 
+            # Test the significant-variants-only mode of the same window
+            self.test_endpoint(
+                "/manhattan_plot",
+                params={
+                    "trait": combo["trait"],
+                    "repeat_id": combo["repeat_id"],
+                    "min_neg_log_p": 1,
+                },
+                description=f"Significant-only Manhattan plot for {combo['trait']} at {combo['repeat_id']}",
+            )
+
+            # Test lead variant clumping of the same window
+            self.test_endpoint(
+                "/manhattan_plot",
+                params={
+                    "trait": combo["trait"],
+                    "repeat_id": combo["repeat_id"],
+                    "clump": 250000,
+                    "highlight_clumps": 1,
+                },
+                description=f"Clumped Manhattan plot for {combo['trait']} at {combo['repeat_id']}",
+            )
+            self.test_endpoint(
+                f"/api/clumps/{combo['trait']}/{combo['chrom']}",
+                params={
+                    "start": max(0, combo["pos"] - 500000),
+                    "end": combo["pos"] + 500000,
+                },
+                description=f"Lead variants around {combo['repeat_id']}",
+            )
+
+            # Test Manhattan tiles around the same locus
+            self.test_endpoint(
+                f"/api/tiles/{combo['trait']}/{combo['chrom']}/0/0",
+                description=f"Coarsest Manhattan tile for {combo['trait']}",
+            )
+
+            # Test overview grid thumbnails and their interactive mini plots
+            for kind in ("manhattan", "locus"):
+                self.test_endpoint(
+                    f"/thumbnail/{kind}/{combo['trait']}/{combo['repeat_id']}.svg",
+                    description=f"{kind.title()} thumbnail for {combo['repeat_id']}",
+                )
+                self.test_endpoint(
+                    f"/mini_plot/{kind}/{combo['trait']}/{combo['repeat_id']}.json",
+                    description=f"{kind.title()} mini plot for {combo['repeat_id']}",
+                )
+
             # Test locus plots
             self.test_endpoint(
                 "/locus_plot",
                 params={"repeat_id": combo["repeat_id"]},
                 description=f"Locus plot for {combo['repeat_id']}",
             )
+            self.test_endpoint(
+                "/locus_phewas",
+                params={"repeat_id": combo["repeat_id"]},
+                description=f"All-trait view for {combo['repeat_id']}",
+            )
+
+            # Test batch locus lookup
+            self.test_endpoint(
+                "/api/loci/batch",
+                method="POST",
+                json_body={
+                    "repeat_ids": [c["repeat_id"] for c in sample_data["valid_combinations"]],
+                    "count_threshold": 50,
+                },
+                description="Batch locus lookup",
+            )
 
             # Test with additional parameters
             self.test_endpoint(
@@ -215,6 +361,219 @@ class EndpointTester:
                 description=f"Locus plot with custom parameters",
             )
 
+    def run_cache_tests(self):
+        """Check the response cache and request coalescing (X-Response-Cache)"""
+        self.log("=== RESPONSE CACHE TESTS ===")
+
+        sample_data = self.get_sample_data()
+        if not sample_data["traits"]:
+            return
+        trait = sample_data["traits"][0]
+        url = f"{self.base_url}/genome_manhattan/{trait}"
+
+        def cache_status(threshold: float) -> Optional[str]:
+            response = requests.get(url, params={"min_neg_log_p": threshold}, timeout=30)
+            return response.headers.get("X-Response-Cache")
+
+        # Thresholds no earlier run has requested, so the first request renders
+        threshold = 1 + (int(time.time() * 1000) % 1_000_000) / 1e9
+
+        first, second = cache_status(threshold), cache_status(threshold)
+        self.record_check(
+            "Response cache miss then hit",
+            (first, second) == ("miss", "hit"),
+            f"X-Response-Cache: {first}, then {second}",
+        )
+
+        # Concurrent identical requests: one renders, the others share its result
+        barrier = threading.Barrier(8)
+
+        def concurrent_status(_):
+            barrier.wait()
+            return cache_status(threshold + 1e-10)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(concurrent_status, range(8)))
+        shared = [s for s in statuses if s in ("coalesced", "shared")]
+        self.record_check(
+            "Concurrent identical requests rendered once",
+            statuses.count("miss") == 1
+            and bool(shared)
+            and all(s in ("miss", "hit", "coalesced", "shared") for s in statuses),
+            f"X-Response-Cache: {sorted(statuses)}",
+        )
+
+        # Arguments the page does not read bypass the cache instead of adding entries
+        response = requests.get(
+            f"{self.base_url}/trait_overview/{trait}", params={"junk": 1}, timeout=30
+        )
+        self.record_check(
+            "Unknown query arguments are not cached",
+            response.status_code == 200 and "X-Response-Cache" not in response.headers,
+            f"{response.status_code}, X-Response-Cache: "
+            f"{response.headers.get('X-Response-Cache')}",
+        )
+
+    def run_warmup_tests(self, timeout: float = 60):
+        """Check the cache warmup report in /database_status_json"""
+        self.log("=== CACHE WARMUP TESTS ===")
+
+        # The first request of the run starts the warmer; wait for it to finish
+        deadline = time.time() + timeout
+        while True:
+            response = requests.get(f"{self.base_url}/database_status_json", timeout=30)
+            warmup = response.json().get("warmup") if response.status_code == 200 else None
+            if (warmup and warmup.get("state") != "running") or time.time() > deadline:
+                break
+            time.sleep(0.5)
+
+        if not self.record_check(
+            "Warmup status reported",
+            isinstance(warmup, dict) and warmup.get("state") != "running",
+            f"state: {warmup.get('state') if warmup else None}",
+        ):
+            return
+
+        planned, coverage = warmup.get("planned"), warmup.get("coverage")
+        self.record_check(
+            "Warmup plan and coverage",
+            isinstance(planned, int)
+            and planned > 0
+            and isinstance(coverage, (int, float))
+            and 0 <= coverage <= 1
+            and abs(coverage - warmup["warmed"] / planned) < 1e-9
+            and 0 <= warmup.get("cached", -1) <= planned,
+            f"planned {planned}, warmed {warmup.get('warmed')}, "
+            f"coverage {coverage}, cached {warmup.get('cached')}",
+        )
+
+    def run_shard_tests(self):
+        """
+        Check that a sharded GWAS trait is read from its shard
+
+        Splits one trait into a shard with the flask CLI (run in the server's
+        data directory), empties the shard, and expects /manhattan_plot to
+        follow it; after detaching, the main database serves the trait again.
+        The shard file is deleted afterwards; the main database is untouched.
+        """
+        self.log("=== GWAS SHARD TESTS ===")
+
+        manhattan_db = "data/manhattan_data.db"
+        if not os.path.exists(manhattan_db):
+            self.log("Skipping shard tests: no local Manhattan database", "WARN")
+            return
+        conn = sqlite3.connect(manhattan_db)
+        gwas_traits = [row[0] for row in conn.execute("SELECT trait_name FROM trait_metadata")]
+        conn.close()
+
+        # A locus of a trait stored under the same name in both databases
+        conn = sqlite3.connect("data/locus_data.db")
+        row = conn.execute(
+            f"""
+            SELECT COALESCE(trait_name, phenotype), repeat_id FROM locus_data
+            WHERE COALESCE(trait_name, phenotype) IN ({",".join("?" * len(gwas_traits))})
+            LIMIT 1
+            """,
+            gwas_traits,
+        ).fetchone()
+        conn.close()
+        if row is None:
+            self.log("Skipping shard tests: no locus trait with GWAS data", "WARN")
+            return
+        trait, repeat_id = row
+
+        def shards() -> Dict[str, dict]:
+            status = requests.get(f"{self.base_url}/database_status_json", timeout=30).json()
+            return {shard["trait_name"]: shard for shard in status.get("gwas_shards", [])}
+
+        if trait in shards():
+            self.log(f"Skipping shard tests: {trait} is already sharded", "WARN")
+            return
+
+        def flask_cli(*args) -> subprocess.CompletedProcess:
+            repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            env = dict(os.environ, PYTHONPATH=repo_root)
+            return subprocess.run(
+                [sys.executable, "-m", "flask", "--app", "app", *args],
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=600,
+            )
+
+        def manhattan_plot() -> requests.Response:
+            # A non-default window, so a pre-rendered page is never served
+            return requests.get(
+                f"{self.base_url}/manhattan_plot",
+                params={"trait": trait, "repeat_id": repeat_id, "window": 400000},
+                timeout=30,
+            )
+
+        if manhattan_plot().status_code != 200:
+            self.log(f"Skipping shard tests: no Manhattan plot for {repeat_id}", "WARN")
+            return
+
+        shard_path = None
+        shard_dir_existed = os.path.isdir("data/gwas_shards")
+        try:
+            result = flask_cli("shard", "split", "--trait", trait)
+            shard = shards().get(trait)
+            if not self.record_check(
+                "Shard split attaches the trait",
+                result.returncode == 0 and shard is not None,
+                f"exit {result.returncode}, shard: {shard and shard['path']}"
+                + (f", {result.stderr.strip()[-200:]}" if result.returncode else ""),
+            ):
+                return
+            shard_path = shard["path"]
+
+            response = manhattan_plot()
+            self.record_check(
+                "Manhattan plot from a shard",
+                response.status_code == 200,
+                f"{response.status_code}",
+            )
+
+            # Only the shard loses the trait's variants, then its metadata
+            conn = sqlite3.connect(shard_path)
+            conn.execute("DELETE FROM gwas_variants WHERE trait_name = ?", (trait,))
+            conn.commit()
+            response = manhattan_plot()
+            self.record_check(
+                "Manhattan data is read from the shard",
+                response.status_code == 404 and "No data found" in response.text,
+                f"{response.status_code} after emptying the shard",
+            )
+
+            conn.execute("DELETE FROM trait_metadata WHERE trait_name = ?", (trait,))
+            conn.commit()
+            conn.close()
+            response = manhattan_plot()
+            self.record_check(
+                "Trait availability is read from the shard",
+                response.status_code == 404 and "Not in database" in response.text,
+                f"{response.status_code} after removing the shard's trait_metadata row",
+            )
+
+            result = flask_cli("shard", "detach", trait)
+            response = manhattan_plot()
+            self.record_check(
+                "Detached trait is served from the main database",
+                result.returncode == 0
+                and trait not in shards()
+                and response.status_code == 200,
+                f"exit {result.returncode}, {response.status_code}",
+            )
+        finally:
+            if trait in shards():
+                flask_cli("shard", "detach", trait)
+            if shard_path:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(shard_path + suffix):
+                        os.remove(shard_path + suffix)
+            if not shard_dir_existed and not shards():
+                shutil.rmtree("data/gwas_shards", ignore_errors=True)
+
     def run_error_tests(self):
         """Run tests that should return error responses"""
         self.log("=== ERROR HANDLING TESTS ===")
@@ -253,6 +612,54 @@ class EndpointTester:
             description="Locus plot with invalid repeat_id",
         )
 
+        self.test_endpoint(
+            "/locus_phewas",
+            expected_status=400,
+            description="All-trait locus view without repeat_id (should return 400)",
+        )
+
+        self.test_endpoint(
+            "/api/tiles/height/1/3/99",
+            expected_status=400,
+            description="Manhattan tile outside its zoom level (should return 400)",
+        )
+
+        self.test_endpoint(
+            "/api/loci/batch",
+            method="POST",
+            expected_status=400,
+            json_body={"ids": ["1"]},
+            description="Batch locus lookup without repeat_ids (should return 400)",
+        )
+
+        self.test_endpoint(
+            "/api/colocalization",
+            expected_status=400,
+            params={"sort": "invalid_key"},
+            description="Colocalization ranking with unknown sort key (should return 400)",
+        )
+
+        self.test_endpoint(
+            "/genome_manhattan/height",
+            expected_status=400,
+            params={"min_neg_log_p": -1},
+            description="Genome-wide Manhattan plot with negative min_neg_log_p (should return 400)",
+        )
+
+        self.test_endpoint(
+            "/api/clumps/height/1",
+            expected_status=400,
+            params={"start": 0, "end": 1000000, "distance": 10},
+            description="Clumping with too small a distance (should return 400)",
+        )
+
+        self.test_endpoint(
+            "/api/locus_trends/height",
+            expected_status=400,
+            params={"sort": "invalid_key"},
+            description="Locus trends with unknown sort key (should return 400)",
+        )
+
         # Test invalid trait overview
         self.test_endpoint(
             "/trait_overview/invalid_trait",
@@ -277,6 +684,248 @@ class EndpointTester:
         if avg_time > 2000:  # 2 seconds
             self.log("Warning: Home page is responding slowly", "WARN")
 
+    def build_load_mix(self, weights: Dict[str, float] = None) -> List[Dict]:
+        """Build the weighted list of real routes replayed by the load test"""
+        weights = weights or DEFAULT_LOAD_MIX
+        sample_data = self.get_sample_data()
+
+        routes = {
+            "home": ("/", None),
+            "browse_traits": ("/browse_traits", None),
+            "browse_loci": ("/browse_loci", None),
+            "database_status_json": ("/database_status_json", None),
+            "trait_list_api": ("/api/trait_list", None),
+        }
+
+        if sample_data["valid_combinations"]:
+            combos = sample_data["valid_combinations"]
+            trait = combos[0]["trait"]
+            routes["trait_overview"] = (f"/trait_overview/{trait}", None)
+            routes["locus_trait_overview"] = (f"/locus_trait_overview/{trait}", None)
+            routes["manhattan_plot"] = (
+                "/manhattan_plot",
+                [{"trait": c["trait"], "repeat_id": c["repeat_id"]} for c in combos],
+            )
+            routes["locus_plot"] = (
+                "/locus_plot",
+                [{"repeat_id": c["repeat_id"]} for c in combos],
+            )
+        else:
+            self.log("No sample data found, load mix limited to static pages", "WARN")
+
+        mix = []
+        for name, weight in weights.items():
+            if name not in routes:
+                self.log(f"Skipping unknown or unavailable route '{name}'", "WARN")
+                continue
+            if weight <= 0:
+                continue
+            endpoint, param_choices = routes[name]
+            mix.append(
+                {
+                    "name": name,
+                    "endpoint": endpoint,
+                    "params": param_choices,
+                    "weight": weight,
+                }
+            )
+        return mix
+
+    def run_load_tests(
+        self,
+        clients: int = 8,
+        duration: float = 30.0,
+        rate: Optional[float] = None,
+        weights: Dict[str, float] = None,
+        report_path: str = None,
+    ) -> Dict:
+        """
+        Replay a weighted route mix with concurrent clients for a fixed duration
+
+        Args:
+            clients: Number of concurrent client threads
+            duration: Length of the run in seconds
+            rate: Total requests per second for constant-rate (open-loop) mode.
+                  If None, every client issues its next request as soon as the
+                  previous one finishes (closed-loop).
+            weights: Route name -> relative weight, defaults to DEFAULT_LOAD_MIX
+            report_path: Where to write the JSON report (timestamped by default)
+
+        Returns:
+            The report dictionary that was written to disk
+        """
+        mode = f"constant-rate {rate:g} req/s" if rate else "closed-loop"
+        self.log("=== LOAD TESTS ===")
+        self.log(f"{clients} clients, {duration:g}s, {mode}")
+
+        mix = self.build_load_mix(weights)
+        if not mix:
+            self.log("Load mix is empty, nothing to run", "ERROR")
+            return {}
+
+        names = [route["name"] for route in mix]
+        route_weights = [route["weight"] for route in mix]
+        routes_by_name = {route["name"]: route for route in mix}
+
+        samples = []
+        samples_lock = threading.Lock()
+        session_store = threading.local()
+        start = time.perf_counter()
+        deadline = start + duration
+
+        def send(route_name: str, scheduled: float, rng: random.Random):
+            # One keep-alive session per client thread, like a real browser
+            session = getattr(session_store, "session", None)
+            if session is None:
+                session = session_store.session = requests.Session()
+
+            route = routes_by_name[route_name]
+            params = rng.choice(route["params"]) if route["params"] else None
+            sent = time.perf_counter()
+            status = None
+            error = None
+            try:
+                response = session.get(
+                    f"{self.base_url}{route['endpoint']}", params=params, timeout=60
+                )
+                status = response.status_code
+                size = len(response.content)
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+                size = 0
+            finished = time.perf_counter()
+
+            sample = {
+                "route": route_name,
+                "status_code": status,
+                "error": error,
+                # Measure from the scheduled start so a backed-up server is not
+                # hidden by clients that simply send later (coordinated omission)
+                "latency_ms": (finished - scheduled) * 1000,
+                "service_ms": (finished - sent) * 1000,
+                "content_length": size,
+                "finished_at": finished - start,
+            }
+            with samples_lock:
+                samples.append(sample)
+
+        def closed_loop_client(client_id: int):
+            rng = random.Random(client_id)
+            while time.perf_counter() < deadline:
+                route_name = rng.choices(names, weights=route_weights)[0]
+                send(route_name, time.perf_counter(), rng)
+
+        def constant_rate_client(client_id: int):
+            # Client i owns request slots i, i + clients, i + 2 * clients, ...
+            rng = random.Random(client_id)
+            interval = 1.0 / rate
+            slot = client_id
+            while True:
+                scheduled = start + slot * interval
+                if scheduled >= deadline:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                route_name = rng.choices(names, weights=route_weights)[0]
+                send(route_name, scheduled, rng)
+                slot += clients
+
+        worker = constant_rate_client if rate else closed_loop_client
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            for future in [pool.submit(worker, i) for i in range(clients)]:
+                future.result()
+
+        elapsed = time.perf_counter() - start
+        report = self.summarize_load_samples(samples, elapsed)
+        report.update(
+            {
+                "timestamp": datetime.now().isoformat(),
+                "base_url": self.base_url,
+                "config": {
+                    "clients": clients,
+                    "duration_s": duration,
+                    "mode": "constant_rate" if rate else "closed_loop",
+                    "target_rate_rps": rate,
+                    "mix": {route["name"]: route["weight"] for route in mix},
+                },
+            }
+        )
+
+        self.log_load_report(report)
+        self.save_load_report(report, report_path)
+        return report
+
+    def summarize_load_samples(self, samples: List[Dict], elapsed: float) -> Dict:
+        """Aggregate raw load samples into per-endpoint and overall statistics"""
+
+        def summarize(group: List[Dict]) -> Dict:
+            latencies = [s["latency_ms"] for s in group]
+            errors = sum(
+                1
+                for s in group
+                if s["error"] is not None or s["status_code"] >= 400
+            )
+            return {
+                "requests": len(group),
+                "errors": errors,
+                "error_rate": errors / len(group) if group else 0.0,
+                "throughput_rps": len(group) / elapsed if elapsed > 0 else 0.0,
+                "latency_ms": {
+                    "mean": sum(latencies) / len(latencies) if latencies else None,
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "p99": percentile(latencies, 99),
+                    "max": max(latencies) if latencies else None,
+                },
+                "mean_content_length": sum(s["content_length"] for s in group)
+                / len(group)
+                if group
+                else 0,
+            }
+
+        by_route = {}
+        for sample in samples:
+            by_route.setdefault(sample["route"], []).append(sample)
+
+        return {
+            "elapsed_s": elapsed,
+            "overall": summarize(samples),
+            "endpoints": {
+                route: summarize(group) for route, group in sorted(by_route.items())
+            },
+        }
+
+    def log_load_report(self, report: Dict):
+        """Print a per-endpoint load summary table"""
+        self.log("=" * 50)
+        self.log("LOAD TEST REPORT")
+        self.log("=" * 50)
+        header = f"{'endpoint':<22}{'req':>7}{'rps':>8}{'err%':>7}{'p50':>8}{'p95':>8}{'p99':>8}"
+        self.log(header)
+
+        rows = list(report["endpoints"].items()) + [("OVERALL", report["overall"])]
+        for name, stats in rows:
+            latency = stats["latency_ms"]
+            self.log(
+                f"{name:<22}{stats['requests']:>7}{stats['throughput_rps']:>8.1f}"
+                f"{stats['error_rate'] * 100:>7.1f}"
+                f"{latency['p50'] or 0:>8.0f}{latency['p95'] or 0:>8.0f}{latency['p99'] or 0:>8.0f}"
+            )
+
+    def save_load_report(self, report: Dict, report_path: str = None):
+        """Save the load test report to a JSON file"""
+        if report_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            report_path = f"load_results_{timestamp}.json"
+
+        try:
+            with open(report_path, "w") as f:
+                json.dump(report, f, indent=2)
+            self.log(f"Load test report saved to: {report_path}")
+        except Exception as e:
+            self.log(f"Could not save load report: {e}", "ERROR")
+
     def check_server_running(self) -> bool:
         """Check if the Flask server is running"""
         try:
@@ -316,7 +965,9 @@ class EndpointTester:
         # Performance summary
         if self.results:
             response_times = [
-                r["response_time_ms"] for r in self.results if r["success"]
+                r["response_time_ms"]
+                for r in self.results
+                if r["success"] and "response_time_ms" in r
             ]
             if response_times:
                 avg_time = sum(response_times) / len(response_times)
@@ -355,13 +1006,47 @@ class EndpointTester:
             self.log(f"Could not save results file: {e}", "ERROR")
 
 
+def parse_mix(value: str) -> Dict[str, float]:
+    """Parse a route mix such as 'locus_plot=5,manhattan_plot=3'"""
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight) if weight else 1.0
+    return weights
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="STRXplorer endpoint tester")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument(
+        "--load",
+        action="store_true",
+        help="Run the concurrent load test instead of the functional tests",
+    )
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Total requests/second (constant-rate); omit for closed-loop",
+    )
+    parser.add_argument(
+        "--mix", type=parse_mix, default=None, help="e.g. locus_plot=5,home=1"
+    )
+    parser.add_argument("--report", default=None, help="Load report JSON path")
+    return parser.parse_args()
+
+
 def main():
     """Main test runner"""
+    args = parse_args()
+
     print("STRXplorer Endpoint Testing Script")
     print("=" * 40)
 
     # Check if server is running
-    tester = EndpointTester()
+    tester = EndpointTester(args.base_url)
 
     if not tester.check_server_running():
         print("❌ Flask server is not running!")
@@ -370,12 +1055,30 @@ def main():
         print("Then run this test script again.")
         sys.exit(1)
 
+    if args.load:
+        tester.log("Flask server is running, starting load test...")
+        try:
+            report = tester.run_load_tests(
+                clients=args.clients,
+                duration=args.duration,
+                rate=args.rate,
+                weights=args.mix,
+                report_path=args.report,
+            )
+        except KeyboardInterrupt:
+            tester.log("Load test interrupted by user", "WARN")
+            sys.exit(1)
+        sys.exit(0 if report else 1)
+
     tester.log("Flask server is running, starting tests...")
 
     # Run all test suites
     try:
         tester.run_basic_tests()
         tester.run_parameterized_tests()
+        tester.run_cache_tests()
+        tester.run_warmup_tests()
+        tester.run_shard_tests()
         tester.run_error_tests()
         tester.run_performance_tests()
 
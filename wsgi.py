@@ -0,0 +1,19 @@
+"""
+Production WSGI entry point for STRXplorer
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py sets preload_app, so the master imports this module once:
+the app and the lookup catalog are built before the workers fork and are
+shared copy-on-write between them.
+"""
+import gc
+
+from app import create_app
+from src.database.catalog import preload_catalog
+
+app = create_app("production")
+preload_catalog()
+
+# Move everything loaded so far out of the collector's generations, so
+# garbage collection in the workers does not write to (and copy) shared pages
+gc.freeze()